@@ -12,6 +12,9 @@ sys.path.insert(0, parent_dir_path)
 
 from backend.services.search_api import GoogleSearchAPI
 
+# Returned instead of the generated answer when it could not be validated
+UNVERIFIED_RESPONSE = "Response needs verification."
+
 
 def fact_check(response: str, search_api: GoogleSearchAPI) -> str:
     """
@@ -20,11 +23,25 @@ def fact_check(response: str, search_api: GoogleSearchAPI) -> str:
     # Perform web search for response validation
     search_results = search_api.search(response)
 
-    # Compare response with top search results
+    return _validate(response, search_results)
+
+
+async def fact_check_async(response: str, search_api: GoogleSearchAPI) -> str:
+    """
+    Validate the generated response using the search API's async client.
+    """
+    # Perform web search for response validation
+    search_results = await search_api.search_async(response)
+
+    return _validate(response, search_results)
+
+
+def _validate(response: str, search_results: list) -> str:
+    """Compare response with top search results."""
     validated_response = (
         response
         if any(response in result for result in search_results)
-        else "Response needs verification."
+        else UNVERIFIED_RESPONSE
     )
 
     return validated_response
@@ -11,29 +11,48 @@ parent_dir_path = os.path.dirname(current_dir_path)
 sys.path.insert(0, parent_dir_path)
 
 from backend.models.transformers import TransformerModel
+from backend.utils.config import GROQ_BASE_URL, HTTP_TIMEOUT, LOCAL_MAX_NEW_TOKENS
 from backend.utils.logger import logger
 import groq
 
+# Async Groq clients are reused across requests so connections are pooled
+_async_clients = {}
+
+
+def _get_async_client(api_key):
+    """Return a shared AsyncClient for the given API key."""
+    client = _async_clients.get(api_key)
+    if client is None:
+        client = groq.AsyncClient(
+            api_key=api_key, base_url=GROQ_BASE_URL, timeout=HTTP_TIMEOUT
+        )
+        _async_clients[api_key] = client
+    return client
+
+
+def build_prompt(query: str, knowledge: list = None) -> str:
+    """Prompt for the local model; the context comes first so it can be shared."""
+    # Ensure knowledge is formatted as a string
+    context = "\n".join(knowledge) if knowledge else "No additional context available."
+
+    # Construct the prompt (adjust format based on model behavior)
+    return f"Context: {context}\n\nQuestion: {query}\n\nAnswer:"
+
 
 def generate_response(
-    query: str, knowledge: list, transformer_model: TransformerModel
+    query: str,
+    knowledge: list,
+    transformer_model: TransformerModel,
+    max_new_tokens: int = LOCAL_MAX_NEW_TOKENS,
 ) -> str:
     """
-    Generate a response using a Groq LLM with the retrieved knowledge.
+    Generate a response using the local transformer model with the retrieved knowledge.
     """
     try:
-        # Ensure knowledge is formatted as a string
-        context = (
-            "\n".join(knowledge) if knowledge else "No additional context available."
-        )
-
-        # Construct the prompt (adjust format based on model behavior)
-        prompt = f"Context: {context}\n\nQuestion: {query}\n\nAnswer:"
+        prompt = build_prompt(query, knowledge)
 
         # Generate response using the transformer model
-        response = transformer_model.get_response(
-            prompt
-        )  # Ensure TransformerModel supports `get_response`
+        response = transformer_model.get_response(prompt, max_new_tokens)
 
         return response
     except Exception as e:
@@ -46,7 +65,9 @@ def generate_response_llm(prompt, model, api_key, temperature=0.1, max_tokens=25
     Generate a response using the Groq API asynchronously for better performance.
     """
     try:
-        client = groq.Client(api_key=api_key)
+        client = groq.Client(
+            api_key=api_key, base_url=GROQ_BASE_URL, timeout=HTTP_TIMEOUT
+        )
         response = client.chat.completions.create(
             model=model,
             temperature=temperature,
@@ -60,3 +81,48 @@ def generate_response_llm(prompt, model, api_key, temperature=0.1, max_tokens=25
     except Exception as e:
         logger.error(f"Unexpected error in Groq API call: {str(e)}")
         return None
+
+
+async def generate_response_llm_async(
+    prompt, model, api_key, temperature=0.1, max_tokens=256
+):
+    """
+    Generate a response using the native async Groq client.
+    """
+    try:
+        client = _get_async_client(api_key)
+        response = await client.chat.completions.create(
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        if response.choices:
+            result = response.choices[0].message.content.strip()
+            logger.info(f"Generated response: {result}")
+            return result
+    except Exception as e:
+        logger.error(f"Unexpected error in async Groq API call: {str(e)}")
+        return None
+
+
+async def stream_response_llm_async(
+    prompt, model, api_key, temperature=0.1, max_tokens=256
+):
+    """
+    Stream response tokens from the Groq API as they are generated.
+    """
+    client = _get_async_client(api_key)
+    stream = await client.chat.completions.create(
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        messages=[{"role": "user", "content": prompt}],
+        stream=True,
+    )
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        token = chunk.choices[0].delta.content
+        if token:
+            yield token
@@ -12,27 +12,109 @@ sys.path.insert(0, parent_dir_path)
 
 import re
 import string
-import spacy
+import threading
+from collections import OrderedDict
+from backend.utils.config import PREPROCESS_CACHE_SIZE, SPACY_EXCLUDE, SPACY_MODEL
+from backend.utils.metrics import CACHE_HITS, CACHE_MISSES
 
-# Load spaCy model for NLP processing
-nlp = spacy.load("en_core_web_sm")
+# spaCy model for NLP processing, loaded on first use
+nlp = None
+_nlp_lock = threading.Lock()
+
+# Bounded LRU of cleaned query -> preprocessed query
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+_punctuation_table = str.maketrans("", "", string.punctuation)
+
+
+def get_nlp():
+    """
+    Load the spaCy model once, on first use. Only the components that
+    lemmatization needs are loaded; the parser and NER are excluded.
+    """
+    global nlp
+    if nlp is None:
+        with _nlp_lock:
+            if nlp is None:
+                import spacy
+
+                nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE)
+    return nlp
 
 
 def preprocess_query(query: str) -> str:
     """
     Preprocess user input query by cleaning, spell-checking, and parsing.
     """
+    query = _clean(query)
+    cached = _cache_get(query)
+    if cached is not None:
+        return cached
+
+    # Tokenize and lemmatize using spaCy
+    processed = _lemmatize(get_nlp()(query))
+    _cache_put(query, processed)
+    return processed
+
+
+def preprocess_queries(queries: list) -> list:
+    """
+    Preprocess many queries at once; spaCy processes the uncached ones as one
+    stream (nlp.pipe), which is much faster than calling preprocess_query in
+    a loop.
+    """
+    cleaned = [_clean(query) for query in queries]
+    results = {}
+    misses = []
+    for query in dict.fromkeys(cleaned):
+        cached = _cache_get(query)
+        if cached is None:
+            misses.append(query)
+        else:
+            results[query] = cached
+
+    for query, doc in zip(misses, get_nlp().pipe(misses)):
+        results[query] = _lemmatize(doc)
+        _cache_put(query, results[query])
+
+    return [results[query] for query in cleaned]
+
+
+def _clean(query: str) -> str:
     # Convert to lowercase
     query = query.lower()
 
     # Remove punctuation
-    query = query.translate(str.maketrans("", "", string.punctuation))
+    query = query.translate(_punctuation_table)
 
     # Remove extra spaces
-    query = re.sub(r"\s+", " ", query).strip()
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def _lemmatize(doc) -> str:
+    return " ".join([token.lemma_ for token in doc if not token.is_stop])
+
+
+def _cache_get(query: str):
+    if PREPROCESS_CACHE_SIZE <= 0:
+        return None
+    with _cache_lock:
+        processed = _cache.get(query)
+        if processed is not None:
+            _cache.move_to_end(query)
+    if processed is None:
+        CACHE_MISSES.inc(cache="preprocess")
+    else:
+        CACHE_HITS.inc(cache="preprocess")
+    return processed
 
-    # Tokenize and lemmatize using spaCy
-    doc = nlp(query)
-    query = " ".join([token.lemma_ for token in doc if not token.is_stop])
 
-    return query
+def _cache_put(query: str, processed: str):
+    if PREPROCESS_CACHE_SIZE <= 0:
+        return
+    with _cache_lock:
+        _cache[query] = processed
+        _cache.move_to_end(query)
+        while len(_cache) > PREPROCESS_CACHE_SIZE:
+            _cache.popitem(last=False)
@@ -13,12 +13,9 @@ sys.path.insert(0, parent_dir_path)
 import os
 import sys
 import numpy as np
-import pandas as pd
 import gymnasium as gym
 from gymnasium import spaces
 from datetime import datetime, timedelta
-from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv
 from backend.utils.logger import logger
 
 
@@ -78,6 +75,9 @@ class ChatbotRLAgent:
         Initialize the RL agent, fetch training data, and set up the model.
         """
         try:
+            from stable_baselines3 import PPO
+            from stable_baselines3.common.vec_env import DummyVecEnv
+
             self.database_client = database_client
 
             # Load training data from PostgreSQL
@@ -94,6 +94,8 @@ class ChatbotRLAgent:
         Load feedback data from PostgreSQL, apply time-based weighting, and prepare RL training data.
         """
         try:
+            import pandas as pd
+
             query = "SELECT user_input, response, reward, timestamp FROM feedback"
             data = self.database_client.fetch_all(query)
 
@@ -0,0 +1,449 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import json
+import shutil
+import string
+import threading
+from collections import Counter
+import numpy as np
+from backend.utils.config import (
+    BM25_B,
+    BM25_COMPACT_EVERY,
+    BM25_K1,
+    BM25_TERM_CANDIDATES,
+)
+from backend.utils.logger import logger
+
+# Same normalization as query preprocessing: "ERR-404" and "err 404?" become
+# "err404" on both sides
+_punctuation_table = str.maketrans("", "", string.punctuation)
+
+
+def tokenize(text: str) -> list:
+    """Lowercase, punctuation-free terms with plural "s"/"ies" folded."""
+    terms = []
+    for word in text.lower().translate(_punctuation_table).split():
+        if len(word) > 3 and not word[-1].isdigit():
+            if word.endswith("ies"):
+                word = word[:-3] + "y"
+            elif word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class BM25Index:
+    def __init__(
+        self,
+        directory: str = None,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        compact_every: int = BM25_COMPACT_EVERY,
+        term_candidates: int = BM25_TERM_CANDIDATES,
+    ):
+        """
+        In-process BM25 inverted index over chunk ids.
+
+        Postings live in flat arrays: for term t, docs[offsets[t]:offsets[t+1]]
+        are the documents containing it and tfs the matching term counts. They
+        are memory-mapped from the last compaction; newer documents go to a
+        small in-memory delta, and deleted or replaced documents are
+        tombstoned. Every change is appended to log.jsonl first, so the index
+        survives a crash; compact() folds the delta and tombstones into new
+        arrays (automatically every compact_every changed documents).
+        Without a directory the index is memory-only.
+
+        Each term's postings are also kept in descending impact order. A
+        query scores, exactly, the term_candidates highest-impact documents of
+        every frequent term plus all documents of rarer terms, and goes deeper
+        (4x) only while an unseen document could still beat the k-th score,
+        so frequent terms rarely cost a full scan. Results are the exact
+        BM25 top-k as of the last compaction. 0 scores every posting.
+        """
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.compact_every = compact_every
+        self.term_candidates = term_candidates
+        self._lock = threading.RLock()
+
+        self._terms = {}  # term -> term number
+        self._ids = []  # doc number -> chunk id
+        self._docnos = {}  # chunk id -> live doc number
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._docs = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.uint16)
+        self._ranked = np.empty(0, dtype=np.int32)  # docs by descending impact
+        self._delta = {}  # term number -> ([doc numbers], [tfs])
+        self._doc_len = np.empty(0, dtype=np.float32)
+        self._live = np.empty(0, dtype=bool)
+        self._dead = []
+        self._total_len = 0.0
+        self._changes = 0
+        self._norm = None  # per-document BM25 length normalization, lazily built
+        self._log = None
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._docnos)
+
+    # Writes
+
+    def upsert(self, ids: list, texts: list):
+        """Index (or re-index) chunk texts under their ids."""
+        with self._lock:
+            self._write_log(
+                [{"upsert": doc_id, "text": t} for doc_id, t in zip(ids, texts)]
+            )
+            for doc_id, text in zip(ids, texts):
+                self._upsert(doc_id, text or "")
+            self._after_change(len(ids))
+
+    def delete(self, ids: list):
+        with self._lock:
+            self._write_log([{"delete": doc_id} for doc_id in ids])
+            for doc_id in ids:
+                self._delete(doc_id)
+            self._after_change(len(ids))
+
+    def _upsert(self, doc_id: str, text: str):
+        self._delete(doc_id)
+        docno = len(self._ids)
+        self._ids.append(doc_id)
+        self._docnos[doc_id] = docno
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        self._grow(docno + 1)
+        self._doc_len[docno] = length
+        self._live[docno] = True
+        self._total_len += length
+        for term, tf in terms.items():
+            termno = self._terms.setdefault(term, len(self._terms))
+            docs, tfs = self._delta.setdefault(termno, ([], []))
+            docs.append(docno)
+            tfs.append(min(tf, 65535))
+
+    def _delete(self, doc_id: str):
+        docno = self._docnos.pop(doc_id, None)
+        if docno is not None:
+            self._live[docno] = False
+            self._dead.append(docno)
+            self._total_len -= float(self._doc_len[docno])
+
+    def _grow(self, size: int):
+        if size <= len(self._live):
+            return
+        capacity = max(size, 2 * len(self._live), 1024)
+        doc_len = np.zeros(capacity, dtype=np.float32)
+        doc_len[: len(self._doc_len)] = self._doc_len
+        live = np.zeros(capacity, dtype=bool)
+        live[: len(self._live)] = self._live
+        self._doc_len, self._live = doc_len, live
+
+    def _after_change(self, count: int):
+        self._norm = None
+        self._changes += count
+        if self.compact_every and self._changes >= self.compact_every:
+            self.compact()
+
+    # Search
+
+    def search(self, query: str, top_k: int = 10) -> list:
+        """[(chunk id, score)] of the top_k BM25 matches, best first."""
+        with self._lock:
+            termnos = [self._terms[t] for t in set(tokenize(query)) if t in self._terms]
+            if not termnos or not self._docnos:
+                return []
+            norm = self._length_norm()
+            n_docs = len(self._docnos)
+
+            # Exact (doc, weight) pairs of short postings and delta documents
+            docs, weights, long_terms = [], [], []
+            for termno in termnos:
+                base_docs, base_tfs = self._base_postings(termno)
+                delta_docs, delta_tfs = self._delta_postings(termno)
+                df = len(base_docs) + len(delta_docs)
+                # df still counts tombstoned postings until the next compaction
+                idf = np.log1p((max(n_docs - df, 0) + 0.5) / (df + 0.5))
+                exact = [(delta_docs, delta_tfs)]
+                if self.term_candidates and len(base_docs) > self.term_candidates:
+                    long_terms.append((termno, idf, base_docs, base_tfs))
+                else:
+                    exact.append((base_docs, base_tfs))
+                for term_docs, term_tfs in exact:
+                    if len(term_docs):
+                        tf = term_tfs.astype(np.float32)
+                        docs.append(term_docs)
+                        weights.append(idf * self._saturate(tf, norm[term_docs]))
+            docs = np.concatenate(docs) if docs else np.empty(0, dtype=np.int32)
+            weights = np.concatenate(weights) if weights else np.empty(0)
+
+            size = len(self._ids)
+            if not long_terms and len(docs) * 8 > size:
+                # Postings cover a sizeable share of the corpus: dense scores
+                candidates = np.arange(size)
+                scores = np.bincount(docs, weights, minlength=size)
+                scores[~self._live[:size]] = 0
+            else:
+                depth = self.term_candidates
+                while True:
+                    candidates, scores, bound = self._score_candidates(
+                        docs, weights, long_terms, depth, norm
+                    )
+                    # Done once no unseen document can reach the k-th score
+                    kth = (
+                        np.partition(scores, -top_k)[-top_k]
+                        if len(scores) >= top_k
+                        else 0.0
+                    )
+                    if bound <= kth:
+                        break
+                    depth *= 4
+            if not len(scores):
+                return []
+
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            top = top[scores[top] > 0]
+            return [(self._ids[candidates[t]], float(scores[t])) for t in top]
+
+    def _score_candidates(self, docs, weights, long_terms, depth: int, norm):
+        """
+        Exact scores of the documents in docs plus the depth highest-impact
+        documents of each long term, and an upper bound on the score of any
+        other document.
+        """
+        ranked = []
+        bound = 0.0
+        for termno, idf, term_docs, term_tfs in long_terms:
+            start = self._offsets[termno]
+            ranked.append(self._ranked[start : start + min(depth, len(term_docs))])
+            if depth < len(term_docs):
+                # Impact of the first document left out bounds all the rest
+                doc = self._ranked[start + depth]
+                tf = np.float32(term_tfs[np.searchsorted(term_docs, doc)])
+                bound += idf * self._saturate(tf, norm[doc])
+        candidates, inverse = np.unique(
+            np.concatenate([docs, *ranked]), return_inverse=True
+        )
+        scores = np.bincount(
+            inverse[: len(docs)], weights, minlength=len(candidates)
+        ).astype(np.float64, copy=False)
+        for _, idf, term_docs, term_tfs in long_terms:
+            positions = np.searchsorted(term_docs, candidates)
+            positions[positions == len(term_docs)] = 0
+            found = term_docs[positions] == candidates
+            tf = term_tfs[positions[found]].astype(np.float32)
+            scores[found] += idf * self._saturate(tf, norm[candidates[found]])
+        scores[~self._live[candidates]] = 0
+        return candidates, scores, bound
+
+    def _saturate(self, tf, norm):
+        """BM25 term-frequency part of a weight (times idf gives the weight)."""
+        return tf * (self.k1 + 1) / (tf + norm)
+
+    def _base_postings(self, termno: int):
+        """Documents (ascending) and term counts of one term, last compaction."""
+        if termno + 1 < len(self._offsets):
+            start, end = self._offsets[termno], self._offsets[termno + 1]
+            return self._docs[start:end], self._tfs[start:end]
+        return self._docs[:0], self._tfs[:0]
+
+    def _delta_postings(self, termno: int):
+        delta = self._delta.get(termno)
+        if not delta:
+            return self._docs[:0], self._tfs[:0]
+        return (
+            np.asarray(delta[0], dtype=np.int32),
+            np.asarray(delta[1], dtype=np.uint16),
+        )
+
+    def _length_norm(self):
+        if self._norm is None:
+            average = self._total_len / max(1, len(self._docnos)) or 1.0
+            size = len(self._ids)
+            self._norm = self.k1 * (
+                1 - self.b + self.b * self._doc_len[:size] / average
+            ).astype(np.float32)
+        return self._norm
+
+    # Compaction and persistence
+
+    def compact(self):
+        """Rebuild the postings arrays without tombstones and fold in the delta."""
+        with self._lock:
+            size = len(self._ids)
+            live = self._live[:size]
+            # Every posting as (term, doc, tf), dead documents dropped
+            base_terms = np.repeat(
+                np.arange(len(self._offsets) - 1, dtype=np.int32),
+                np.diff(self._offsets),
+            )
+            delta_terms = [
+                np.full(len(docs), termno, dtype=np.int32)
+                for termno, (docs, _) in self._delta.items()
+            ]
+            terms = np.concatenate([base_terms, *delta_terms])
+            docs = np.concatenate(
+                [self._docs]
+                + [np.asarray(d, dtype=np.int32) for d, _ in self._delta.values()]
+            )
+            tfs = np.concatenate(
+                [self._tfs]
+                + [np.asarray(t, dtype=np.uint16) for _, t in self._delta.values()]
+            )
+            keep = live[docs]
+            terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+
+            # Renumber live documents densely and sort postings by term, doc
+            new_docno = np.cumsum(live, dtype=np.int64) - 1
+            docs = new_docno[docs].astype(np.int32)
+            order = np.lexsort((docs, terms))
+            terms, docs, tfs = terms[order], docs[order], tfs[order]
+
+            # Terms no longer used by any live document are dropped
+            used = np.bincount(terms, minlength=len(self._terms)) > 0
+            term_list = [None] * len(self._terms)
+            for term, termno in self._terms.items():
+                term_list[termno] = term
+            new_termno = np.cumsum(used, dtype=np.int64) - 1
+            terms = new_termno[terms]
+            self._terms = {
+                term_list[old]: int(new_termno[old]) for old in np.flatnonzero(used)
+            }
+            self._offsets = np.concatenate(
+                [[0], np.cumsum(np.bincount(terms, minlength=len(self._terms)))]
+            ).astype(np.int64)
+            self._docs, self._tfs = docs, tfs
+
+            self._ids = [self._ids[d] for d in np.flatnonzero(live)]
+            self._docnos = {doc_id: n for n, doc_id in enumerate(self._ids)}
+            self._doc_len = self._doc_len[:size][live].copy()
+            self._live = np.ones(len(self._ids), dtype=bool)
+            self._total_len = float(self._doc_len.sum())
+            self._delta, self._dead = {}, []
+            self._norm = None
+            self._changes = 0
+            self._rank_postings(terms)
+            if self.directory:
+                self._save()
+
+    def _rank_postings(self, terms):
+        """Order every term's documents by descending impact (idf aside)."""
+        impact = self._saturate(
+            self._tfs.astype(np.float32), self._length_norm()[self._docs]
+        )
+        self._ranked = self._docs[np.lexsort((-impact, terms))]
+
+    def _save(self):
+        """Write the compacted arrays as a new generation, then drop the log."""
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        generation = self._manifest().get("generation", 0) + 1
+        path = os.path.join(self.directory, f"base-{generation}")
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        np.save(os.path.join(path, "offsets.npy"), self._offsets)
+        np.save(os.path.join(path, "docs.npy"), self._docs)
+        np.save(os.path.join(path, "tfs.npy"), self._tfs)
+        np.save(os.path.join(path, "doc_len.npy"), self._doc_len)
+        np.save(os.path.join(path, "ranked.npy"), self._ranked)
+        term_list = sorted(self._terms, key=self._terms.get)
+        with open(os.path.join(path, "keys.json"), "w", encoding="utf-8") as f:
+            json.dump({"terms": term_list, "ids": self._ids}, f)
+
+        temporary = f"{manifest_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation}, f)
+        os.replace(temporary, manifest_path)
+
+        # Entries already in the new base would only be replayed idempotently
+        if self._log is not None:
+            self._log.close()
+        self._log = open(
+            os.path.join(self.directory, "log.jsonl"), "w", encoding="utf-8"
+        )
+        for old in os.listdir(self.directory):
+            if old.startswith("base-") and old != f"base-{generation}":
+                shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+        # Re-open the arrays read-only so they are paged in on demand
+        self._load_base(path)
+
+    def _manifest(self) -> dict:
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load_base(self, path: str):
+        self._offsets = np.load(os.path.join(path, "offsets.npy"))
+        self._docs = np.load(os.path.join(path, "docs.npy"), mmap_mode="r")
+        self._tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode="r")
+        self._ranked = np.load(os.path.join(path, "ranked.npy"), mmap_mode="r")
+
+    def _load(self):
+        generation = self._manifest().get("generation")
+        if generation:
+            path = os.path.join(self.directory, f"base-{generation}")
+            self._load_base(path)
+            with open(os.path.join(path, "keys.json"), encoding="utf-8") as f:
+                keys = json.load(f)
+            self._terms = {term: n for n, term in enumerate(keys["terms"])}
+            self._ids = keys["ids"]
+            self._docnos = {doc_id: n for n, doc_id in enumerate(self._ids)}
+            self._doc_len = np.load(os.path.join(path, "doc_len.npy"))
+            self._live = np.ones(len(self._ids), dtype=bool)
+            self._total_len = float(self._doc_len.sum())
+
+        log_path = os.path.join(self.directory, "log.jsonl")
+        replayed = 0
+        torn = False
+        if os.path.exists(log_path):
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        torn = True  # final line of an interrupted write
+                        break
+                    if "upsert" in entry:
+                        self._upsert(entry["upsert"], entry["text"])
+                    else:
+                        self._delete(entry["delete"])
+                    replayed += 1
+        self._changes = replayed
+        if torn:
+            # Start a clean log rather than appending after the torn line
+            self.compact()
+        else:
+            self._log = open(log_path, "a", encoding="utf-8")
+        logger.info(
+            f"BM25 index at {self.directory} holds {len(self)} chunks "
+            f"({replayed} logged changes replayed)."
+        )
+
+    def _write_log(self, entries: list):
+        if self._log is None:
+            return
+        self._log.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self._log.flush()
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
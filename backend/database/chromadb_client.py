@@ -10,17 +10,19 @@ parent_dir_path = os.path.dirname(current_dir_path)
 # Add the parent directory path to the sys.path
 sys.path.insert(0, parent_dir_path)
 
-
-import chromadb
+import numpy as np
 from backend.utils.logger import logger
 
 
 class ChromaDBClient:
     def __init__(self, collection_name: str, persist_directory: str = "./chroma_db"):
         """Initialize ChromaDB client and collection."""
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
         try:
+            import chromadb
+
             self.client = chromadb.PersistentClient(path=persist_directory)
-            self.collection_name = collection_name
 
             # Ensure we're working with a collection, not the client itself
             self.collection = self.client.get_or_create_collection(name=collection_name)
@@ -29,8 +31,10 @@ class ChromaDBClient:
             logger.error(f"Error initializing ChromaDBClient: {e}")
             self.collection = None
 
-    def add_document(self, doc_id: str, embedding: list[float], metadata: dict = None):
-        """Add a document with an embedding to the collection."""
+    def add_document(
+        self, doc_id: str, embedding, metadata: dict = None, document: str = None
+    ):
+        """Add a document with an embedding (and its text) to the collection."""
         if not self.collection:
             logger.error("ChromaDB collection is not initialized.")
             return
@@ -38,14 +42,42 @@ class ChromaDBClient:
         try:
             self.collection.add(
                 ids=[doc_id],
-                embeddings=[embedding],
-                metadatas=[metadata] if metadata else [{}],
+                embeddings=np.asarray(embedding, dtype=np.float32)[None, :],
+                documents=[document] if document is not None else None,
+                metadatas=[metadata] if metadata else None,
             )
             logger.info(f"Document {doc_id} added to ChromaDB.")
         except Exception as e:
             logger.error(f"Error adding document to ChromaDB: {e}")
 
-    def search(self, query_embedding: list[float], top_k=5):
+    def upsert_documents(
+        self, ids: list, embeddings, documents: list = None, metadatas: list = None
+    ) -> int:
+        """
+        Insert or replace many documents at once, split into the largest
+        batches the Chroma client accepts. Returns the number written;
+        errors are raised so callers can retry or stop.
+        """
+        if not self.collection:
+            raise RuntimeError("ChromaDB collection is not initialized.")
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        # Chroma rejects empty metadata dicts on upsert
+        metadatas = [m or None for m in metadatas] if metadatas else None
+        if metadatas and all(m is None for m in metadatas):
+            metadatas = None
+        max_batch = self.client.get_max_batch_size()
+        for start in range(0, len(ids), max_batch):
+            end = start + max_batch
+            self.collection.upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=documents[start:end] if documents else None,
+                metadatas=metadatas[start:end] if metadatas else None,
+            )
+        return len(ids)
+
+    def search(self, query_embedding, top_k=5):
         """Search for similar embeddings in the collection."""
         if not self.collection:
             logger.error("ChromaDB collection is not initialized.")
@@ -53,48 +85,10 @@ class ChromaDBClient:
 
         try:
             results = self.collection.query(
-                query_embeddings=[query_embedding], n_results=top_k
+                query_embeddings=np.asarray(query_embedding, dtype=np.float32)[None, :],
+                n_results=top_k,
             )
             return results
         except Exception as e:
             logger.error(f"Error searching ChromaDB: {e}")
             return []
-
-    def retrieve_knowledge(self, query, embedding_model):
-        """Retrieve relevant knowledge based on the query."""
-        if not self.collection:
-            logger.error("ChromaDB collection is not initialized.")
-            return []
-
-        logger.info(f"Retrieving knowledge for query: {query}")
-
-        # Get the embedding for the query
-        query_embedding = embedding_model.get_embedding(query)
-        logger.debug(f"Query embedding: {query_embedding}")
-
-        if not query_embedding:  # Ensure embedding is valid
-            logger.error("Query embedding is empty. Skipping retrieval.")
-            return []
-
-        try:
-            search_results = self.collection.query(
-                query_embeddings=[query_embedding], n_results=5
-            )
-            logger.debug(f"Search results: {search_results}")
-
-            knowledge = []
-            if search_results and "documents" in search_results:
-                for doc_list in search_results["documents"]:
-                    if isinstance(doc_list, list):
-                        knowledge.extend(
-                            doc for doc in doc_list if isinstance(doc, str)
-                        )
-
-            if not knowledge:
-                logger.warning("No relevant knowledge retrieved.")
-
-            return knowledge
-
-        except Exception as e:
-            logger.error(f"Error querying ChromaDB: {e}")
-            return []
@@ -0,0 +1,271 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import fcntl
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from backend.utils.config import (
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_DISK,
+    EMBEDDING_CACHE_MEMORY_ENTRIES,
+)
+from backend.utils.logger import logger
+from backend.utils.metrics import CACHE_HITS, CACHE_MISSES
+
+KEY_BYTES = 16
+# One index record: content key followed by the vector's row in vectors.f32.
+# Keys are raw bytes (void), not "S": numpy strips trailing NULs from "S"
+# values, so digests ending in 0x00 would never compare equal.
+INDEX_RECORD = np.dtype([("key", f"V{KEY_BYTES}"), ("row", "<u8")])
+# Entries written since startup are merged into the sorted arrays past this
+RECENT_MERGE_THRESHOLD = 4096
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys (Unicode NFC, collapsed whitespace)."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        model_id: str,
+        directory: str = None,
+        memory_entries: int = 50000,
+    ):
+        """
+        Content-addressed embedding cache for one embedding model.
+
+        Keys are a hash of model_id plus the normalized text. Recently used
+        vectors stay in an in-memory LRU; when a directory is given every
+        vector is also appended to an on-disk tier: a float32 file read
+        through a memory map, plus an append-only index of (key, row)
+        records. A restarted process only loads the index (24 bytes per
+        entry); vectors are paged in from disk on demand.
+        """
+        self.model_id = model_id
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()  # key -> float32 vector
+        self._lock = threading.Lock()
+
+        self.directory = None
+        self.dim = None
+        self._sorted_keys = np.empty(0, dtype=f"V{KEY_BYTES}")
+        self._sorted_rows = np.empty(0, dtype=np.uint64)
+        self._recent = {}  # key -> row, for entries written since startup
+        self._rows = 0
+        self._mmap = None
+        if directory:
+            # One sub-directory per model, so vector widths never mix
+            model_hash = hashlib.blake2b(model_id.encode(), digest_size=8).hexdigest()
+            self.directory = os.path.join(directory, model_hash)
+            self._open_disk_tier()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(
+            f"{self.model_id}\0{normalize_text(text)}".encode("utf-8"),
+            digest_size=KEY_BYTES,
+        ).digest()
+
+    def get_many(self, texts: list) -> list:
+        """
+        Cached float32 vectors for texts, in order (None where missing).
+        Vectors are shared with the cache and therefore read-only.
+        """
+        return [self._get(self.key(text)) for text in texts]
+
+    def get(self, text: str):
+        return self._get(self.key(text))
+
+    def put_many(self, texts: list, vectors):
+        """Store one vector per text; empty and all-zero vectors are ignored."""
+        with self._lock:
+            pending = {}  # key -> vector not on disk yet, appended in one write
+            for text, vector in zip(texts, vectors):
+                if vector is None or len(vector) == 0 or not np.any(vector):
+                    continue
+                # Own copy: the caller's vector may be a view of a whole batch
+                vector = np.array(vector, dtype=np.float32).ravel()
+                vector.setflags(write=False)
+                key = self.key(text)
+                self._remember(key, vector)
+                if self.directory is not None and self._find_row(key) is None:
+                    pending[key] = vector
+            if pending:
+                self._append(pending)
+
+    def put(self, text: str, vector):
+        self.put_many([text], [vector])
+
+    def _get(self, key: bytes):
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                CACHE_HITS.inc(cache="embedding_memory")
+                return vector
+
+            row = self._find_row(key)
+            if row is None:
+                CACHE_MISSES.inc(cache="embedding")
+                return None
+            # Copy out of the memory map so the page can be released
+            vector = np.array(self._vector_at(row), dtype=np.float32)
+            vector.setflags(write=False)
+            self._remember(key, vector)
+        CACHE_HITS.inc(cache="embedding_disk")
+        return vector
+
+    def _remember(self, key: bytes, vector):
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # On-disk tier
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _open_disk_tier(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            meta_path = self._path("meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path, encoding="utf-8") as f:
+                    self.dim = json.load(f)["dim"]
+            self._load_index()
+            logger.info(
+                f"Embedding cache for '{self.model_id}' has {self._rows} vectors "
+                f"on disk ({self.directory})."
+            )
+        except Exception as e:
+            logger.error(f"Error opening embedding cache, disk tier disabled: {e}")
+            self.directory = None
+
+    def _load_index(self):
+        if self.dim is None:
+            return
+        vectors_size = (
+            os.path.getsize(self._path("vectors.f32"))
+            if os.path.exists(self._path("vectors.f32"))
+            else 0
+        )
+        self._rows = vectors_size // (self.dim * 4)
+
+        index_path = self._path("index.bin")
+        if not os.path.exists(index_path):
+            return
+        records = np.fromfile(index_path, dtype=INDEX_RECORD)
+        # Drop records whose vector never made it to disk (interrupted write)
+        records = records[records["row"] < self._rows]
+        order = np.argsort(records["key"], kind="stable")
+        self._sorted_keys = records["key"][order]
+        self._sorted_rows = records["row"][order]
+
+    def _find_row(self, key: bytes):
+        if self.directory is None:
+            return None
+        row = self._recent.get(key)
+        if row is not None:
+            return row
+        key = np.void(key)
+        position = np.searchsorted(self._sorted_keys, key)
+        if position < len(self._sorted_keys) and self._sorted_keys[position] == key:
+            return int(self._sorted_rows[position])
+        return None
+
+    def _merge_recent(self):
+        """Fold the entries written since startup into the sorted arrays."""
+        keys = np.array([np.void(key) for key in self._recent], dtype=f"V{KEY_BYTES}")
+        rows = np.fromiter(self._recent.values(), dtype=np.uint64, count=len(keys))
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], rows[order]
+        positions = np.searchsorted(self._sorted_keys, keys)
+        self._sorted_keys = np.insert(self._sorted_keys, positions, keys)
+        self._sorted_rows = np.insert(self._sorted_rows, positions, rows)
+        self._recent = {}
+
+    def _vector_at(self, row: int):
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            # The file grew since it was mapped
+            self._mmap = np.memmap(
+                self._path("vectors.f32"),
+                dtype=np.float32,
+                mode="r",
+                shape=(self._rows, self.dim),
+            )
+        return self._mmap[row]
+
+    def _append(self, pending: dict):
+        try:
+            if self.dim is None:
+                self.dim = int(next(iter(pending.values())).shape[0])
+                with open(self._path("meta.json"), "w", encoding="utf-8") as f:
+                    json.dump({"model_id": self.model_id, "dim": self.dim}, f)
+            mismatched = [k for k, v in pending.items() if v.shape[0] != self.dim]
+            if mismatched:
+                logger.error(
+                    f"Embedding cache dimension mismatch; {len(mismatched)} "
+                    "vectors not persisted."
+                )
+                for key in mismatched:
+                    del pending[key]
+                if not pending:
+                    return
+            keys = list(pending)
+
+            # Vectors first, then their index records: a crash in between
+            # only leaves unreferenced rows. The file lock keeps rows
+            # consistent when several worker processes share the cache
+            # directory.
+            with open(self._path("vectors.f32"), "ab") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    first = f.seek(0, os.SEEK_END) // (self.dim * 4)
+                    f.write(np.stack([pending[key] for key in keys]).tobytes())
+                    f.flush()
+                    records = np.empty(len(keys), dtype=INDEX_RECORD)
+                    records["key"] = [np.void(key) for key in keys]
+                    records["row"] = np.arange(first, first + len(keys))
+                    with open(self._path("index.bin"), "ab") as index:
+                        index.write(records.tobytes())
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            for row, key in enumerate(keys, first):
+                self._recent[key] = row
+            self._rows = max(self._rows, first + len(keys))
+            if len(self._recent) > RECENT_MERGE_THRESHOLD:
+                self._merge_recent()
+        except Exception as e:
+            logger.error(f"Error persisting embeddings: {e}")
+
+    def __len__(self):
+        if self.directory is None:
+            return len(self._memory)
+        return len(self._sorted_keys) + len(self._recent)
+
+
+def create_embedding_cache(model_id: str) -> EmbeddingCache:
+    """Build the embedding cache for model_id from EMBEDDING_CACHE_* settings."""
+    return EmbeddingCache(
+        model_id,
+        EMBEDDING_CACHE_DIR if EMBEDDING_CACHE_DISK else None,
+        EMBEDDING_CACHE_MEMORY_ENTRIES,
+    )
@@ -10,14 +10,16 @@ parent_dir_path = os.path.dirname(current_dir_path)
 # Add the parent directory path to the sys.path
 sys.path.insert(0, parent_dir_path)
 
+import numpy as np
 from backend.utils.logger import logger
-from pymilvus import connections, Collection, CollectionSchema, FieldSchema, DataType
 
 
 class MilvusClient:
     def __init__(self, host: str, port: str, collection_name: str):
         """Initialize Milvus client and collection."""
         try:
+            from pymilvus import connections, Collection
+
             # Connect to Milvus
             connections.connect(alias="default", host=host, port=port)
             self.collection_name = collection_name
@@ -34,7 +36,8 @@ class MilvusClient:
             }
 
             results = self.collection.search(
-                data=[query_embedding],  # Query vector
+                # pymilvus wants plain lists; convert only here, at the edge
+                data=[np.asarray(query_embedding, dtype=np.float32).tolist()],
                 anns_field="embedding",  # The field where embeddings are stored
                 param=search_params,
                 limit=top_k,
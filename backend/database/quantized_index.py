@@ -0,0 +1,455 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import numpy as np
+from backend.utils.logger import logger
+
+
+def _kmeans(x: np.ndarray, k: int, iterations: int = 10, seed: int = 0):
+    """Lloyd's k-means; empty clusters are re-seeded from random points."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        nearest = _nearest(x, centroids)
+        order = np.argsort(nearest, kind="stable")
+        counts = np.bincount(nearest, minlength=k)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        centroids[filled] = (
+            np.add.reduceat(x[order], starts, axis=0) / counts[filled, None]
+        )
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+    return centroids
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (L2) of every row of x, in blocks."""
+    centroid_squared = (centroids * centroids).sum(axis=1)
+    nearest = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), 8192):
+        block = x[start : start + 8192]
+        # ||x - c||^2 without the ||x||^2 term, constant per row
+        distances = centroid_squared - 2 * block @ centroids.T
+        nearest[start : start + 8192] = distances.argmin(axis=1)
+    return nearest
+
+
+class ScalarQuantizer:
+    """
+    8-bit scalar quantization: every dimension is mapped onto 256 even
+    steps between its training minimum and maximum, one byte each (4x
+    smaller than float32).
+    """
+
+    method = "sq8"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.code_size = dim
+        self.low = None
+        self.step = None
+
+    def train(self, x: np.ndarray):
+        self.low = x.min(axis=0)
+        self.step = np.maximum((x.max(axis=0) - self.low) / 255, 1e-12)
+
+    def encode(self, x: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint((x - self.low) / self.step), 0, 255).astype(np.uint8)
+
+    def distances(self, query: np.ndarray, codes: np.ndarray, space: str):
+        """Asymmetric distances from a float query to the coded rows."""
+        if space == "l2":
+            decoded = codes * self.step + self.low
+            return ((decoded - query) ** 2).sum(axis=1)
+        # q . x = q . low + (q * step) . code, with no decoded copy of x
+        return 1 - (codes @ (query * self.step) + query @ self.low)
+
+    def state(self) -> dict:
+        return {"low": self.low, "step": self.step}
+
+    def load(self, state: dict):
+        self.low = state["low"]
+        self.step = state["step"]
+
+
+class ProductQuantizer:
+    """
+    Product quantization: vectors are cut into m sub-vectors, each replaced
+    by the byte index of its nearest of 256 k-means centroids (dim * 4 / m
+    times smaller than float32). Distances to a query are sums of m lookups
+    in a per-query table of query-to-centroid distances.
+    """
+
+    method = "pq"
+
+    def __init__(self, dim: int, m: int):
+        # m must divide dim: take the closest divisor at or below it
+        m = max(d for d in range(1, min(m, dim) + 1) if dim % d == 0)
+        self.dim = dim
+        self.m = m
+        self.code_size = m
+        self.sub_dim = dim // m
+        self.codebooks = None
+        self._squared = None  # squared norms of the centroids, for l2 tables
+        self._offsets = np.arange(m, dtype=np.intp) * 256
+
+    def _split(self, x: np.ndarray) -> np.ndarray:
+        return x.reshape(len(x), self.m, self.sub_dim)
+
+    def train(self, x: np.ndarray):
+        if len(x) < 256:
+            raise ValueError("Product quantization needs at least 256 vectors.")
+        parts = self._split(x)
+        self.codebooks = np.stack(
+            [
+                _kmeans(np.ascontiguousarray(parts[:, j]), 256, seed=j)
+                for j in range(self.m)
+            ]
+        ).astype(np.float32)
+        self._squared = (self.codebooks**2).sum(axis=2)
+
+    def encode(self, x: np.ndarray) -> np.ndarray:
+        parts = self._split(x)
+        codes = np.empty((len(x), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _nearest(parts[:, j], self.codebooks[j])
+        return codes
+
+    def table(self, query: np.ndarray, space: str) -> np.ndarray:
+        """(m, 256) distances of each query sub-vector to its centroids."""
+        dots = np.matmul(self.codebooks, query.reshape(self.m, self.sub_dim, 1))[..., 0]
+        if space == "l2":
+            sub_squared = (query.reshape(self.m, self.sub_dim) ** 2).sum(axis=1)
+            return sub_squared[:, None] - 2 * dots + self._squared
+        return -dots
+
+    def lookup(self, table: np.ndarray, codes: np.ndarray, space: str):
+        """Distances of the coded rows: one table lookup per sub-vector."""
+        total = table.ravel()[codes.astype(np.intp) + self._offsets].sum(axis=1)
+        return total if space == "l2" else 1 + total
+
+    def distances(self, query: np.ndarray, codes: np.ndarray, space: str):
+        """Asymmetric distances from a float query to the coded rows."""
+        return self.lookup(self.table(query, space), codes, space)
+
+    def state(self) -> dict:
+        return {"codebooks": self.codebooks}
+
+    def load(self, state: dict):
+        self.codebooks = state["codebooks"]
+        self._squared = (self.codebooks**2).sum(axis=2)
+
+
+class QuantizedIndex:
+    def __init__(
+        self,
+        directory: str,
+        dim: int,
+        vectors,
+        space: str = "cosine",
+        method: str = "sq8",
+        pq_m: int = 48,
+        nlist: int = 1024,
+        nprobe: int = 16,
+        train_size: int = 20000,
+        rescore: bool = True,
+        capacity: int = 1024,
+    ):
+        """
+        Approximate nearest-neighbour index over compressed vectors, with the
+        add_items / mark_deleted / knn_query interface of hnswlib.Index.
+
+        An IVF coarse quantizer (nlist k-means centroids) routes every row to
+        one list; a query scans the rows of its nprobe closest lists. Rows
+        are stored as sq8 or pq codes (pq of the residual to the list
+        centroid) in a memory-mapped file and scored
+        with asymmetric distance computation: the float query against the
+        codes, never decoding them to full vectors. With rescore, the best
+        max(ef, k) candidates are re-ranked by their exact distance, read
+        from the float32 rows of vectors() (memory-mapped too: only those
+        pages are touched).
+
+        Nothing is compressed until train_size rows were added; until then
+        queries scan the float32 rows exactly. Distances follow hnswlib:
+        1 - dot product for "cosine" and "ip", squared L2 for "l2".
+        """
+        self.directory = directory
+        self.dim = dim
+        self.vectors = vectors
+        self.space = space
+        self.method = method
+        self.nlist = nlist
+        self.nprobe = nprobe
+        # PQ fits 256 centroids per sub-vector
+        self.train_size = max(train_size, 256)
+        self.rescore = rescore
+        self.ef = 0
+        # PQ codes the residual to the row's list centroid, much finer than
+        # the vector itself; SQ8 is already fine-grained enough on vectors
+        self.residual = method == "pq"
+        if method == "pq":
+            self.quantizer = ProductQuantizer(dim, pq_m)
+        elif method == "sq8":
+            self.quantizer = ScalarQuantizer(dim)
+        else:
+            raise ValueError(f"Unknown quantization method '{method}'.")
+        self.centroids = None
+        # List of every row, -1 for rows that are not (or no longer) indexed
+        self._assign = np.full(capacity, -1, dtype=np.int32)
+        self._rows = 0
+        self._codes = None  # read-only memory map, remapped when the file grows
+        self._lists = None  # (rows ordered by list, list offsets), rebuilt lazily
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _prepare(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if self.space == "cosine":
+            x = x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+        return x
+
+    # Persistence
+
+    def load(self):
+        """Reopen the files written by an earlier instance."""
+        if os.path.exists(self._path("params.npz")):
+            with np.load(self._path("params.npz")) as params:
+                self.centroids = params["centroids"]
+                self.quantizer.load({key: params[key] for key in params.files})
+        if not os.path.exists(self._path("assign.i32")):
+            return
+        assign = np.fromfile(self._path("assign.i32"), dtype=np.int32)
+        self._rows = len(assign)
+        self.resize_index(max(len(self._assign), self._rows))
+        self._assign[: self._rows] = assign
+
+    def _save_params(self):
+        temporary = self._path("params.tmp.npz")
+        np.savez(temporary, centroids=self.centroids, **self.quantizer.state())
+        os.replace(temporary, self._path("params.npz"))
+
+    def _write(self, name: str, rows: np.ndarray, values: np.ndarray):
+        """Write values at rows of a fixed-width file, appending new rows."""
+        width = values.itemsize * (values.shape[1] if values.ndim > 1 else 1)
+        path = self._path(name)
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            for row, value in zip(rows, values):
+                f.seek(int(row) * width)
+                f.write(value.tobytes())
+
+    def _code_map(self):
+        if self._codes is None or self._codes.shape[0] < self._rows:
+            self._codes = np.memmap(
+                self._path("codes.u8"),
+                dtype=np.uint8,
+                mode="r",
+                shape=(self._rows, self.quantizer.code_size),
+            )
+        return self._codes
+
+    # hnswlib.Index interface
+
+    def get_max_elements(self) -> int:
+        return len(self._assign)
+
+    def resize_index(self, capacity: int):
+        grown = np.full(capacity, -1, dtype=np.int32)
+        grown[: len(self._assign)] = self._assign
+        self._assign = grown
+
+    def set_ef(self, ef: int):
+        """Candidates re-scored exactly per query (at least k)."""
+        self.ef = ef
+
+    def add_items(self, vectors, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        self._rows = max(self._rows, int(rows.max()) + 1)
+        if self._rows > len(self._assign):
+            self.resize_index(max(self._rows, 2 * len(self._assign)))
+        if not self.trained:
+            self._assign[rows] = 0
+            if np.count_nonzero(self._assign[: self._rows] >= 0) >= self.train_size:
+                self.train()
+            else:
+                self._write("assign.i32", rows, self._assign[rows])
+            return
+        self._assign[rows], codes = self._encode(self._prepare(vectors))
+        self._write("codes.u8", rows, codes)
+        self._write("assign.i32", rows, self._assign[rows])
+        self._lists = None
+
+    def mark_deleted(self, row: int):
+        self._assign[row] = -1
+        self._write("assign.i32", np.array([row]), self._assign[row : row + 1])
+        self._lists = None
+
+    def persist_dirty(self):
+        pass  # every write goes straight to its file
+
+    def close_file_handles(self):
+        self._codes = None
+
+    def train(self, sample_rows=None):
+        """
+        Fit the coarse centroids and the quantizer on sample_rows (default:
+        up to train_size live rows), then encode every live row.
+        """
+        live = np.flatnonzero(self._assign[: self._rows] >= 0)
+        if sample_rows is None:
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(
+                rng.choice(live, min(len(live), self.train_size), replace=False)
+            )
+        sample = self._prepare(self.vectors()[sample_rows])
+        # At least ~39 training points per centroid
+        nlist = max(1, min(self.nlist, len(sample) // 39))
+        logger.info(
+            f"Training {self.method} quantizer and {nlist} lists on "
+            f"{len(sample)} vectors."
+        )
+        self.centroids = _kmeans(sample, nlist)
+        if self.residual:
+            sample = sample - self.centroids[self._route(sample)]
+        self.quantizer.train(sample)
+        self._save_params()
+
+        self._assign[:] = -1
+        self._lists = None
+        self._codes = None
+        # Every live row gets its code (other rows keep zeroed slots)
+        with open(self._path("codes.u8"), "wb") as f:
+            f.truncate(self._rows * self.quantizer.code_size)
+        vectors = self.vectors()
+        for start in range(0, len(live), 10000):
+            batch = live[start : start + 10000]
+            self._assign[batch], codes = self._encode(self._prepare(vectors[batch]))
+            self._write("codes.u8", batch, codes)
+        self._assign[: self._rows].tofile(self._path("assign.i32"))
+
+    def _encode(self, x: np.ndarray):
+        """(list, code) of every row of x."""
+        lists = self._route(x)
+        if self.residual:
+            x = x - self.centroids[lists]
+        return lists, self.quantizer.encode(x)
+
+    def _route(self, x: np.ndarray) -> np.ndarray:
+        if self.space == "l2":
+            return _nearest(x, self.centroids).astype(np.int32)
+        return (x @ self.centroids.T).argmax(axis=1).astype(np.int32)
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            assign = self._assign[: self._rows]
+            order = np.argsort(assign, kind="stable").astype(np.int64)
+            ordered = assign[order]
+            offsets = np.searchsorted(ordered, np.arange(len(self.centroids) + 1))
+            self._lists = (order, offsets)
+        return self._lists
+
+    def _approximate(self, query: np.ndarray):
+        """
+        (rows, ADC distances) over the nprobe lists closest to query. Rows
+        of a list are in ascending order, so its codes are read front to
+        back.
+        """
+        order, offsets = self._inverted_lists()
+        if self.space == "l2":
+            closeness = -((self.centroids - query) ** 2).sum(axis=1)
+        else:
+            closeness = self.centroids @ query
+        nprobe = min(self.nprobe, len(self.centroids))
+        codes = self._code_map()
+        if self.residual and self.space != "l2":
+            # q . r does not depend on the list: one table for all of them
+            table = self.quantizer.table(query, self.space)
+        rows, scores = [], []
+        for i in np.argpartition(-closeness, nprobe - 1)[:nprobe]:
+            members = order[offsets[i] : offsets[i + 1]]
+            if not len(members):
+                continue
+            if not self.residual:
+                distances = self.quantizer.distances(query, codes[members], self.space)
+            elif self.space == "l2":
+                # ||q - (c + r)||^2 = ||(q - c) - r||^2
+                distances = self.quantizer.distances(
+                    query - self.centroids[i], codes[members], "l2"
+                )
+            else:
+                # 1 - q . (c + r) = (1 - q . r) - q . c
+                distances = (
+                    self.quantizer.lookup(table, codes[members], self.space)
+                    - closeness[i]
+                )
+            rows.append(members)
+            scores.append(distances)
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(scores)
+
+    def _exact(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        x = self._prepare(self.vectors()[rows])
+        if self.space == "l2":
+            return ((x - query) ** 2).sum(axis=1)
+        return 1 - x @ query
+
+    def knn_query(self, queries, k: int = 1):
+        """
+        (labels, distances) of the k nearest live rows per query, closest
+        first; rows past the number found are -1 with infinite distance.
+        """
+        queries = self._prepare(np.atleast_2d(queries))
+        labels = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        for n, query in enumerate(queries):
+            if not self.trained:
+                rows = np.flatnonzero(self._assign[: self._rows] >= 0)
+                scores = self._exact(query, rows)
+            else:
+                rows, scores = self._approximate(query)
+                keep = min(len(rows), max(self.ef, k))
+                if self.rescore and keep:
+                    best = np.argpartition(scores, keep - 1)[:keep]
+                    # Sorted rows read the float32 map front to back
+                    rows = np.sort(rows[best])
+                    scores = self._exact(query, rows)
+            found = min(k, len(rows))
+            if not found:
+                continue
+            best = np.argpartition(scores, found - 1)[:found]
+            best = best[np.argsort(scores[best], kind="stable")]
+            labels[n, :found] = rows[best]
+            distances[n, :found] = scores[best]
+        return labels, distances
+
+    def memory_usage(self) -> dict:
+        """Bytes held in RAM and in memory-mapped files (paged in on use)."""
+        state = self.quantizer.state()
+        in_memory = self._assign.nbytes + sum(
+            value.nbytes for value in state.values() if value is not None
+        )
+        if self.centroids is not None:
+            in_memory += self.centroids.nbytes
+        if self._lists is not None:
+            in_memory += sum(part.nbytes for part in self._lists)
+        return {
+            "in_memory_bytes": int(in_memory),
+            "codes_bytes": self._rows * self.quantizer.code_size if self.trained else 0,
+            "float32_bytes": self._rows * self.dim * 4,
+        }
@@ -11,6 +11,7 @@ parent_dir_path = os.path.dirname(current_dir_path)
 sys.path.insert(0, parent_dir_path)
 
 import redis
+import redis.asyncio as aioredis
 import json
 import os
 
@@ -18,6 +19,10 @@ import os
 class RedisClient:
     def __init__(self, host="localhost", port=6379, db=0):
         self.client = redis.Redis(host=host, port=port, db=db, decode_responses=True)
+        # Native asyncio client used by the async chat pipeline
+        self.async_client = aioredis.Redis(
+            host=host, port=port, db=db, decode_responses=True
+        )
 
     def store_chat_history(self, user_id, message, response):
         """Stores chat history for a user."""
@@ -40,3 +45,29 @@ class RedisClient:
         """Clears chat history for a user."""
         chat_key = f"chat:{user_id}"
         self.client.delete(chat_key)
+
+    async def store_chat_history_async(self, user_id, message, response):
+        """Stores chat history for a user without blocking the event loop."""
+        chat_key = f"chat:{user_id}"
+        chat_entry = {"message": message, "response": response}
+
+        # Append and trim in a single round trip
+        async with self.async_client.pipeline(transaction=False) as pipe:
+            pipe.rpush(chat_key, json.dumps(chat_entry))
+            pipe.ltrim(chat_key, -20, -1)
+            await pipe.execute()
+
+    async def get_chat_history_async(self, user_id, limit=5):
+        """Retrieves last N chat messages for context without blocking."""
+        chat_key = f"chat:{user_id}"
+        chat_history = await self.async_client.lrange(chat_key, -limit, -1)
+        return [json.loads(chat) for chat in chat_history] if chat_history else []
+
+    async def clear_chat_history_async(self, user_id):
+        """Clears chat history for a user without blocking."""
+        chat_key = f"chat:{user_id}"
+        await self.async_client.delete(chat_key)
+
+    async def close(self):
+        """Close the async connection pool."""
+        await self.async_client.aclose()
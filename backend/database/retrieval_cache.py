@@ -0,0 +1,144 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import msgpack
+import numpy as np
+import redis
+from backend.utils.config import (
+    RETRIEVAL_CACHE_REDIS,
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_TTL_SECONDS,
+)
+from backend.utils.logger import logger
+from backend.utils.metrics import CACHE_HITS, CACHE_MISSES
+
+
+class WriteVersion:
+    def __init__(self, path: str):
+        """
+        Monotonic write counter of a collection, shared by every process
+        using it. Each bump appends one byte to the file and the version is
+        the file size: appends are atomic, so concurrent writers never lose
+        an increment, and reading it is a single stat().
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def get(self) -> int:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def bump(self):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, b".")
+        finally:
+            os.close(fd)
+
+
+class RetrievalCache:
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl_seconds: float = 600,
+        redis_client=None,
+        prefix: str = "retrieval:",
+    ):
+        """
+        Retrieval results keyed on the query embedding (its float32 bytes),
+        k and, for text-aware retrieval, the query text.
+
+        Keys also carry the collection's write version, so any add, upsert
+        or delete makes older entries unreachable instead of stale; they age
+        out of the in-memory LRU and, when a (binary) Redis client is given,
+        the shared Redis tier (by TTL).
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(collection: str, version: int, embedding, top_k: int, query=None):
+        digest = hashlib.sha1(
+            np.ascontiguousarray(embedding, dtype=np.float32).tobytes()
+        )
+        digest.update(json.dumps([top_k, query]).encode("utf-8"))
+        return f"{collection}:{version}:{digest.hexdigest()}"
+
+    def get(self, key: str):
+        """Cached hits for key, or None."""
+        with self._lock:
+            hits = self._entries.get(key)
+            if hits is not None:
+                self._entries.move_to_end(key)
+        if hits is None and self.redis_client is not None:
+            hits = self._get_from_redis(key)
+            if hits is not None:
+                self._put_local(key, hits)
+        if hits is None:
+            CACHE_MISSES.inc(cache="retrieval")
+        else:
+            CACHE_HITS.inc(cache="retrieval")
+        return hits
+
+    def put(self, key: str, hits: list):
+        self._put_local(key, hits)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(
+                    self.prefix + key,
+                    msgpack.packb(hits),
+                    ex=max(1, int(self.ttl_seconds)),
+                )
+            except Exception as e:
+                logger.error(f"Error writing retrieval cache entry to Redis: {e}")
+
+    def _put_local(self, key: str, hits: list):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = hits
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_from_redis(self, key: str):
+        try:
+            payload = self.redis_client.get(self.prefix + key)
+            return None if payload is None else msgpack.unpackb(payload)
+        except Exception as e:
+            logger.error(f"Error reading retrieval cache entry from Redis: {e}")
+            return None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def create_retrieval_cache(host="localhost", port=6379, db=0) -> RetrievalCache:
+    """Build the retrieval cache from RETRIEVAL_CACHE_* settings."""
+    redis_client = (
+        redis.Redis(host=host, port=port, db=db, socket_timeout=0.05)
+        if RETRIEVAL_CACHE_REDIS
+        else None
+    )
+    return RetrievalCache(
+        RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL_SECONDS, redis_client
+    )
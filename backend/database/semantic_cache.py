@@ -0,0 +1,220 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import asyncio
+import hashlib
+import threading
+import time
+import msgpack
+import numpy as np
+import redis
+from backend.utils.config import (
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_REDIS,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL_SECONDS,
+)
+from backend.utils.logger import logger
+from backend.utils.metrics import CACHE_HITS, CACHE_MISSES, LATENCY_SAVED
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 10000,
+        ttl_seconds: float = 3600,
+        redis_client=None,
+        prefix: str = "semcache:",
+    ):
+        """
+        Validated answers looked up by cosine similarity of query embeddings.
+
+        Vectors live in a contiguous float32 matrix (grown by doubling up to
+        max_entries) so a lookup is a single matrix-vector product; slots are
+        recycled by TTL, then LRU. When a (binary) Redis client is given,
+        entries are also written to Redis and reloaded on startup.
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self.prefix = prefix
+
+        self._vectors = None  # allocated on first insert, once the dim is known
+        self._expires_at = np.zeros(0, dtype=np.float64)
+        self._last_used = np.zeros(0, dtype=np.float64)
+        self._values = []  # slot -> (query, response, cost_seconds)
+        self._keys = []  # slot -> entry key
+        self._slots = {}  # entry key -> slot
+        self._size = 0  # slots in use (including expired ones)
+        self._lock = threading.Lock()
+
+        if redis_client is not None:
+            self._load_from_redis()
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return hashlib.sha1(query.encode("utf-8")).hexdigest()
+
+    def lookup(self, embedding):
+        """Return the cached response closest to embedding, or None."""
+        vector = self._normalize(embedding) if len(embedding) else None
+        if vector is None or self._vectors is None:
+            CACHE_MISSES.inc(cache="semantic")
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            if vector.shape[0] != self._vectors.shape[1]:
+                CACHE_MISSES.inc(cache="semantic")
+                return None
+            if not self._size:
+                CACHE_MISSES.inc(cache="semantic")
+                return None
+            scores = self._vectors[: self._size] @ vector
+            # Expired slots never match
+            scores[self._expires_at[: self._size] <= now] = -1.0
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                CACHE_MISSES.inc(cache="semantic")
+                return None
+            self._last_used[slot] = now
+            _, response, cost = self._values[slot]
+
+        CACHE_HITS.inc(cache="semantic")
+        LATENCY_SAVED.inc(cost, cache="semantic")
+        return response
+
+    def put(self, query: str, embedding, response: str, cost_seconds: float = 0.0):
+        """Store a validated response; cost_seconds is what a hit will save."""
+        vector = self._normalize(embedding) if len(embedding) else None
+        if vector is None:
+            return
+        key = self._key(query)
+        expires_at = time.monotonic() + self.ttl_seconds
+        self._insert(key, vector, (query, response, cost_seconds), expires_at)
+
+        if self.redis_client is not None:
+            self._schedule_persist(key, vector, query, response, cost_seconds)
+
+    def _insert(self, key, vector, value, expires_at):
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((0, vector.shape[0]), dtype=np.float32)
+            elif vector.shape[0] != self._vectors.shape[1]:
+                logger.error("Semantic cache embedding dimension changed; skipping.")
+                return
+
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._free_slot()
+                old_key = self._keys[slot]
+                if old_key is not None:
+                    del self._slots[old_key]
+                self._slots[key] = slot
+                self._keys[slot] = key
+
+            self._vectors[slot] = vector
+            self._values[slot] = value
+            self._expires_at[slot] = expires_at
+            self._last_used[slot] = time.monotonic()
+
+    def _free_slot(self) -> int:
+        """Reuse an expired slot, else append one, else evict the LRU entry."""
+        expired = np.flatnonzero(self._expires_at[: self._size] <= time.monotonic())
+        if expired.size:
+            return int(expired[0])
+
+        if self._size < self.max_entries:
+            if self._size == self._vectors.shape[0]:
+                self._grow(min(self.max_entries, max(64, self._size * 2)))
+            self._size += 1
+            self._values.append(None)
+            self._keys.append(None)
+            return self._size - 1
+
+        return int(np.argmin(self._last_used[: self._size]))
+
+    def _grow(self, capacity: int):
+        vectors = np.zeros((capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        self._vectors = vectors
+        self._expires_at = np.resize(self._expires_at, capacity)
+        self._last_used = np.resize(self._last_used, capacity)
+
+    def _schedule_persist(self, key, vector, query, response, cost_seconds):
+        payload = msgpack.packb([vector.tobytes(), query, response, cost_seconds])
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None:
+            self._persist(key, payload)
+        else:
+            # Keep the Redis write off the request path
+            loop.run_in_executor(None, self._persist, key, payload)
+
+    def _persist(self, key, payload):
+        try:
+            self.redis_client.set(
+                self.prefix + key, payload, ex=max(1, int(self.ttl_seconds))
+            )
+        except Exception as e:
+            logger.error(f"Error persisting semantic cache entry: {e}")
+
+    def _load_from_redis(self):
+        """Reload persisted entries (with their remaining TTL) into the index."""
+        try:
+            loaded = 0
+            for redis_key in self.redis_client.scan_iter(f"{self.prefix}*", count=500):
+                payload = self.redis_client.get(redis_key)
+                ttl = self.redis_client.ttl(redis_key)
+                if payload is None or ttl is None or ttl <= 0:
+                    continue
+                raw, query, response, cost = msgpack.unpackb(payload)
+                vector = np.frombuffer(raw, dtype=np.float32)
+                self._insert(
+                    self._key(query),
+                    vector,
+                    (query, response, cost),
+                    time.monotonic() + ttl,
+                )
+                loaded += 1
+                if loaded >= self.max_entries:
+                    break
+            logger.info(f"Loaded {loaded} semantic cache entries from Redis.")
+        except Exception as e:
+            logger.error(f"Error loading semantic cache from Redis: {e}")
+
+    def __len__(self):
+        return int(np.count_nonzero(self._expires_at[: self._size] > time.monotonic()))
+
+
+def create_semantic_cache(host="localhost", port=6379, db=0) -> SemanticCache:
+    """Build the semantic cache from SEMANTIC_CACHE_* settings."""
+    redis_client = (
+        redis.Redis(host=host, port=port, db=db) if SEMANTIC_CACHE_REDIS else None
+    )
+    return SemanticCache(
+        SEMANTIC_CACHE_THRESHOLD,
+        SEMANTIC_CACHE_MAX_ENTRIES,
+        SEMANTIC_CACHE_TTL_SECONDS,
+        redis_client,
+    )
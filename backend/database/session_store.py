@@ -0,0 +1,147 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import threading
+import time
+from collections import OrderedDict
+import msgpack
+import redis
+import redis.asyncio as aioredis
+from backend.utils.config import (
+    SESSION_BACKEND,
+    SESSION_MAX_ENTRIES,
+    SESSION_TTL_SECONDS,
+)
+from backend.utils.logger import logger
+
+# Sessions are stored as a fixed-order tuple instead of a dict to keep entries small
+SESSION_FIELDS = ("user_id", "user_input", "response")
+
+
+class SessionStore:
+    """Interface for chat session lookups used by /feedback/."""
+
+    def set(self, session_id: str, session_data: dict):
+        raise NotImplementedError
+
+    def get(self, session_id: str):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    async def set_async(self, session_id: str, session_data: dict):
+        self.set(session_id, session_data)
+
+    async def get_async(self, session_id: str):
+        return self.get(session_id)
+
+    async def delete_async(self, session_id: str):
+        self.delete(session_id)
+
+    async def close(self):
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self, max_entries: int = 100000, ttl_seconds: float = 3600):
+        """Per-process LRU store with a size cap and per-entry TTL."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # session_id -> (expires_at, *fields)
+        self._lock = threading.Lock()
+
+    def set(self, session_id: str, session_data: dict):
+        entry = (time.monotonic() + self.ttl_seconds,) + tuple(
+            session_data.get(field) for field in SESSION_FIELDS
+        )
+        with self._lock:
+            self._entries[session_id] = entry
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, session_id: str):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+        return dict(zip(SESSION_FIELDS, entry[1:]))
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisSessionStore(SessionStore):
+    def __init__(
+        self,
+        host="localhost",
+        port=6379,
+        db=0,
+        ttl_seconds: float = 3600,
+        prefix: str = "session:",
+    ):
+        """Redis-backed store shared by all workers; entries expire via TTL."""
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+        # Binary clients: values are msgpack-encoded field tuples
+        self.client = redis.Redis(host=host, port=port, db=db)
+        self.async_client = aioredis.Redis(host=host, port=port, db=db)
+
+    def _encode(self, session_data: dict) -> bytes:
+        return msgpack.packb([session_data.get(field) for field in SESSION_FIELDS])
+
+    def _decode(self, value):
+        if value is None:
+            return None
+        return dict(zip(SESSION_FIELDS, msgpack.unpackb(value)))
+
+    def set(self, session_id: str, session_data: dict):
+        self.client.set(
+            self.prefix + session_id, self._encode(session_data), ex=self.ttl_seconds
+        )
+
+    def get(self, session_id: str):
+        return self._decode(self.client.get(self.prefix + session_id))
+
+    def delete(self, session_id: str):
+        self.client.delete(self.prefix + session_id)
+
+    async def set_async(self, session_id: str, session_data: dict):
+        await self.async_client.set(
+            self.prefix + session_id, self._encode(session_data), ex=self.ttl_seconds
+        )
+
+    async def get_async(self, session_id: str):
+        return self._decode(await self.async_client.get(self.prefix + session_id))
+
+    async def delete_async(self, session_id: str):
+        await self.async_client.delete(self.prefix + session_id)
+
+    async def close(self):
+        await self.async_client.aclose()
+
+
+def create_session_store(host="localhost", port=6379, db=0) -> SessionStore:
+    """Build the session store selected by SESSION_BACKEND."""
+    if SESSION_BACKEND == "redis":
+        logger.info("Using Redis session store.")
+        return RedisSessionStore(host, port, db, ttl_seconds=SESSION_TTL_SECONDS)
+    return InMemorySessionStore(SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS)
@@ -0,0 +1,981 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import json
+import shutil
+import sqlite3
+import threading
+import numpy as np
+from backend.utils.config import (
+    BM25_INDEX_DIR,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_M,
+    HNSW_SPACE,
+    HYBRID_LEXICAL_CANDIDATES,
+    HYBRID_LEXICAL_WEIGHT,
+    HYBRID_RRF_K,
+    HYBRID_VECTOR_CANDIDATES,
+    HYBRID_VECTOR_WEIGHT,
+    QUANT_METHOD,
+    QUANT_NLIST,
+    QUANT_NPROBE,
+    QUANT_PQ_M,
+    QUANT_RESCORE,
+    QUANT_RESCORE_CANDIDATES,
+    QUANT_TRAIN_SIZE,
+    RETRIEVAL_CACHE_ENABLED,
+    RETRIEVAL_COLLAPSE_DUPLICATES,
+    RETRIEVAL_MODE,
+    VECTOR_STORE,
+    VECTOR_STORE_DIR,
+)
+from backend.database.retrieval_cache import WriteVersion, create_retrieval_cache
+from backend.utils.dedup import collapse_duplicates
+from backend.utils.logger import logger
+
+
+def _hit(doc_id, document, metadata, distance) -> dict:
+    """One search result, the same shape for every backend."""
+    return {
+        "id": str(doc_id),
+        "document": document,
+        "metadata": metadata or {},
+        "distance": float(distance),
+    }
+
+
+def _as_matrix(embeddings):
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    return matrix[None, :] if matrix.ndim == 1 else matrix
+
+
+class VectorStore:
+    """
+    Common interface of the knowledge base backends.
+
+    Embeddings are float32 arrays (one row per item). search/batch_search
+    return lists of hits: {"id", "document", "metadata", "distance"}, closest
+    first, with distance in the backend's metric (lower is closer).
+    """
+
+    # Whether retrieve() results depend on the query text, not only on the
+    # embedding (part of retrieval cache keys)
+    uses_query_text = False
+    # retrieve_knowledge drops near-duplicate documents, fetching twice top_k
+    # hits to still return top_k
+    collapse_duplicates = RETRIEVAL_COLLAPSE_DUPLICATES
+    versions = None  # WriteVersion bumped after every write
+
+    def upsert(self, ids: list, embeddings, documents=None, metadatas=None) -> int:
+        """Insert or replace items; returns the number written."""
+        raise NotImplementedError
+
+    def add(self, ids: list, embeddings, documents=None, metadatas=None) -> int:
+        return self.upsert(ids, embeddings, documents, metadatas)
+
+    def delete(self, ids: list) -> int:
+        raise NotImplementedError
+
+    def batch_search(self, embeddings, top_k: int = 5) -> list:
+        """One list of hits per query row."""
+        raise NotImplementedError
+
+    def search(self, embedding, top_k: int = 5) -> list:
+        return self.batch_search(_as_matrix(embedding), top_k)[0]
+
+    def get(self, ids: list) -> list:
+        """{"id", "document", "metadata"} of the stored ids, unknown ids left out."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def version(self) -> int:
+        """Monotonic count of writes to the collection, from every process."""
+        return self.versions.get() if self.versions is not None else 0
+
+    def _bump_version(self):
+        if self.versions is not None:
+            self.versions.bump()
+
+    def close(self):
+        pass
+
+    def retrieve(self, queries: list, embeddings, top_k: int = 5) -> list:
+        """Hits per query for retrieval; plain vector stores ignore the text."""
+        return self.batch_search(embeddings, top_k)
+
+    def retrieve_knowledge(self, query, embedding_model, query_embedding=None, top_k=5):
+        """
+        Documents of the top_k items closest to the query. A precomputed
+        query_embedding skips the embedding step.
+        """
+        if query_embedding is None:
+            query_embedding = embedding_model.get_embedding(query)
+        if query_embedding is None or len(query_embedding) == 0:
+            logger.error("Query embedding is empty. Skipping retrieval.")
+            return []
+
+        try:
+            hits = self.retrieve(
+                [query], _as_matrix(query_embedding), self._fetch_k(top_k)
+            )[0]
+        except Exception as e:
+            logger.error(f"Error searching {type(self).__name__}: {e}")
+            return []
+        knowledge = self._documents(hits, top_k)
+        if not knowledge:
+            logger.warning("No relevant knowledge retrieved.")
+        return knowledge
+
+    def retrieve_knowledge_batch(
+        self, queries: list, embedding_model, query_embeddings=None, top_k=5
+    ):
+        """
+        Retrieve knowledge for many queries with a single batched retrieve().
+        Returns one list of documents per query, in input order.
+        """
+        knowledge = [[] for _ in queries]
+        if query_embeddings is None:
+            query_embeddings = embedding_model.get_embeddings(queries)
+
+        # Queries without a usable embedding (empty or zero row) get no knowledge
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        if query_embeddings.ndim != 2 or query_embeddings.shape[1] == 0:
+            return knowledge
+        valid = np.flatnonzero(query_embeddings.any(axis=1))
+        if not valid.size:
+            return knowledge
+
+        try:
+            results = self.retrieve(
+                [queries[i] for i in valid],
+                query_embeddings[valid],
+                self._fetch_k(top_k),
+            )
+        except Exception as e:
+            logger.error(f"Error searching {type(self).__name__}: {e}")
+            return knowledge
+        for i, hits in zip(valid, results):
+            knowledge[i] = self._documents(hits, top_k)
+        return knowledge
+
+    def _fetch_k(self, top_k: int) -> int:
+        return 2 * top_k if self.collapse_duplicates else top_k
+
+    def _documents(self, hits: list, top_k: int) -> list:
+        """Documents of the best top_k hits, near duplicates collapsed."""
+        documents = [hit["document"] for hit in hits if hit["document"]]
+        if self.collapse_duplicates:
+            documents = collapse_duplicates(documents)
+        return documents[:top_k]
+
+
+class ChromaVectorStore(VectorStore):
+    def __init__(self, client):
+        """VectorStore over a ChromaDBClient collection."""
+        self.client = client
+        self.versions = WriteVersion(
+            os.path.join(client.persist_directory, f"{client.collection_name}.version")
+        )
+
+    @property
+    def collection(self):
+        if self.client.collection is None:
+            raise RuntimeError("ChromaDB collection is not initialized.")
+        return self.client.collection
+
+    def upsert(self, ids: list, embeddings, documents=None, metadatas=None) -> int:
+        written = self.client.upsert_documents(ids, embeddings, documents, metadatas)
+        self._bump_version()
+        return written
+
+    def delete(self, ids: list) -> int:
+        self.collection.delete(ids=list(ids))
+        self._bump_version()
+        return len(ids)
+
+    def batch_search(self, embeddings, top_k: int = 5) -> list:
+        matrix = _as_matrix(embeddings)
+        results = self.collection.query(
+            query_embeddings=matrix,
+            n_results=top_k,
+            include=["documents", "metadatas", "distances"],
+        )
+        # Chroma returns one list per field, holding one list per query
+        results_per_query = []
+        for n, ids in enumerate(results["ids"]):
+            documents = (results.get("documents") or [None] * len(matrix))[n]
+            metadatas = (results.get("metadatas") or [None] * len(matrix))[n]
+            results_per_query.append(
+                [
+                    _hit(
+                        doc_id,
+                        documents[i] if documents else None,
+                        metadatas[i] if metadatas else None,
+                        results["distances"][n][i],
+                    )
+                    for i, doc_id in enumerate(ids)
+                ]
+            )
+        return results_per_query
+
+    def get(self, ids: list) -> list:
+        results = self.collection.get(ids=list(ids), include=["documents", "metadatas"])
+        documents = results.get("documents") or [None] * len(results["ids"])
+        metadatas = results.get("metadatas") or [None] * len(results["ids"])
+        return [
+            {"id": doc_id, "document": document, "metadata": metadata or {}}
+            for doc_id, document, metadata in zip(results["ids"], documents, metadatas)
+        ]
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+class MilvusVectorStore(VectorStore):
+    def __init__(
+        self,
+        client,
+        id_field: str = "id",
+        vector_field: str = "embedding",
+        text_field: str = "text",
+        metric_type: str = "L2",
+        version_path: str = None,
+    ):
+        """
+        VectorStore over a MilvusClient collection with an id field, a float
+        vector field and a text field. Metadata keys are written as extra
+        fields, which needs a collection with dynamic fields enabled. Writes
+        are counted in the version_path file.
+        """
+        self.client = client
+        self.id_field = id_field
+        self.vector_field = vector_field
+        self.text_field = text_field
+        self.metric_type = metric_type
+        self.versions = WriteVersion(version_path) if version_path else None
+
+    @property
+    def collection(self):
+        collection = getattr(self.client, "collection", None)
+        if collection is None:
+            raise RuntimeError("Milvus collection is not initialized.")
+        return collection
+
+    def upsert(self, ids: list, embeddings, documents=None, metadatas=None) -> int:
+        matrix = _as_matrix(embeddings)
+        rows = []
+        for i, doc_id in enumerate(ids):
+            row = dict(metadatas[i] or {}) if metadatas else {}
+            row[self.id_field] = doc_id
+            # pymilvus wants plain lists; convert only here, at the edge
+            row[self.vector_field] = matrix[i].tolist()
+            row[self.text_field] = documents[i] if documents else ""
+            rows.append(row)
+        self.collection.upsert(rows)
+        self._bump_version()
+        return len(rows)
+
+    def delete(self, ids: list) -> int:
+        self.collection.delete(expr=f"{self.id_field} in {json.dumps(list(ids))}")
+        self._bump_version()
+        return len(ids)
+
+    def batch_search(self, embeddings, top_k: int = 5) -> list:
+        results = self.collection.search(
+            data=_as_matrix(embeddings).tolist(),
+            anns_field=self.vector_field,
+            param={"metric_type": self.metric_type, "params": {"nprobe": 10}},
+            limit=top_k,
+            output_fields=[self.text_field],
+        )
+        return [
+            [
+                _hit(hit.id, hit.entity.get(self.text_field), None, hit.distance)
+                for hit in hits
+            ]
+            for hits in results
+        ]
+
+    def get(self, ids: list) -> list:
+        rows = self.collection.query(
+            expr=f"{self.id_field} in {json.dumps(list(ids))}",
+            output_fields=[self.id_field, self.text_field],
+        )
+        return [
+            {
+                "id": str(row[self.id_field]),
+                "document": row.get(self.text_field),
+                "metadata": {},
+            }
+            for row in rows
+        ]
+
+    def count(self) -> int:
+        return self.collection.num_entities
+
+
+class HnswVectorStore(VectorStore):
+    def __init__(
+        self,
+        directory: str,
+        space: str = "cosine",
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        initial_capacity: int = 1024,
+    ):
+        """
+        In-process vector store: an HNSW graph (chroma-hnswlib) over vectors
+        kept in a memory-mapped float32 file, with ids, documents and metadata
+        in SQLite. No separate service; small and medium corpora are searched
+        in well under a millisecond.
+
+        Every item owns a row of vectors.f32, which is also its HNSW label.
+        Upserts of known ids overwrite their row; deletes mark the label
+        deleted. The graph persists incrementally after each write; a store
+        left mid-write is rebuilt from vectors.f32 on the next open.
+        """
+        self.directory = directory
+        self.space = space
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.versions = WriteVersion(os.path.join(directory, "version"))
+        self.initial_capacity = initial_capacity
+        self._lock = threading.RLock()
+        self._index = None
+        self._vectors = None  # read-only memory map, remapped when the file grows
+
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(directory, "store.sqlite3"), check_same_thread=False
+        )
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+            "document TEXT, metadata TEXT);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        self.dim = self._meta("dim")
+        self._rows = self._meta("rows") or 0
+        self._count = self._db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        if self.dim is not None:
+            self._open_index()
+        logger.info(f"{type(self).__name__} at {directory} holds {self._count} items.")
+
+    # Bookkeeping
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _meta(self, key: str):
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set_meta(self, key: str, value):
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, json.dumps(value)),
+        )
+
+    def _rows_for(self, ids: list) -> dict:
+        """id -> row for the ids already stored."""
+        found = {}
+        for start in range(0, len(ids), 500):
+            chunk = list(ids[start : start + 500])
+            placeholders = ",".join("?" * len(chunk))
+            found.update(
+                self._db.execute(
+                    f"SELECT id, row FROM items WHERE id IN ({placeholders})", chunk
+                )
+            )
+        return found
+
+    # Index
+
+    def _new_index(self, capacity: int):
+        import hnswlib
+
+        shutil.rmtree(self._path("hnsw"), ignore_errors=True)
+        os.makedirs(self._path("hnsw"))
+        index = hnswlib.Index(space=self.space, dim=self.dim)
+        index.init_index(
+            max_elements=capacity,
+            M=self.M,
+            ef_construction=self.ef_construction,
+            is_persistent_index=True,
+            persistence_location=self._path("hnsw"),
+        )
+        return index
+
+    def _open_index(self):
+        import hnswlib
+
+        capacity = max(self.initial_capacity, self._rows)
+        if os.path.exists(self._path("hnsw/header.bin")) and not self._meta("dirty"):
+            self._index = hnswlib.Index(space=self.space, dim=self.dim)
+            self._index.load_index(
+                self._path("hnsw"), max_elements=capacity, is_persistent_index=True
+            )
+        else:
+            self._rebuild(capacity)
+        self._index.set_ef(self.ef_search)
+
+    def _rebuild(self, capacity: int):
+        """Re-create the graph from vectors.f32 and the live rows."""
+        logger.warning(f"Rebuilding HNSW index in {self.directory}.")
+        self._index = self._new_index(capacity)
+        rows = np.array(
+            [row for (row,) in self._db.execute("SELECT row FROM items ORDER BY row")],
+            dtype=np.int64,
+        )
+        vectors = self._vector_map()
+        for start in range(0, len(rows), 10000):
+            batch = rows[start : start + 10000]
+            self._index.add_items(vectors[batch], batch)
+        self._index.persist_dirty()
+        self._set_meta("dirty", False)
+        self._db.commit()
+
+    def _vector_map(self):
+        if self._vectors is None or self._vectors.shape[0] < self._rows:
+            self._vectors = (
+                np.memmap(
+                    self._path("vectors.f32"),
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(self._rows, self.dim),
+                )
+                if self._rows
+                else np.empty((0, self.dim), dtype=np.float32)
+            )
+        return self._vectors
+
+    def vectors(self):
+        """Memory-mapped (rows, dim) float32 vectors, indexed by row."""
+        with self._lock:
+            return self._vector_map()
+
+    # VectorStore
+
+    def upsert(self, ids: list, embeddings, documents=None, metadatas=None) -> int:
+        matrix = _as_matrix(embeddings)
+        if not len(ids):
+            return 0
+        if len(matrix) != len(ids):
+            raise ValueError("Expected one embedding per id.")
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(matrix.shape[1])
+                self._set_meta("dim", self.dim)
+                self._index = self._new_index(self.initial_capacity)
+                self._index.set_ef(self.ef_search)
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-d embeddings.")
+
+            # The last occurrence of a repeated id wins
+            latest = {doc_id: i for i, doc_id in enumerate(ids)}
+            positions = np.fromiter(latest.values(), dtype=np.int64)
+            existing = self._rows_for(list(latest))
+            rows = np.empty(len(positions), dtype=np.int64)
+            new = 0
+            for n, doc_id in enumerate(latest):
+                if doc_id in existing:
+                    rows[n] = existing[doc_id]
+                else:
+                    rows[n] = self._rows + new
+                    new += 1
+            vectors = np.ascontiguousarray(matrix[positions])
+
+            # Vectors first: rows past the committed count are simply ignored
+            mode = "r+b" if os.path.exists(self._path("vectors.f32")) else "w+b"
+            with open(self._path("vectors.f32"), mode) as f:
+                for row, vector in zip(rows, vectors):
+                    if row < self._rows:
+                        f.seek(int(row) * self.dim * 4)
+                        f.write(vector.tobytes())
+                f.seek(self._rows * self.dim * 4)
+                f.write(vectors[rows >= self._rows].tobytes())
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO items (row, id, document, metadata) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        int(row),
+                        doc_id,
+                        documents[i] if documents else None,
+                        json.dumps(metadatas[i])
+                        if metadatas and metadatas[i]
+                        else None,
+                    )
+                    for row, (doc_id, i) in zip(rows, latest.items())
+                ),
+            )
+            self._rows += new
+            self._count += new
+            self._set_meta("rows", self._rows)
+            self._set_meta("dirty", True)
+            self._db.commit()
+
+            if self._rows > self._index.get_max_elements():
+                self._index.resize_index(
+                    max(self._rows, 2 * self._index.get_max_elements())
+                )
+            self._index.add_items(vectors, rows)
+            self._index.persist_dirty()
+            self._set_meta("dirty", False)
+            self._db.commit()
+            self._bump_version()
+        return len(ids)
+
+    def delete(self, ids: list) -> int:
+        with self._lock:
+            rows = self._rows_for(list(ids))
+            if not rows:
+                return 0
+            self._set_meta("dirty", True)
+            self._db.executemany(
+                "DELETE FROM items WHERE row = ?", ((row,) for row in rows.values())
+            )
+            self._db.commit()
+            for row in rows.values():
+                self._index.mark_deleted(row)
+            self._count -= len(rows)
+            self._index.persist_dirty()
+            self._set_meta("dirty", False)
+            self._db.commit()
+            self._bump_version()
+        return len(rows)
+
+    def batch_search(self, embeddings, top_k: int = 5) -> list:
+        matrix = _as_matrix(embeddings)
+        with self._lock:
+            k = min(top_k, self._count)
+            if self._index is None or k <= 0:
+                return [[] for _ in matrix]
+            # Every call sets ef: a larger top_k must not stick for later ones
+            self._index.set_ef(max(self.ef_search, k))
+            labels, distances = self._index.knn_query(matrix, k=k)
+
+            wanted = sorted({int(label) for label in labels.ravel()})
+            placeholders = ",".join("?" * len(wanted))
+            items = {
+                row: (doc_id, document, metadata)
+                for row, doc_id, document, metadata in self._db.execute(
+                    "SELECT row, id, document, metadata FROM items "
+                    f"WHERE row IN ({placeholders})",
+                    wanted,
+                )
+            }
+
+        results = []
+        for query_labels, query_distances in zip(labels, distances):
+            hits = []
+            for label, distance in zip(query_labels, query_distances):
+                item = items.get(int(label))
+                if item is None:
+                    continue
+                doc_id, document, metadata = item
+                hits.append(
+                    _hit(
+                        doc_id,
+                        document,
+                        json.loads(metadata) if metadata else None,
+                        distance,
+                    )
+                )
+            results.append(hits)
+        return results
+
+    def get(self, ids: list) -> list:
+        found = []
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = list(ids[start : start + 500])
+                placeholders = ",".join("?" * len(chunk))
+                found.extend(
+                    self._db.execute(
+                        f"SELECT id, document, metadata FROM items WHERE id IN ({placeholders})",
+                        chunk,
+                    )
+                )
+        return [
+            {
+                "id": doc_id,
+                "document": document,
+                "metadata": json.loads(metadata) if metadata else {},
+            }
+            for doc_id, document, metadata in found
+        ]
+
+    def count(self) -> int:
+        return self._count
+
+    def close(self):
+        with self._lock:
+            if self._index is not None:
+                self._index.persist_dirty()
+                self._index.close_file_handles()
+            self._db.close()
+
+
+class QuantizedVectorStore(HnswVectorStore):
+    def __init__(
+        self,
+        directory: str,
+        space: str = "cosine",
+        method: str = "sq8",
+        pq_m: int = 48,
+        nlist: int = 1024,
+        nprobe: int = 16,
+        train_size: int = 20000,
+        rescore: bool = True,
+        rescore_candidates: int = 64,
+        initial_capacity: int = 1024,
+    ):
+        """
+        The HNSW store's layout (vectors.f32 and SQLite) with a
+        QuantizedIndex in place of the graph, for corpora whose float32
+        vectors don't fit in RAM. Only the codes (sq8: 1 byte per
+        dimension; pq: pq_m bytes per vector) are scanned; the float32 rows
+        stay on disk and are read for the rescore_candidates best
+        candidates of a query only.
+        """
+        self.method = method
+        self.pq_m = pq_m
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.rescore = rescore
+        super().__init__(
+            directory,
+            space=space,
+            ef_search=rescore_candidates,
+            initial_capacity=initial_capacity,
+        )
+
+    def _settings(self) -> list:
+        """What the stored codes depend on; a change forces a rebuild."""
+        return [self.space, self.method, self.pq_m, self.nlist]
+
+    def _new_index(self, capacity: int):
+        shutil.rmtree(self._path("quantized"), ignore_errors=True)
+        self._set_meta("quantization", self._settings())
+        return self._quantized_index(capacity)
+
+    def _quantized_index(self, capacity: int):
+        from backend.database.quantized_index import QuantizedIndex
+
+        return QuantizedIndex(
+            self._path("quantized"),
+            self.dim,
+            self._vector_map,
+            space=self.space,
+            method=self.method,
+            pq_m=self.pq_m,
+            nlist=self.nlist,
+            nprobe=self.nprobe,
+            train_size=self.train_size,
+            rescore=self.rescore,
+            capacity=capacity,
+        )
+
+    def _open_index(self):
+        capacity = max(self.initial_capacity, self._rows)
+        if (
+            os.path.exists(self._path("quantized/assign.i32"))
+            and not self._meta("dirty")
+            and self._meta("quantization") == self._settings()
+        ):
+            self._index = self._quantized_index(capacity)
+            self._index.load()
+        else:
+            self._rebuild(capacity)
+        self._index.set_ef(self.ef_search)
+
+    def _rebuild(self, capacity: int):
+        """Re-create the index, trained on a sample of every live row."""
+        logger.warning(f"Rebuilding quantized index in {self.directory}.")
+        self._index = self._new_index(capacity)
+        rows = np.array(
+            [row for (row,) in self._db.execute("SELECT row FROM items ORDER BY row")],
+            dtype=np.int64,
+        )
+        if len(rows) >= self._index.train_size:
+            sample = np.random.default_rng(0).choice(
+                rows, self._index.train_size, replace=False
+            )
+            self._index.train(np.sort(sample))
+        vectors = self._vector_map()
+        for start in range(0, len(rows), 10000):
+            batch = rows[start : start + 10000]
+            self._index.add_items(vectors[batch], batch)
+        self._set_meta("dirty", False)
+        self._db.commit()
+
+    def set_rescore(self, rescore: bool):
+        """Turn exact re-ranking of the best candidates on or off."""
+        with self._lock:
+            self.rescore = rescore
+            if self._index is not None:
+                self._index.rescore = rescore
+
+    def retrain(self):
+        """Refit the quantizer on a fresh sample, e.g. after the corpus grew."""
+        with self._lock:
+            self._set_meta("dirty", True)
+            self._db.commit()
+            self._rebuild(max(self.initial_capacity, self._rows))
+            self._index.set_ef(self.ef_search)
+            self._bump_version()
+
+    def memory_usage(self) -> dict:
+        with self._lock:
+            return self._index.memory_usage() if self._index is not None else {}
+
+
+class HybridVectorStore(VectorStore):
+    uses_query_text = True
+
+    def __init__(
+        self,
+        store: VectorStore,
+        lexical_index,
+        vector_candidates: int = HYBRID_VECTOR_CANDIDATES,
+        lexical_candidates: int = HYBRID_LEXICAL_CANDIDATES,
+        rrf_k: int = HYBRID_RRF_K,
+        vector_weight: float = HYBRID_VECTOR_WEIGHT,
+        lexical_weight: float = HYBRID_LEXICAL_WEIGHT,
+    ):
+        """
+        Vector store plus a BM25Index over the same chunk ids. Writes go to
+        both, so ingestion builds the lexical index as it goes. Retrieval
+        takes vector_candidates nearest neighbours and lexical_candidates
+        BM25 matches and fuses them with reciprocal rank fusion: a chunk
+        scores the sum of weight / (rrf_k + rank) over the lists it is in.
+        Exact tokens such as product codes and error strings are found by
+        BM25 even when their embedding is not close to the query's.
+
+        The BM25 index is written first, so the store's version only moves
+        once both sides hold the change.
+        """
+        self.store = store
+        self.lexical_index = lexical_index
+        self.vector_candidates = vector_candidates
+        self.lexical_candidates = lexical_candidates
+        self.rrf_k = rrf_k
+        self.vector_weight = vector_weight
+        self.lexical_weight = lexical_weight
+
+    def upsert(self, ids: list, embeddings, documents=None, metadatas=None) -> int:
+        if documents:
+            self.lexical_index.upsert(ids, documents)
+        else:
+            # No text to match on: drop the ids' earlier text from BM25
+            self.lexical_index.delete(ids)
+        return self.store.upsert(ids, embeddings, documents, metadatas)
+
+    def delete(self, ids: list) -> int:
+        self.lexical_index.delete(ids)
+        return self.store.delete(ids)
+
+    def batch_search(self, embeddings, top_k: int = 5) -> list:
+        return self.store.batch_search(embeddings, top_k)
+
+    def get(self, ids: list) -> list:
+        return self.store.get(ids)
+
+    def count(self) -> int:
+        return self.store.count()
+
+    def version(self) -> int:
+        return self.store.version()
+
+    def close(self):
+        self.lexical_index.close()
+        self.store.close()
+
+    def retrieve(self, queries: list, embeddings, top_k: int = 5) -> list:
+        """
+        Fused hits per query, best first. Hits carry an RRF "score"; those
+        found only by BM25 have no vector "distance" (None).
+        """
+        vector_hits = self.store.batch_search(
+            embeddings, max(top_k, self.vector_candidates)
+        )
+        fused_per_query = []
+        missing = set()
+        for query, hits in zip(queries, vector_hits):
+            scores = {}
+            by_id = {}
+            for rank, hit in enumerate(hits, 1):
+                scores[hit["id"]] = self.vector_weight / (self.rrf_k + rank)
+                by_id[hit["id"]] = hit
+            lexical = self.lexical_index.search(
+                query, max(top_k, self.lexical_candidates)
+            )
+            for rank, (doc_id, _) in enumerate(lexical, 1):
+                scores[doc_id] = scores.get(doc_id, 0.0) + self.lexical_weight / (
+                    self.rrf_k + rank
+                )
+            best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+            missing.update(doc_id for doc_id in best if doc_id not in by_id)
+            fused_per_query.append((best, scores, by_id))
+
+        # Documents of BM25-only hits, fetched once for the whole batch
+        stored = (
+            {item["id"]: item for item in self.store.get(list(missing))}
+            if missing
+            else {}
+        )
+        results = []
+        for best, scores, by_id in fused_per_query:
+            hits = []
+            for doc_id in best:
+                hit = by_id.get(doc_id) or stored.get(doc_id)
+                if hit is None:
+                    continue  # in the BM25 index but no longer in the store
+                hits.append({"distance": None, **hit, "score": scores[doc_id]})
+            results.append(hits)
+        return results
+
+
+class CachedVectorStore(VectorStore):
+    def __init__(self, store: VectorStore, cache, collection_name: str):
+        """
+        Store whose retrieve() results are served from a RetrievalCache.
+        Keys carry the store's write version, so results are never reused
+        across an add, upsert or delete, including ones made by another
+        process (e.g. the ingestion CLI).
+        """
+        self.store = store
+        self.cache = cache
+        self.collection_name = collection_name
+        self.uses_query_text = store.uses_query_text
+
+    def upsert(self, ids: list, embeddings, documents=None, metadatas=None) -> int:
+        return self.store.upsert(ids, embeddings, documents, metadatas)
+
+    def delete(self, ids: list) -> int:
+        return self.store.delete(ids)
+
+    def batch_search(self, embeddings, top_k: int = 5) -> list:
+        return self.store.batch_search(embeddings, top_k)
+
+    def get(self, ids: list) -> list:
+        return self.store.get(ids)
+
+    def count(self) -> int:
+        return self.store.count()
+
+    def version(self) -> int:
+        return self.store.version()
+
+    def close(self):
+        self.store.close()
+
+    def retrieve(self, queries: list, embeddings, top_k: int = 5) -> list:
+        matrix = _as_matrix(embeddings)
+        # Read before searching: a write landing meanwhile moves the version,
+        # so what is stored under this one is never served after it
+        version = self.store.version()
+        keys = [
+            self.cache.key(
+                self.collection_name,
+                version,
+                embedding,
+                top_k,
+                query if self.uses_query_text else None,
+            )
+            for query, embedding in zip(queries, matrix)
+        ]
+        results = [self.cache.get(key) for key in keys]
+        misses = [i for i, hits in enumerate(results) if hits is None]
+        if misses:
+            found = self.store.retrieve(
+                [queries[i] for i in misses], matrix[misses], top_k
+            )
+            for i, hits in zip(misses, found):
+                self.cache.put(keys[i], hits)
+                results[i] = hits
+        return results
+
+
+def create_vector_store(
+    collection_name: str = "my_knowledge_base",
+    backend: str = VECTOR_STORE,
+    mode: str = RETRIEVAL_MODE,
+) -> VectorStore:
+    """
+    Build the knowledge base store selected by VECTOR_STORE, wrapped with a
+    BM25 index when RETRIEVAL_MODE is "hybrid" and with the retrieval cache
+    when RETRIEVAL_CACHE_ENABLED.
+    """
+    if backend == "hnsw":
+        store = HnswVectorStore(
+            os.path.join(VECTOR_STORE_DIR, collection_name),
+            space=HNSW_SPACE,
+            M=HNSW_M,
+            ef_construction=HNSW_EF_CONSTRUCTION,
+            ef_search=HNSW_EF_SEARCH,
+        )
+    elif backend == "quantized":
+        store = QuantizedVectorStore(
+            os.path.join(VECTOR_STORE_DIR, collection_name),
+            space=HNSW_SPACE,
+            method=QUANT_METHOD,
+            pq_m=QUANT_PQ_M,
+            nlist=QUANT_NLIST,
+            nprobe=QUANT_NPROBE,
+            train_size=QUANT_TRAIN_SIZE,
+            rescore=QUANT_RESCORE,
+            rescore_candidates=QUANT_RESCORE_CANDIDATES,
+        )
+    elif backend == "milvus":
+        from backend.database.milvus_client import MilvusClient
+
+        store = MilvusVectorStore(
+            MilvusClient(
+                os.getenv("milv_host"),
+                os.getenv("milv_port"),
+                os.getenv("milv_collection_name") or collection_name,
+            ),
+            version_path=os.path.join(VECTOR_STORE_DIR, f"{collection_name}.version"),
+        )
+    else:
+        from backend.database.chromadb_client import ChromaDBClient
+
+        store = ChromaVectorStore(ChromaDBClient(collection_name))
+
+    if mode == "hybrid":
+        from backend.database.bm25_index import BM25Index
+
+        store = HybridVectorStore(
+            store, BM25Index(os.path.join(BM25_INDEX_DIR, collection_name))
+        )
+    if RETRIEVAL_CACHE_ENABLED:
+        store = CachedVectorStore(
+            store,
+            create_retrieval_cache(
+                os.getenv("REDIS_HOST") or "localhost",
+                int(os.getenv("REDIS_PORT") or 6379),
+            ),
+            collection_name,
+        )
+    return store
@@ -9,40 +9,191 @@ current_dir_path = os.path.dirname(current_file_path)
 parent_dir_path = os.path.dirname(current_dir_path)
 # Add the parent directory path to the sys.path
 sys.path.insert(0, parent_dir_path)
-from backend.models.transformers import TransformerModel
+import numpy as np
+from backend.utils.config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_DEVICE,
+    EMBEDDING_MAX_SEQ_LENGTH,
+    EMBEDDING_MODEL,
+    EMBEDDING_NORMALIZE,
+)
 from backend.utils.logger import logger
 
+# Returned for a text that could not be embedded (len() == 0)
+EMPTY_EMBEDDING = np.empty(0, dtype=np.float32)
+EMPTY_EMBEDDING.setflags(write=False)
+
+
+def as_vector(embedding):
+    """
+    View a backend's embedding as a 1-D float32 array, copying only when the
+    dtype or layout requires it. Returns EMPTY_EMBEDDING when unusable.
+    """
+    if embedding is None:
+        return EMPTY_EMBEDDING
+    vector = np.asarray(embedding, dtype=np.float32)
+    if vector.ndim == 2 and vector.shape[0] == 1:
+        vector = vector[0]
+    if vector.ndim != 1 or vector.size == 0:
+        return EMPTY_EMBEDDING
+    return np.ascontiguousarray(vector)
+
 
 class EmbeddingModel:
-    def __init__(self, transformer_model: TransformerModel):
-        """Initialize the embedding model using a TransformerModel instance."""
+    def __init__(self, backend, cache=None):
+        """
+        Initialize the embedding model on top of an embedding backend: a
+        SentenceEncoder, or a TransformerModel for the legacy LM embeddings.
+        An optional EmbeddingCache is consulted before the backend is called.
+
+        Embeddings are float32 NumPy arrays end to end (1-D for one text,
+        2-D for a batch); vector store adapters convert them only if their
+        client needs Python lists.
+        """
+        self.cache = cache
         try:
-            if not isinstance(transformer_model, TransformerModel):
-                raise TypeError("Expected a TransformerModel instance.")
-            self.model = transformer_model
+            if not callable(getattr(backend, "get_embedding", None)):
+                raise TypeError("Expected an embedding backend with get_embedding.")
+            self.model = backend
             logger.info("EmbeddingModel initialized successfully.")
         except Exception as e:
             logger.error(f"Error initializing EmbeddingModel: {e}")
             self.model = None
 
     def get_embedding(self, text: str):
-        """Get the embedding for a given text."""
+        """
+        Get the embedding for a given text as a 1-D float32 array (empty if
+        the text could not be embedded).
+        """
         if not self.model:
             logger.error("EmbeddingModel is not initialized correctly.")
-            return []
+            return EMPTY_EMBEDDING
+
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached
+
+        embedding = self._compute_embedding(text)
+        if len(embedding) and self.cache is not None:
+            self.cache.put(text, embedding)
+        return embedding
 
+    def _compute_embedding(self, text: str):
         try:
-            embedding = self.model.get_embedding(text)
-            if (
-                embedding is None
-                or not isinstance(embedding, list)
-                or len(embedding) == 0
-            ):
+            embedding = as_vector(self.model.get_embedding(text))
+            if len(embedding) == 0:
                 logger.error(
                     f"Embedding model returned invalid embedding for text: {text}"
                 )
-                return []  # Consider returning None or specific error code if you want to distinguish this case
             return embedding
         except Exception as e:
             logger.error(f"Error getting embedding for text '{text}': {e}")
-            return []
+            return EMPTY_EMBEDDING
+
+    def get_embeddings(self, texts: list, batch_size: int = EMBEDDING_BATCH_SIZE):
+        """
+        Get embeddings for many texts, batch_size texts per model call.
+        Returns a contiguous float32 array of shape (len(texts), dim) in input
+        order; rows of texts that could not be embedded are all zeros.
+        """
+        if not self.model:
+            logger.error("EmbeddingModel is not initialized correctly.")
+            return np.zeros((len(texts), 0), dtype=np.float32)
+
+        if self.cache is None:
+            return self._compute_embeddings(texts, batch_size)
+
+        cached = self.cache.get_many(texts)
+        missing = [i for i, embedding in enumerate(cached) if embedding is None]
+        if not missing:
+            return _stack(cached)
+        computed = self._compute_embeddings([texts[i] for i in missing], batch_size)
+        self.cache.put_many([texts[i] for i in missing], computed)
+        for i, embedding in zip(missing, computed):
+            cached[i] = embedding
+        return _stack(cached)
+
+    def _compute_embeddings(self, texts: list, batch_size: int):
+        """
+        Embed texts straight into one preallocated (n, dim) float32 matrix,
+        allocated once the first batch reveals the dimension.
+        """
+        matrix = None
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start : start + batch_size]
+            try:
+                rows = self.model.get_embeddings(batch)
+            except Exception as e:
+                logger.error(f"Error getting batch embeddings: {e}")
+                rows = None
+
+            if rows is None or len(rows) != len(batch):
+                # Fall back to one call per text so one bad input fails alone
+                rows = [self._compute_embedding(text) for text in batch]
+            elif not (isinstance(rows, np.ndarray) and rows.ndim == 2):
+                rows = [as_vector(row) for row in rows]
+
+            if matrix is None:
+                dim = next((len(row) for row in rows if len(row)), 0)
+                if not dim:
+                    continue
+                matrix = np.zeros((len(texts), dim), dtype=np.float32)
+
+            if isinstance(rows, np.ndarray) and rows.shape[1] == matrix.shape[1]:
+                matrix[start : start + len(batch)] = rows
+            else:
+                for offset, row in enumerate(rows):
+                    if len(row) == matrix.shape[1]:
+                        matrix[start + offset] = row
+        if matrix is None:
+            return np.zeros((len(texts), 0), dtype=np.float32)
+        return matrix
+
+
+def _stack(embeddings: list):
+    """Copy per-text vectors into one (n, dim) float32 matrix; bad rows stay 0."""
+    dim = next((len(e) for e in embeddings if len(e)), 0)
+    matrix = np.zeros((len(embeddings), dim), dtype=np.float32)
+    for i, embedding in enumerate(embeddings):
+        if len(embedding) == dim:
+            matrix[i] = embedding
+    return matrix
+
+
+def create_embedding_model(get_transformer_model=None) -> EmbeddingModel:
+    """
+    Build the EmbeddingModel selected by EMBEDDING_BACKEND (with its cache).
+    The legacy "transformer" backend reuses the generation model returned by
+    get_transformer_model when given, else loads transformer_model_name.
+    """
+    if EMBEDDING_BACKEND == "transformer":
+        # Legacy: mean-pooled hidden states of the generation model
+        if get_transformer_model is not None:
+            backend = get_transformer_model()
+        else:
+            from backend.models.transformers import TransformerModel
+
+            backend = TransformerModel(os.getenv("transformer_model_name"))
+    elif EMBEDDING_BACKEND == "onnx":
+        from backend.models.onnx_encoder import create_onnx_encoder
+
+        backend = create_onnx_encoder()
+    else:
+        from backend.models.encoder import SentenceEncoder
+
+        backend = SentenceEncoder(
+            EMBEDDING_MODEL,
+            max_seq_length=EMBEDDING_MAX_SEQ_LENGTH,
+            normalize=EMBEDDING_NORMALIZE,
+            device=EMBEDDING_DEVICE,
+        )
+
+    cache = None
+    if EMBEDDING_CACHE_ENABLED:
+        from backend.database.embedding_cache import create_embedding_cache
+
+        cache = create_embedding_cache(backend.model_id)
+    return EmbeddingModel(backend, cache)
@@ -0,0 +1,82 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import numpy as np
+from backend.utils.config import EMBEDDING_BATCH_SIZE
+from backend.utils.logger import logger
+
+
+class SentenceEncoder:
+    def __init__(
+        self,
+        model_name: str,
+        max_seq_length: int = 256,
+        normalize: bool = True,
+        device: str = None,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+    ):
+        """
+        Encoder-only sentence embedding model (sentence-transformers).
+
+        Token embeddings are mean-pooled over the attention mask and, when
+        normalize is set, L2-normalized so a dot product is the cosine
+        similarity. Inputs longer than max_seq_length tokens are truncated.
+        """
+        try:
+            from sentence_transformers import SentenceTransformer, models
+
+            word_embeddings = models.Transformer(
+                model_name, max_seq_length=max_seq_length
+            )
+            pooling = models.Pooling(
+                word_embeddings.get_word_embedding_dimension(), pooling_mode="mean"
+            )
+            modules = [word_embeddings, pooling]
+            if normalize:
+                modules.append(models.Normalize())
+
+            self.model = SentenceTransformer(modules=modules, device=device)
+            self.model_name = model_name
+            # Everything that changes the vectors, for cache keys
+            self.model_id = (
+                f"sentence-transformers:{model_name}:"
+                f"seq={max_seq_length}:norm={int(normalize)}"
+            )
+            self.batch_size = batch_size
+            self.dimension = pooling.get_sentence_embedding_dimension()
+            logger.info(
+                f"SentenceEncoder '{model_name}' loaded "
+                f"(dim={self.dimension}, max_seq_length={max_seq_length})."
+            )
+        except Exception as e:
+            logger.error(f"Error initializing SentenceEncoder: {e}")
+            raise RuntimeError("Failed to load sentence embedding model.")
+
+    def get_embeddings(self, texts: list):
+        """Embed texts in batches; returns a float32 array of shape (n, dim)."""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        embeddings = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def get_embedding(self, text: str):
+        """Embed a single text; returns a 1-D float32 array."""
+        try:
+            return self.get_embeddings([text])[0]
+        except Exception as e:
+            logger.error(f"Error getting embedding: {e}")
+            return None
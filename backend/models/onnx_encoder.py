@@ -0,0 +1,268 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import argparse
+import json
+import numpy as np
+from backend.utils.config import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_SEQ_LENGTH,
+    EMBEDDING_MODEL,
+    EMBEDDING_NORMALIZE,
+    EMBEDDING_ONNX_DIR,
+    EMBEDDING_ONNX_MIN_COSINE,
+    EMBEDDING_ONNX_QUANTIZED,
+    EMBEDDING_ONNX_THREADS,
+)
+from backend.utils.logger import logger
+
+FP32_MODEL = "model.onnx"
+INT8_MODEL = "model.int8.onnx"
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True) -> str:
+    """
+    Export the Hugging Face encoder behind model_name to ONNX (dynamic batch
+    and sequence axes), save its fast tokenizer next to it and, if quantize
+    is set, write a dynamically int8-quantized copy. Returns output_dir.
+
+    Needs torch, transformers and onnx (for quantize); serving the result
+    only needs onnxruntime and tokenizers.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["An example sentence."], return_tensors="pt")
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, FP32_MODEL),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+    tokenizer.save_pretrained(output_dir)
+
+    with open(os.path.join(output_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "model_name": model_name,
+                "inputs": input_names,
+                "pad_token": tokenizer.pad_token,
+                "pad_token_id": tokenizer.pad_token_id,
+                "dim": model.config.hidden_size,
+            },
+            f,
+        )
+    logger.info(f"Exported '{model_name}' to ONNX in {output_dir}.")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        # Weights stored as int8, activations quantized on the fly per batch
+        quantize_dynamic(
+            os.path.join(output_dir, FP32_MODEL),
+            os.path.join(output_dir, INT8_MODEL),
+            weight_type=QuantType.QInt8,
+        )
+        logger.info(f"Wrote int8 model to {os.path.join(output_dir, INT8_MODEL)}.")
+    return output_dir
+
+
+class OnnxEncoder:
+    def __init__(
+        self,
+        model_dir: str,
+        max_seq_length: int = 256,
+        normalize: bool = True,
+        quantized: bool = True,
+        intra_op_threads: int = 0,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+    ):
+        """
+        Sentence embeddings served by onnxruntime on CPU from a model written
+        by export_onnx. Same pooling as SentenceEncoder: mean over the
+        attention mask, then optional L2 normalization. intra_op_threads=0
+        lets onnxruntime use every core.
+        """
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            with open(os.path.join(model_dir, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            self.input_names = meta["inputs"]
+            self.dimension = meta["dim"]
+
+            self.tokenizer = Tokenizer.from_file(
+                os.path.join(model_dir, "tokenizer.json")
+            )
+            self.tokenizer.enable_truncation(max_length=max_seq_length)
+            self.tokenizer.enable_padding(
+                pad_id=meta["pad_token_id"] or 0, pad_token=meta["pad_token"] or "[PAD]"
+            )
+
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = intra_op_threads
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            model_file = INT8_MODEL if quantized else FP32_MODEL
+            self.session = ort.InferenceSession(
+                os.path.join(model_dir, model_file),
+                options,
+                providers=["CPUExecutionProvider"],
+            )
+
+            self.normalize = normalize
+            self.batch_size = batch_size
+            self.model_name = meta["model_name"]
+            # Quantized vectors differ slightly, so they get their own cache keys
+            self.model_id = (
+                f"onnx{'-int8' if quantized else ''}:{self.model_name}:"
+                f"seq={max_seq_length}:norm={int(normalize)}"
+            )
+            logger.info(
+                f"OnnxEncoder loaded {model_file} for '{self.model_name}' "
+                f"(intra_op_threads={intra_op_threads or 'auto'})."
+            )
+        except Exception as e:
+            logger.error(f"Error initializing OnnxEncoder: {e}")
+            raise RuntimeError("Failed to load ONNX embedding model.")
+
+    def get_embeddings(self, texts: list):
+        """Embed texts in batches; returns a float32 array of shape (n, dim)."""
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = list(texts[start : start + self.batch_size])
+            embeddings[start : start + len(batch)] = self._encode(batch)
+        return embeddings
+
+    def _encode(self, texts: list):
+        encodings = self.tokenizer.encode_batch(texts)
+        features = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encodings], dtype=np.int64
+            ),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        (hidden_states,) = self.session.run(
+            ["last_hidden_state"], {name: features[name] for name in self.input_names}
+        )
+
+        mask = features["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden_states * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled
+
+    def get_embedding(self, text: str):
+        """Embed a single text; returns a 1-D float32 array."""
+        try:
+            return self.get_embeddings([text])[0]
+        except Exception as e:
+            logger.error(f"Error getting embedding: {e}")
+            return None
+
+
+def parity_check(reference, candidate, texts: list) -> dict:
+    """Cosine similarity between two backends' embeddings of the same texts."""
+    expected = np.asarray(reference.get_embeddings(texts), dtype=np.float32)
+    actual = np.asarray(candidate.get_embeddings(texts), dtype=np.float32)
+    cosine = (expected * actual).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    )
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_drift": float(1 - cosine.min()),
+    }
+
+
+def create_onnx_encoder(model_dir: str = EMBEDDING_ONNX_DIR) -> OnnxEncoder:
+    """Build the ONNX backend from settings, exporting the model if missing."""
+    model_file = INT8_MODEL if EMBEDDING_ONNX_QUANTIZED else FP32_MODEL
+    if not os.path.exists(os.path.join(model_dir, model_file)):
+        logger.info(f"No ONNX model in {model_dir}; exporting '{EMBEDDING_MODEL}'.")
+        export_onnx(EMBEDDING_MODEL, model_dir, quantize=EMBEDDING_ONNX_QUANTIZED)
+    return OnnxEncoder(
+        model_dir,
+        max_seq_length=EMBEDDING_MAX_SEQ_LENGTH,
+        normalize=EMBEDDING_NORMALIZE,
+        quantized=EMBEDDING_ONNX_QUANTIZED,
+        intra_op_threads=EMBEDDING_ONNX_THREADS,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export the embedding model to ONNX (int8) and check parity."
+    )
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--output", default=EMBEDDING_ONNX_DIR)
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument(
+        "--corpus",
+        default=os.path.join(
+            os.path.dirname(parent_dir_path), "benchmarks", "queries.txt"
+        ),
+        help="Texts (one per line) used for the parity check",
+    )
+    parser.add_argument("--min-cosine", type=float, default=EMBEDDING_ONNX_MIN_COSINE)
+    args = parser.parse_args(argv)
+
+    quantize = not args.no_quantize
+    export_onnx(args.model, args.output, quantize=quantize)
+
+    from backend.models.encoder import SentenceEncoder
+
+    with open(args.corpus, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+    reference = SentenceEncoder(
+        args.model,
+        max_seq_length=EMBEDDING_MAX_SEQ_LENGTH,
+        normalize=EMBEDDING_NORMALIZE,
+    )
+    candidate = OnnxEncoder(
+        args.output,
+        max_seq_length=EMBEDDING_MAX_SEQ_LENGTH,
+        normalize=EMBEDDING_NORMALIZE,
+        quantized=quantize,
+    )
+    report = parity_check(reference, candidate, texts)
+    print(json.dumps(report, indent=2))
+
+    if report["min_cosine"] < args.min_cosine:
+        logger.error(
+            f"ONNX parity check failed: min cosine {report['min_cosine']:.4f} "
+            f"< {args.min_cosine}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from backend.utils.config import (
+    RERANK_BATCH_SIZE,
+    RERANK_BUDGET_MS,
+    RERANK_CACHE_SIZE,
+    RERANK_CANDIDATES,
+    RERANK_MAX_LENGTH,
+    RERANK_MODEL,
+    RERANK_TOP_K,
+)
+from backend.utils.logger import logger
+from backend.utils.metrics import CACHE_HITS, CACHE_MISSES, DEGRADED
+
+
+class CrossEncoderReranker:
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        top_k: int = RERANK_TOP_K,
+        candidates: int = RERANK_CANDIDATES,
+        budget_seconds: float = RERANK_BUDGET_MS / 1000,
+        batch_size: int = RERANK_BATCH_SIZE,
+        max_length: int = RERANK_MAX_LENGTH,
+        cache_size: int = RERANK_CACHE_SIZE,
+        model=None,
+    ):
+        """
+        Second-stage ranking of retrieved chunks with a cross-encoder
+        (sentence-transformers CrossEncoder, on CPU).
+
+        Retrieval fetches `candidates` chunks; every (query, chunk) pair of a
+        call is scored in one batched predict() and the best top_k are kept.
+        The number of pairs scored is sized from the measured time per pair
+        so a call fits budget_seconds (0: no limit). Under load, or with a
+        nearly spent request deadline, only the leading candidates are
+        reranked and the rest keep their retrieval order. Fully reranked
+        orders are cached per (query, candidate set).
+        """
+        if model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+
+                model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+                logger.info(f"Cross-encoder reranker '{model_name}' loaded.")
+            except Exception as e:
+                logger.error(f"Error initializing CrossEncoderReranker: {e}")
+                raise RuntimeError("Failed to load cross-encoder model.")
+        self.model = model
+        self.model_name = model_name
+        self.top_k = top_k
+        self.candidates = candidates
+        self.budget_seconds = budget_seconds
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pair_seconds = None  # moving average of scoring time per pair
+
+    def rerank(self, query: str, documents: list, top_k: int = None, budget=None):
+        """The top_k of documents for query, best first."""
+        return self.rerank_batch([query], [documents], top_k, budget)[0]
+
+    def rerank_batch(
+        self, queries: list, candidate_lists: list, top_k: int = None, budget=None
+    ) -> list:
+        """
+        Rerank the candidates of many queries with a single predict() call.
+        budget (seconds) further caps budget_seconds, e.g. with what is left
+        of the request deadline.
+        """
+        top_k = self.top_k if top_k is None else top_k
+        limits = [b for b in (budget, self.budget_seconds or None) if b is not None]
+        budget = min(limits) if limits else None
+        results = [None] * len(queries)
+        pending = []
+        for i, (query, documents) in enumerate(zip(queries, candidate_lists)):
+            documents = list(dict.fromkeys(documents))
+            if len(documents) <= 1:
+                results[i] = documents[:top_k]
+                continue
+            key = self._cache_key(query, documents)
+            ranked = self._cache_get(key)
+            if ranked is not None:
+                results[i] = ranked[:top_k]
+            else:
+                pending.append((i, query, documents, key))
+        if not pending:
+            return results
+
+        # Pairs that fit in the budget, shared evenly by the pending queries
+        per_query = max(len(documents) for _, _, documents, _ in pending)
+        if budget is not None and self._pair_seconds:
+            affordable = int(budget / self._pair_seconds) // len(pending)
+            if affordable < per_query:
+                DEGRADED.inc(reason="rerank_truncated")
+                per_query = affordable
+        if per_query < 2:
+            # Not even two pairs fit: keep the retrieval order
+            for i, _, documents, _ in pending:
+                results[i] = documents[:top_k]
+            return results
+
+        pairs = [
+            (query, document)
+            for _, query, documents, _ in pending
+            for document in documents[:per_query]
+        ]
+        started = time.perf_counter()
+        scores = np.asarray(
+            self.model.predict(
+                pairs, batch_size=self.batch_size, show_progress_bar=False
+            ),
+            dtype=np.float32,
+        ).reshape(-1)
+        self._observe((time.perf_counter() - started) / len(pairs))
+
+        offset = 0
+        for i, _, documents, key in pending:
+            scored = documents[:per_query]
+            order = np.argsort(-scores[offset : offset + len(scored)], kind="stable")
+            offset += len(scored)
+            ranked = [scored[j] for j in order] + documents[per_query:]
+            if len(scored) == len(documents):
+                self._cache_put(key, ranked)
+            results[i] = ranked[:top_k]
+        return results
+
+    def _observe(self, seconds_per_pair: float):
+        with self._lock:
+            if self._pair_seconds is None:
+                self._pair_seconds = seconds_per_pair
+            else:
+                self._pair_seconds = 0.8 * self._pair_seconds + 0.2 * seconds_per_pair
+
+    @staticmethod
+    def _cache_key(query: str, documents: list) -> str:
+        # The candidate set, not its order: retrieval ties may swap chunks
+        digest = hashlib.sha1(query.encode("utf-8"))
+        for document in sorted(documents):
+            digest.update(b"\x00" + document.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _cache_get(self, key: str):
+        if self.cache_size <= 0:
+            return None
+        with self._lock:
+            ranked = self._cache.get(key)
+            if ranked is not None:
+                self._cache.move_to_end(key)
+        if ranked is None:
+            CACHE_MISSES.inc(cache="rerank")
+        else:
+            CACHE_HITS.inc(cache="rerank")
+        return ranked
+
+    def _cache_put(self, key: str, ranked: list):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = ranked
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
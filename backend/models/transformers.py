@@ -10,9 +10,16 @@ parent_dir_path = os.path.dirname(current_dir_path)
 # Add the parent directory path to the sys.path
 sys.path.insert(0, parent_dir_path)
 
-import torch
+import copy
+import threading
+from collections import OrderedDict
 import numpy as np
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from backend.utils.config import (
+    LOCAL_MAX_INPUT_TOKENS,
+    LOCAL_MAX_NEW_TOKENS,
+    LOCAL_PREFIX_CACHE_SIZE,
+    LOCAL_PREFIX_MIN_TOKENS,
+)
 from backend.utils.logger import logger
 
 
@@ -20,42 +27,233 @@ class TransformerModel:
     def __init__(self, model_name: str, device: str = None):
         """Load pre-trained Hugging Face Transformer model and tokenizer."""
         try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+
+            self.model_id = f"causal-lm-mean:{model_name}"
             self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            if self.tokenizer.pad_token is None:
+                # Causal LM tokenizers often ship without one; needed for batches
+                self.tokenizer.pad_token = self.tokenizer.eos_token
+            # Batched generation appends new tokens on the right, so prompts
+            # are padded on the left (embeddings use a mask-aware mean either way)
+            self.tokenizer.padding_side = "left"
             self.model = AutoModelForCausalLM.from_pretrained(model_name).to(
                 self.device
             )
+            self.model.eval()
+
+            # Prompt token ids -> KV cache after prefilling them (LRU)
+            self._prefix_cache = OrderedDict()
+            self._prefix_lock = threading.Lock()
         except Exception as e:
             logger.error(f"Error initializing TransformerModel: {e}")
             raise RuntimeError("Failed to load Transformer model.")
 
     def get_embedding(self, text):
         try:
+            import torch
+
             inputs = self.tokenizer(
                 text, return_tensors="pt", padding=True, truncation=True
             ).to(self.device)
             with torch.no_grad():
-                outputs = self.model(**inputs)
-
-            # Use the correct attribute for embeddings
-            embedding = outputs.last_hidden_state.mean(dim=1).cpu().numpy().tolist()
+                outputs = self.model(**inputs, output_hidden_states=True)
 
-            if isinstance(embedding, list) and isinstance(embedding[0], list):
-                return embedding[0]  # Ensure it's a flat list
-            return embedding
+            # Causal LM outputs expose hidden states, not last_hidden_state
+            embedding = outputs.hidden_states[-1].mean(dim=1)[0]
+            return embedding.float().cpu().numpy()
         except Exception as e:
             logger.error(f"Error getting embedding: {e}")
             return None  # Return None instead of an empty list to indicate failure
 
-    def get_response(self, prompt: str) -> str:
+    def get_embeddings(self, texts: list):
+        """Embed a batch of texts in one forward pass (padded, mask-aware mean)."""
         try:
+            import torch
+
             inputs = self.tokenizer(
-                prompt, return_tensors="pt", padding=True, truncation=True
+                texts, return_tensors="pt", padding=True, truncation=True
             ).to(self.device)
             with torch.no_grad():
-                outputs = self.model.generate(**inputs)
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response
+                outputs = self.model(**inputs, output_hidden_states=True)
+
+            # Average only over real tokens, not padding
+            hidden_states = outputs.hidden_states[-1]
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden_states.dtype)
+            summed = (hidden_states * mask).sum(dim=1)
+            embeddings = summed / mask.sum(dim=1).clamp(min=1)
+            return embeddings.float().cpu().numpy()
+        except Exception as e:
+            logger.error(f"Error getting batch embeddings: {e}")
+            return None
+
+    def get_response(
+        self,
+        prompt: str,
+        max_new_tokens: int = LOCAL_MAX_NEW_TOKENS,
+        temperature: float = 0.0,
+    ) -> str:
+        """Generate a completion for prompt (the prompt itself is not echoed)."""
+        try:
+            return "".join(
+                self.stream_response(prompt, max_new_tokens, temperature)
+            ).strip()
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             return "Error generating response"
+
+    def stream_response(
+        self,
+        prompt: str,
+        max_new_tokens: int = LOCAL_MAX_NEW_TOKENS,
+        temperature: float = 0.0,
+    ):
+        """
+        Yield the completion of prompt piece by piece as tokens are decoded.
+
+        Decoding is a manual loop over the model's KV cache, so every step
+        only feeds the newest token. The cache after prefilling the prompt is
+        kept; a later prompt sharing a long enough token prefix with it
+        (same instructions, same retrieved context) resumes from a copy
+        instead of re-encoding that prefix.
+        """
+        import torch
+
+        prompt_ids = self.tokenizer(
+            prompt, truncation=True, max_length=LOCAL_MAX_INPUT_TOKENS
+        )["input_ids"]
+        past, reused = self._lookup_prefix(prompt_ids)
+
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=torch.tensor([prompt_ids[reused:]], device=self.device),
+                past_key_values=past,
+                use_cache=True,
+            )
+            past = outputs.past_key_values
+            self._store_prefix(prompt_ids, past)
+
+            generated = []
+            text = ""
+            while len(generated) < max_new_tokens:
+                next_token = self._next_token(outputs.logits[0, -1], temperature)
+                if next_token == self.tokenizer.eos_token_id:
+                    break
+                generated.append(next_token)
+
+                # Decode the whole completion so multi-token characters and
+                # leading spaces come out right; hold back partial characters
+                decoded = self.tokenizer.decode(generated, skip_special_tokens=True)
+                if len(decoded) > len(text) and not decoded.endswith("\ufffd"):
+                    yield decoded[len(text) :]
+                    text = decoded
+                if len(generated) == max_new_tokens:
+                    break
+
+                outputs = self.model(
+                    input_ids=torch.tensor([[next_token]], device=self.device),
+                    past_key_values=past,
+                    use_cache=True,
+                )
+                past = outputs.past_key_values
+
+        decoded = self.tokenizer.decode(generated, skip_special_tokens=True)
+        if len(decoded) > len(text):
+            yield decoded[len(text) :]
+
+    def get_responses(
+        self,
+        prompts: list,
+        max_new_tokens: int = LOCAL_MAX_NEW_TOKENS,
+        temperature: float = 0.0,
+    ) -> list:
+        """
+        Generate completions for several prompts in one left-padded batch.
+        A failed batch yields None for every prompt.
+        """
+        try:
+            import torch
+
+            inputs = self.tokenizer(
+                list(prompts),
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+                max_length=LOCAL_MAX_INPUT_TOKENS,
+            ).to(self.device)
+            sampling = (
+                {"do_sample": True, "temperature": temperature}
+                if temperature > 0
+                else {"do_sample": False}
+            )
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    **sampling,
+                )
+            # With left padding every completion starts at the same column
+            completions = outputs[:, inputs["input_ids"].shape[1] :]
+            return [
+                text.strip()
+                for text in self.tokenizer.batch_decode(
+                    completions, skip_special_tokens=True
+                )
+            ]
+        except Exception as e:
+            logger.error(f"Error generating batched responses: {e}")
+            return [None] * len(prompts)
+
+    def _next_token(self, logits, temperature: float) -> int:
+        import torch
+
+        if temperature <= 0:
+            return int(torch.argmax(logits))
+        probabilities = torch.softmax(logits.float() / temperature, dim=-1)
+        return int(torch.multinomial(probabilities, 1))
+
+    def _lookup_prefix(self, prompt_ids: list):
+        """
+        Return (past_key_values, reused_tokens) for the cached prompt sharing
+        the longest token prefix with prompt_ids, or (None, 0).
+        """
+        if LOCAL_PREFIX_CACHE_SIZE <= 0:
+            return None, 0
+        ids = np.asarray(prompt_ids)
+        best_key, best_length = None, 0
+        with self._prefix_lock:
+            for key in self._prefix_cache:
+                length = min(len(key), len(ids))
+                mismatch = np.flatnonzero(np.asarray(key[:length]) != ids[:length])
+                common = int(mismatch[0]) if mismatch.size else length
+                if common > best_length:
+                    best_key, best_length = key, common
+            # At least one prompt token must be fed to get next-token logits
+            best_length = min(best_length, len(prompt_ids) - 1)
+            if best_key is None or best_length < LOCAL_PREFIX_MIN_TOKENS:
+                return None, 0
+            self._prefix_cache.move_to_end(best_key)
+            # Decoding extends the cache in place, so work on a copy
+            past = copy.deepcopy(self._prefix_cache[best_key])
+        return self._crop(past, best_length), best_length
+
+    def _store_prefix(self, prompt_ids: list, past):
+        if LOCAL_PREFIX_CACHE_SIZE <= 0 or len(prompt_ids) < LOCAL_PREFIX_MIN_TOKENS:
+            return
+        snapshot = copy.deepcopy(past)
+        with self._prefix_lock:
+            self._prefix_cache[tuple(prompt_ids)] = snapshot
+            self._prefix_cache.move_to_end(tuple(prompt_ids))
+            while len(self._prefix_cache) > LOCAL_PREFIX_CACHE_SIZE:
+                self._prefix_cache.popitem(last=False)
+
+    @staticmethod
+    def _crop(past, length: int):
+        """Truncate a KV cache (Cache object or legacy tuples) to length tokens."""
+        if hasattr(past, "crop"):
+            past.crop(length)
+            return past
+        return tuple((key[:, :, :length], value[:, :, :length]) for key, value in past)
@@ -0,0 +1,732 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import asyncio
+import threading
+import time
+import uuid
+import numpy as np
+from backend.agents.query_preprocessing import preprocess_queries, preprocess_query
+from backend.agents.generation import (
+    build_prompt,
+    generate_response_llm,
+    generate_response_llm_async,
+    stream_response_llm_async,
+)
+from backend.agents.fact_checking import (
+    UNVERIFIED_RESPONSE,
+    fact_check,
+    fact_check_async,
+)
+from backend.utils.config import (
+    COALESCE_ENABLED,
+    COALESCE_MAX_WAITERS,
+    COALESCE_WINDOW_SECONDS,
+    EMBEDDING_MICROBATCH,
+    EMBEDDING_MICROBATCH_MAX_SIZE,
+    EMBEDDING_MICROBATCH_MAX_WAIT_MS,
+    GENERATION_BACKEND,
+    LOCAL_GENERATION_BATCH_SIZE,
+    LOCAL_GENERATION_MAX_WAIT_MS,
+    PIPELINE_MODE,
+)
+from backend.utils.admission import stage_limits
+from backend.utils.batching import MicroBatcher
+from backend.utils.deadline import Deadline
+from backend.utils.executor import run_blocking
+from backend.utils.logger import logger
+from backend.utils.metrics import (
+    DEGRADED,
+    TIME_TO_FIRST_TOKEN,
+    request_timer,
+    stage_timer,
+)
+from backend.utils.singleflight import SingleFlight
+
+
+def _has_embedding(embedding) -> bool:
+    # Failed items of a batch are zero rows, failed single embeddings empty
+    return embedding is not None and len(embedding) > 0 and bool(np.any(embedding))
+
+
+def _merge_skipped(*groups) -> list:
+    """Stages skipped by the request and its (possibly shared) execution."""
+    skipped = []
+    for group in groups:
+        skipped.extend(stage for stage in group if stage not in skipped)
+    return skipped
+
+
+class ChatPipeline:
+    def __init__(
+        self,
+        redis_client,
+        vector_store,
+        embedding_model,
+        transformer_model,
+        search_api,
+        llm_model: str,
+        llm_api_key: str,
+        session_store,
+        semantic_cache=None,
+        mode: str = PIPELINE_MODE,
+        generation_backend: str = GENERATION_BACKEND,
+        reranker=None,
+    ):
+        """Wire the agents and clients used by the /chat/ pipeline."""
+        self.redis_client = redis_client
+        self.vector_store = vector_store
+        self.embedding_model = embedding_model
+        self.transformer_model = transformer_model
+        self.search_api = search_api
+        self.llm_model = llm_model
+        self.llm_api_key = llm_api_key
+        self.session_store = session_store
+        self.semantic_cache = semantic_cache
+        self.mode = mode
+        self.generation_backend = generation_backend
+        self.reranker = reranker
+        self.singleflight = (
+            SingleFlight(COALESCE_WINDOW_SECONDS, COALESCE_MAX_WAITERS)
+            if COALESCE_ENABLED
+            else None
+        )
+        # Concurrent requests share padded forward passes of the embedding model
+        self.embedding_batcher = (
+            MicroBatcher(
+                self._embed_batch,
+                EMBEDDING_MICROBATCH_MAX_SIZE,
+                EMBEDDING_MICROBATCH_MAX_WAIT_MS / 1000,
+            )
+            if EMBEDDING_MICROBATCH
+            else None
+        )
+        # Concurrent local generations share one left-padded generate() call
+        self.generation_batcher = (
+            MicroBatcher(
+                self._generate_local_batch,
+                LOCAL_GENERATION_BATCH_SIZE,
+                LOCAL_GENERATION_MAX_WAIT_MS / 1000,
+                name="generation",
+            )
+            if generation_backend == "local" and LOCAL_GENERATION_BATCH_SIZE > 1
+            else None
+        )
+
+    async def run(self, user_id: str, user_input: str) -> dict:
+        """Run the full chat pipeline for a single user message."""
+        with request_timer("chat"):
+            if self.mode == "sync":
+                return self._run_sync(user_id, user_input)
+            return await self._run_async(user_id, user_input)
+
+    async def _run_async(self, user_id: str, user_input: str) -> dict:
+        """
+        Async execution mode: network stages use native async clients,
+        CPU-bound stages run on the bounded executor and independent stages
+        are awaited together. Every read stage runs within its share of the
+        request deadline and degrades instead of holding the request open.
+        """
+        deadline = Deadline()
+
+        # Steps 1-7: history fetch runs alongside the rest of the pipeline
+        (
+            chat_history,
+            (validated_response, verified, skipped_stages),
+        ) = await asyncio.gather(
+            deadline.run("history", self._history_async(user_id), []),
+            self._respond_async(user_input, deadline),
+        )
+
+        # Steps 8-9: chat memory write and session bookkeeping
+        session_id = await self._finish_async(user_id, user_input, validated_response)
+
+        return {
+            "session_id": session_id,
+            "response": validated_response,
+            "verified": verified,
+            "chat_history": chat_history,
+            "skipped_stages": _merge_skipped(deadline.skipped, skipped_stages),
+        }
+
+    async def stream(self, user_id: str, user_input: str):
+        """
+        Run the pipeline, yielding ("token", data) events while the LLM
+        generates and a final ("done", data) event carrying the fact-check
+        verdict, session_id and latency figures.
+        """
+        started = time.perf_counter()
+        deadline = Deadline()
+
+        with request_timer("chat_stream"):
+            (
+                chat_history,
+                (processed_query, query_embedding, retrieved_knowledge),
+            ) = await asyncio.gather(
+                deadline.run("history", self._history_async(user_id), []),
+                self._prepare_async(user_input, deadline),
+            )
+            cached_response = self._cache_lookup(query_embedding)
+            if cached_response is not None:
+                # A validated answer is already known: send it as one token
+                time_to_first_token = time.perf_counter() - started
+                TIME_TO_FIRST_TOKEN.observe(time_to_first_token)
+                yield "token", {"token": cached_response}
+                validated_response, verified = cached_response, True
+            else:
+                generation_started = time.perf_counter()
+                tokens = []
+                time_to_first_token = None
+                with stage_timer("generation"):
+                    async for token in deadline.iterate(
+                        "generation",
+                        self._stream_tokens(processed_query, retrieved_knowledge),
+                    ):
+                        if time_to_first_token is None:
+                            time_to_first_token = time.perf_counter() - started
+                            TIME_TO_FIRST_TOKEN.observe(time_to_first_token)
+                        tokens.append(token)
+                        yield "token", {"token": token}
+
+                raw_response = "".join(tokens).strip() or None
+                logger.debug(f"raw_response: {raw_response}")
+
+                validated_response, verified = await self._verify_async(
+                    raw_response, deadline
+                )
+                if "generation" not in deadline.skipped:
+                    self._cache_store(
+                        processed_query,
+                        query_embedding,
+                        raw_response if verified else None,
+                        validated_response,
+                        time.perf_counter() - generation_started,
+                    )
+
+            session_id = await self._finish_async(
+                user_id, user_input, validated_response
+            )
+
+            total_latency = time.perf_counter() - started
+            logger.info(
+                f"Streamed response for user {user_id}: "
+                f"ttft={time_to_first_token}s total={total_latency:.3f}s"
+            )
+
+            yield (
+                "done",
+                {
+                    "session_id": session_id,
+                    "response": validated_response,
+                    "verified": verified,
+                    "chat_history": chat_history,
+                    "skipped_stages": list(deadline.skipped),
+                    "time_to_first_token": time_to_first_token,
+                    "total_latency": total_latency,
+                },
+            )
+
+    async def run_batch(self, user_id: str, queries: list) -> list:
+        """
+        Answer many queries, pushing them through each stage together:
+        batched spaCy preprocessing and embedding, one multi-query vector
+        search, then concurrent generation and fact-checking (capped by the
+        stage limits). Identical processed queries are answered once.
+
+        Returns one result per query, in input order; an item that fails
+        carries an "error" instead of failing the batch. Batch answers get
+        sessions (for feedback) but are not added to the chat history.
+        """
+        with request_timer("chat_batch"):
+            results = [
+                {
+                    "query": query,
+                    "session_id": None,
+                    "response": None,
+                    "verified": False,
+                    "context": [],
+                    "error": None,
+                }
+                for query in queries
+            ]
+
+            processed = await self._preprocess_batch_async(queries, results)
+            unique = list(dict.fromkeys(q for q in processed if q is not None))
+
+            with stage_timer("embedding"):
+                embeddings = await self._run_cpu(self._embed_batch, unique)
+            with stage_timer("retrieval"):
+                knowledge = await self._run_cpu(
+                    self._retrieve_batch, unique, embeddings
+                )
+            if self.reranker is not None:
+                with stage_timer("rerank"):
+                    knowledge = await self._run_cpu(
+                        self.reranker.rerank_batch, unique, knowledge
+                    )
+
+            # Batch jobs are not bound by the interactive request deadline
+            deadline = Deadline(0)
+            answers = await asyncio.gather(
+                *(
+                    self._answer_item_async(q, embedding, context, deadline)
+                    for q, embedding, context in zip(unique, embeddings, knowledge)
+                ),
+                return_exceptions=True,
+            )
+            answers = dict(zip(unique, answers))
+
+            for result, processed_query in zip(results, processed):
+                if processed_query is None:
+                    continue
+                answer = answers[processed_query]
+                if isinstance(answer, Exception):
+                    logger.error(f"Error answering batch query: {answer}")
+                    result["error"] = "Failed to process query"
+                    continue
+                result.update(answer)
+                result["session_id"] = str(uuid.uuid4())
+
+            await asyncio.gather(
+                *(
+                    self._record_session_async(
+                        result["session_id"],
+                        user_id,
+                        result["query"],
+                        result["response"],
+                    )
+                    for result in results
+                    if result["session_id"] is not None
+                )
+            )
+            return results
+
+    async def _preprocess_batch_async(self, queries: list, results: list) -> list:
+        """
+        Preprocess all queries in one spaCy pass; if that fails, retry one by
+        one so only the offending items are marked as failed (None).
+        """
+        with stage_timer("preprocess"):
+            try:
+                return await self._run_cpu(preprocess_queries, queries)
+            except Exception as e:
+                logger.error(f"Error in batch preprocessing: {e}")
+
+            processed = []
+            for query, result in zip(queries, results):
+                try:
+                    processed.append(await self._run_cpu(preprocess_query, query))
+                except Exception as e:
+                    logger.error(f"Error preprocessing query '{query}': {e}")
+                    result["error"] = "Failed to preprocess query"
+                    processed.append(None)
+            return processed
+
+    async def _answer_item_async(
+        self, processed_query, query_embedding, context, deadline
+    ) -> dict:
+        response, verified = await self._answer_async(
+            processed_query, query_embedding, context, deadline
+        )
+        return {"response": response, "verified": verified, "context": context}
+
+    async def _history_async(self, user_id: str):
+        """Fetch recent chat history from Redis."""
+        with stage_timer("history"):
+            chat_history = await self.redis_client.get_chat_history_async(user_id)
+        logger.debug(f"chat_history: {chat_history}")
+        return chat_history
+
+    async def _respond_async(self, user_input: str, deadline: Deadline):
+        """
+        Preprocess the query, then answer it. Concurrent requests with the
+        same normalized query share one retrieval/generation/fact-check run
+        (bounded by the first caller's deadline); per-user history and
+        sessions stay separate.
+        """
+        processed_query = await deadline.run(
+            "preprocess", self._preprocess_async(user_input), user_input
+        )
+
+        # The shared run records its own skipped stages so every caller
+        # reports them, not only the one that started it
+        shared = deadline.fork()
+        if self.singleflight is None:
+            return await self._execute_async(processed_query, shared)
+        return await self.singleflight.do(
+            processed_query, lambda: self._execute_async(processed_query, shared)
+        )
+
+    async def _execute_async(self, processed_query: str, deadline: Deadline):
+        """Embed and retrieve, then answer."""
+        query_embedding, retrieved_knowledge = await self._retrieve_context_async(
+            processed_query, deadline
+        )
+
+        validated_response, verified = await self._answer_async(
+            processed_query, query_embedding, retrieved_knowledge, deadline
+        )
+        return validated_response, verified, tuple(deadline.skipped)
+
+    async def _prepare_async(self, user_input: str, deadline: Deadline):
+        """Preprocess and embed the query, then retrieve knowledge for it."""
+        processed_query = await deadline.run(
+            "preprocess", self._preprocess_async(user_input), user_input
+        )
+        query_embedding, retrieved_knowledge = await self._retrieve_context_async(
+            processed_query, deadline
+        )
+        return processed_query, query_embedding, retrieved_knowledge
+
+    async def _retrieve_context_async(self, processed_query: str, deadline: Deadline):
+        """
+        Embed the query and retrieve knowledge for it. When either stage runs
+        out of budget the answer is generated without retrieved context.
+        """
+        query_embedding = await deadline.run(
+            "embedding", self._embed_async(processed_query)
+        )
+        if query_embedding is None:
+            deadline.skip("retrieval")
+            return None, []
+
+        retrieved_knowledge = await deadline.run(
+            "retrieval", self._retrieve_async(processed_query, query_embedding), []
+        )
+        if self.reranker is not None and retrieved_knowledge:
+            # Out of budget: the leading candidates in retrieval order
+            retrieved_knowledge = await deadline.run(
+                "rerank",
+                self._rerank_async(
+                    processed_query, retrieved_knowledge, deadline.budget("rerank")
+                ),
+                retrieved_knowledge[: self.reranker.top_k],
+            )
+        return query_embedding, retrieved_knowledge
+
+    async def _preprocess_async(self, user_input: str):
+        with stage_timer("preprocess"):
+            processed_query = await self._run_cpu(preprocess_query, user_input)
+        logger.debug(f"processed_query: {processed_query}")
+        return processed_query
+
+    async def _embed_async(self, processed_query: str):
+        with stage_timer("embedding"):
+            if self.embedding_batcher is not None:
+                return await self.embedding_batcher.submit(processed_query)
+            return await self._run_cpu(self._embed, processed_query)
+
+    async def _retrieve_async(self, processed_query: str, query_embedding=None):
+        with stage_timer("retrieval"):
+            retrieved_knowledge = await self._run_cpu(
+                self._retrieve, processed_query, query_embedding
+            )
+        logger.debug(f"retrieved_knowledge: {retrieved_knowledge}")
+        return retrieved_knowledge
+
+    async def _rerank_async(self, processed_query: str, documents: list, budget):
+        with stage_timer("rerank"):
+            return await self._run_cpu(
+                self.reranker.rerank, processed_query, documents, None, budget
+            )
+
+    async def _answer_async(
+        self,
+        processed_query: str,
+        query_embedding,
+        retrieved_knowledge: list,
+        deadline: Deadline,
+    ):
+        """
+        Generate a response with the LLM and fact-check it, unless the
+        semantic cache already holds a validated answer for a similar query.
+        Returns (response, verified).
+        """
+        cached_response = self._cache_lookup(query_embedding)
+        if cached_response is not None:
+            return cached_response, True
+
+        started = time.perf_counter()
+        raw_response = await deadline.run(
+            "generation", self._generate_async(processed_query, retrieved_knowledge)
+        )
+
+        validated_response, verified = await self._verify_async(raw_response, deadline)
+        self._cache_store(
+            processed_query,
+            query_embedding,
+            raw_response if verified else None,
+            validated_response,
+            time.perf_counter() - started,
+        )
+        return validated_response, verified
+
+    async def _generate_async(self, processed_query: str, retrieved_knowledge: list):
+        with stage_timer("generation"):
+            async with stage_limits.limit("llm"):
+                if self.generation_backend == "local":
+                    raw_response = await self._generate_local_async(
+                        processed_query, retrieved_knowledge
+                    )
+                else:
+                    raw_response = await generate_response_llm_async(
+                        processed_query, self.llm_model, self.llm_api_key
+                    )
+        logger.debug(f"raw_response: {raw_response}")
+        return raw_response
+
+    async def _stream_tokens(self, processed_query: str, retrieved_knowledge: list):
+        async with stage_limits.limit("llm"):
+            if self.generation_backend == "local":
+                tokens = self._stream_local(
+                    build_prompt(processed_query, retrieved_knowledge)
+                )
+            else:
+                tokens = stream_response_llm_async(
+                    processed_query, self.llm_model, self.llm_api_key
+                )
+            async for token in tokens:
+                yield token
+
+    async def _generate_local_async(
+        self, processed_query: str, retrieved_knowledge: list
+    ):
+        prompt = build_prompt(processed_query, retrieved_knowledge)
+        if self.generation_batcher is not None:
+            return await self.generation_batcher.submit(prompt)
+        return await run_blocking(self._generate_local, prompt)
+
+    def _generate_local(self, prompt: str):
+        """Single-prompt local generation (reuses cached prompt prefixes)."""
+        try:
+            response = "".join(self.transformer_model.stream_response(prompt))
+            return response.strip() or None
+        except Exception as e:
+            logger.error(f"Error generating local response: {e}")
+            return None
+
+    def _generate_local_batch(self, prompts: list):
+        return self.transformer_model.get_responses(prompts)
+
+    async def _stream_local(self, prompt: str):
+        """
+        Bridge the local model's blocking token generator to the event loop.
+        Decoding runs on the executor and stops at the next token once the
+        consumer goes away (e.g. the generation budget ran out).
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def emit(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Event loop already closed
+                stop.set()
+
+        def produce():
+            try:
+                for token in self.transformer_model.stream_response(prompt):
+                    if stop.is_set():
+                        break
+                    emit(token)
+            except Exception as e:
+                logger.error(f"Error streaming local response: {e}")
+            finally:
+                emit(None)
+
+        producer = asyncio.ensure_future(run_blocking(produce))
+        try:
+            while True:
+                token = await queue.get()
+                if token is None:
+                    break
+                yield token
+        finally:
+            stop.set()
+            if producer.done():
+                producer.result()
+
+    async def _verify_async(self, raw_response, deadline: Deadline):
+        """
+        Fact-check the raw response within its budget. Returns
+        (response, verified); when fact-checking is skipped the raw answer
+        is returned unverified.
+        """
+        if raw_response is None:
+            DEGRADED.inc(reason="generation_failed")
+            deadline.skip("fact_check")
+            return UNVERIFIED_RESPONSE, False
+
+        validated_response = await deadline.run(
+            "fact_check", self._fact_check_async(raw_response)
+        )
+        if validated_response is None:
+            return raw_response, False
+        return validated_response, validated_response == raw_response
+
+    def _cache_lookup(self, query_embedding):
+        if self.semantic_cache is None or not _has_embedding(query_embedding):
+            return None
+        with stage_timer("semantic_cache"):
+            return self.semantic_cache.lookup(query_embedding)
+
+    def _cache_store(
+        self, processed_query, query_embedding, raw_response, validated_response, cost
+    ):
+        """Only answers that passed fact-checking are cached."""
+        if self.semantic_cache is None or not _has_embedding(query_embedding):
+            return
+        if raw_response is None or validated_response != raw_response:
+            return
+        self.semantic_cache.put(
+            processed_query, query_embedding, validated_response, cost
+        )
+
+    async def _fact_check_async(self, raw_response):
+        """Validate the generated response against web search results."""
+        with stage_timer("fact_check"):
+            async with stage_limits.limit("search"):
+                validated_response = await fact_check_async(
+                    raw_response, self.search_api
+                )
+        logger.debug(f"validated_response: {validated_response}")
+
+        return validated_response
+
+    async def _finish_async(self, user_id, user_input, validated_response):
+        """Store chat memory and session bookkeeping concurrently."""
+        session_id = str(uuid.uuid4())
+        await asyncio.gather(
+            self._store_history_async(user_id, user_input, validated_response),
+            self._record_session_async(
+                session_id, user_id, user_input, validated_response
+            ),
+        )
+        return session_id
+
+    async def _store_history_async(self, user_id, user_input, validated_response):
+        with stage_timer("store_history"):
+            await self.redis_client.store_chat_history_async(
+                user_id, user_input, validated_response
+            )
+
+    async def _record_session_async(self, session_id, user_id, user_input, response):
+        """Track the session so feedback can be attached to it later."""
+        with stage_timer("session"):
+            await self.session_store.set_async(
+                session_id,
+                {"user_id": user_id, "user_input": user_input, "response": response},
+            )
+
+    def _run_sync(self, user_id: str, user_input: str) -> dict:
+        """Sync execution mode: every stage runs inline, one after another."""
+        with stage_timer("history"):
+            chat_history = self.redis_client.get_chat_history(user_id)
+        logger.debug(f"chat_history: {chat_history}")
+
+        with stage_timer("preprocess"):
+            processed_query = preprocess_query(user_input)
+        logger.debug(f"processed_query: {processed_query}")
+
+        with stage_timer("retrieval"):
+            retrieved_knowledge = self.vector_store.retrieve_knowledge(
+                processed_query, self.embedding_model, top_k=self._retrieval_top_k()
+            )
+        if self.reranker is not None:
+            with stage_timer("rerank"):
+                retrieved_knowledge = self.reranker.rerank(
+                    processed_query, retrieved_knowledge
+                )
+        logger.debug(f"retrieved_knowledge: {retrieved_knowledge}")
+
+        with stage_timer("generation"):
+            if self.generation_backend == "local":
+                raw_response = self._generate_local(
+                    build_prompt(processed_query, retrieved_knowledge)
+                )
+            else:
+                raw_response = generate_response_llm(
+                    processed_query, self.llm_model, self.llm_api_key
+                )
+        logger.debug(f"raw_response: {raw_response}")
+        if raw_response is None:
+            DEGRADED.inc(reason="generation_failed")
+
+        with stage_timer("fact_check"):
+            validated_response = fact_check(raw_response, self.search_api)
+        logger.debug(f"validated_response: {validated_response}")
+
+        # # RL-based response strategy
+        # action = rl_agent.get_best_action(processed_query)
+        # if action == "negative":
+        #     validated_response += " (Note: This response may need improvement.)"
+
+        with stage_timer("store_history"):
+            self.redis_client.store_chat_history(
+                user_id, user_input, validated_response
+            )
+
+        session_id = str(uuid.uuid4())
+        with stage_timer("session"):
+            self.session_store.set(
+                session_id,
+                {
+                    "user_id": user_id,
+                    "user_input": user_input,
+                    "response": validated_response,
+                },
+            )
+
+        return {
+            "session_id": session_id,
+            "response": validated_response,
+            "verified": raw_response is not None and validated_response == raw_response,
+            "chat_history": chat_history,
+            "skipped_stages": [],
+        }
+
+    async def _run_cpu(self, func, *args):
+        """
+        Run blocking model work on the executor, capped by the "cpu" stage
+        limit so excess work waits (cancellably) here rather than in the
+        executor queue.
+        """
+        async with stage_limits.limit("cpu"):
+            return await run_blocking(func, *args)
+
+    def _embed(self, processed_query: str):
+        return self.embedding_model.get_embedding(processed_query)
+
+    def _retrieval_top_k(self) -> int:
+        """Chunks to retrieve: the reranker's wider candidate set if enabled."""
+        return 5 if self.reranker is None else self.reranker.candidates
+
+    def _retrieve(self, processed_query: str, query_embedding=None):
+        return self.vector_store.retrieve_knowledge(
+            processed_query,
+            self.embedding_model,
+            query_embedding,
+            top_k=self._retrieval_top_k(),
+        )
+
+    def _embed_batch(self, processed_queries: list):
+        return self.embedding_model.get_embeddings(processed_queries)
+
+    def _retrieve_batch(self, processed_queries: list, query_embeddings: list):
+        return self.vector_store.retrieve_knowledge_batch(
+            processed_queries,
+            self.embedding_model,
+            query_embeddings,
+            top_k=self._retrieval_top_k(),
+        )
@@ -0,0 +1,552 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import argparse
+import bisect
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from tqdm import tqdm
+from backend.utils.config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    EMBEDDING_ONNX_DIR,
+    INGEST_BATCH_SIZE,
+    INGEST_CHECKPOINT_DIR,
+    INGEST_CHUNK_OVERLAP,
+    INGEST_CHUNK_SIZE,
+    INGEST_CHUNK_TOKENS,
+    INGEST_DEDUP,
+    INGEST_WORKERS,
+    RETRIEVAL_MODE,
+    VECTOR_STORE,
+)
+from backend.utils.dedup import NearDuplicateFilter
+from backend.utils.logger import logger
+
+TEXT_SUFFIXES = (".txt", ".md")
+JSONL_SUFFIXES = (".jsonl",)
+# Chunk ids looked up per document and round when deleting stale chunks
+STALE_PROBE_WINDOW = 16
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    overlap: int = INGEST_CHUNK_OVERLAP,
+    tokenizer=None,
+) -> list:
+    """
+    Split text into windows of chunk_size words, overlapping by overlap
+    words, or of chunk_size tokens when a (tokenizers) tokenizer is given.
+    """
+    if tokenizer is not None:
+        return _chunk_tokens(text, chunk_size, overlap, tokenizer)
+    words = text.split()
+    step = max(1, chunk_size - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start : start + chunk_size]))
+        if start + chunk_size >= len(words):
+            break
+    return chunks
+
+
+def _chunk_tokens(text: str, chunk_size: int, overlap: int, tokenizer) -> list:
+    """
+    Windows of at most chunk_size tokens, cut from the original text. Cuts
+    are moved back to the start of a word (its first token preceded by a
+    gap), so words are only split when a single word exceeds chunk_size;
+    the overlap may grow to the word boundary.
+    """
+    offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+    if not offsets:
+        return []
+    words = [
+        i for i in range(len(offsets)) if i == 0 or offsets[i][0] > offsets[i - 1][1]
+    ]
+    chunks = []
+    start = 0
+    while True:
+        end = start + chunk_size
+        if end >= len(offsets):
+            chunks.append(text[offsets[start][0] : offsets[-1][1]])
+            break
+        boundary = words[bisect.bisect_right(words, end) - 1]
+        if boundary > start:
+            end = boundary
+        chunks.append(text[offsets[start][0] : offsets[end - 1][1]])
+        following = words[bisect.bisect_right(words, end - overlap) - 1]
+        start = following if start < following < end else end
+    return chunks
+
+
+def load_chunk_tokenizer():
+    """
+    The embedding model's tokenizer (tokenizers library) to size chunks in
+    tokens: the exported one for the ONNX backend, else EMBEDDING_MODEL's
+    from the Hugging Face hub. None, so chunks are sized in words, if it
+    cannot be loaded.
+    """
+    try:
+        from tokenizers import Tokenizer
+
+        path = os.path.join(EMBEDDING_ONNX_DIR, "tokenizer.json")
+        if EMBEDDING_BACKEND == "onnx" and os.path.exists(path):
+            tokenizer = Tokenizer.from_file(path)
+        else:
+            tokenizer = Tokenizer.from_pretrained(EMBEDDING_MODEL)
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        return tokenizer
+    except Exception as e:
+        logger.warning(f"Chunk tokenizer unavailable, chunking by words: {e}")
+        return None
+
+
+def discover_sources(paths: list) -> list:
+    """
+    (path, source_id) for every supported file under paths, sorted. The
+    source id is the path relative to the argument it was found under, so
+    chunk ids stay stable between runs.
+    """
+    sources = []
+    for root in paths:
+        if os.path.isdir(root):
+            for directory, _, files in os.walk(root):
+                for name in files:
+                    if name.endswith(TEXT_SUFFIXES + JSONL_SUFFIXES):
+                        path = os.path.join(directory, name)
+                        sources.append((path, os.path.relpath(path, root)))
+        elif os.path.isfile(root):
+            sources.append((root, os.path.basename(root)))
+        else:
+            logger.warning(f"Ingestion source not found: {root}")
+    return sorted(sources, key=lambda source: source[1])
+
+
+def iter_records(path: str, source_id: str, text_field="text", id_field="id"):
+    """
+    Yield (record_index, doc_id, text, metadata) for one source file: one
+    record per JSONL line, or the whole file for plain text / Markdown.
+    """
+    if not path.endswith(JSONL_SUFFIXES):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield 0, source_id, f.read(), {}
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping invalid JSON at {source_id}:{index + 1}")
+                continue
+            text = record.get(text_field)
+            if not isinstance(text, str) or not text.strip():
+                continue
+            doc_id = str(record.get(id_field) or f"{source_id}:{index}")
+            # Chroma metadata values must be scalars
+            metadata = {
+                key: value
+                for key, value in record.items()
+                if key not in (text_field, id_field)
+                and isinstance(value, (str, int, float, bool))
+            }
+            yield index, doc_id, text, metadata
+
+
+class IngestCheckpoint:
+    def __init__(self, path: str = None):
+        """
+        Per-source progress of a bulk ingestion, saved after every committed
+        batch. A source is resumed at its first uncommitted record, or
+        re-read from the start if the file changed since. dedup holds the
+        NearDuplicateFilter state saved next to it (path + ".dedup").
+        """
+        self.path = path
+        self.sources = {}
+        self.dedup = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.sources = state.get("sources", {})
+            self.dedup = state.get("dedup", {})
+
+    @staticmethod
+    def fingerprint(path: str) -> list:
+        stat = os.stat(path)
+        return [stat.st_size, int(stat.st_mtime)]
+
+    def resume_at(self, source_id: str, fingerprint: list):
+        """First record still to ingest, or None if the source is done."""
+        state = self.sources.get(source_id)
+        if state is None or state["fingerprint"] != fingerprint:
+            return 0
+        return None if state["done"] else state["next_record"]
+
+    def update(self, source_id: str, fingerprint: list, next_record: int, done: bool):
+        self.sources[source_id] = {
+            "fingerprint": fingerprint,
+            "next_record": next_record,
+            "done": done,
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Write then rename, so a crash never leaves a truncated checkpoint
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"sources": self.sources, "dedup": self.dedup}, f)
+        os.replace(temporary, self.path)
+
+
+class BulkIngestor:
+    def __init__(
+        self,
+        store,
+        embedding_model,
+        chunk_size: int = INGEST_CHUNK_SIZE,
+        chunk_overlap: int = INGEST_CHUNK_OVERLAP,
+        batch_size: int = INGEST_BATCH_SIZE,
+        workers: int = INGEST_WORKERS,
+        checkpoint: IngestCheckpoint = None,
+        text_field: str = "text",
+        id_field: str = "id",
+        tokenizer=None,
+        dedup: NearDuplicateFilter = None,
+    ):
+        """
+        Streaming ingestion: read sources, chunk, embed batches on worker
+        threads and upsert them into store (a VectorStore) in order.
+
+        At most two batches per worker are in flight, and a document longer
+        than batch_size is split across batches, so memory stays bounded
+        whatever the corpus and document sizes. Chunk ids are "<doc_id>:<n>",
+        numbered over the chunks kept, and writes are upserts, so re-running
+        after a crash only redoes the batches that were not committed yet.
+        Once a document is written, chunks left over from a longer earlier
+        version of it (ids from its new chunk count on) are deleted.
+
+        Chunks are sized in tokens of tokenizer when given. With dedup,
+        chunks duplicating one kept earlier are dropped before embedding;
+        the report's "dedup" section shows what that saved. The filter is
+        saved with the checkpoint, so a resumed run still compares against
+        the chunks kept before the crash. A document is never compared
+        against its own earlier version.
+        """
+        self.store = store
+        self.embedding_model = embedding_model
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.checkpoint = checkpoint or IngestCheckpoint()
+        self.text_field = text_field
+        self.id_field = id_field
+        self.tokenizer = tokenizer
+        self.dedup = dedup
+        if dedup is not None and self.checkpoint.path:
+            dedup.load(self._dedup_path(), self.checkpoint.dedup)
+        self.dimension = None
+        self.stats = {
+            "sources": 0,
+            "sources_skipped": 0,
+            "documents": 0,
+            "chunks": 0,
+            "chunks_failed": 0,
+            "chunks_stale_deleted": 0,
+            "chunks_duplicate_exact": 0,
+            "chunks_duplicate_near": 0,
+        }
+        self._text_bytes = {"kept": 0, "duplicate": 0}
+
+    def run(self, paths: list) -> dict:
+        """Ingest every source under paths; returns counts and throughput."""
+        started = time.perf_counter()
+        sources = discover_sources(paths)
+        pending = deque()
+        with (
+            ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="ingest-embed"
+            ) as executor,
+            tqdm(unit="chunk", desc="Ingesting") as progress,
+        ):
+            for batch in self._batches(sources):
+                future = executor.submit(
+                    self.embedding_model.get_embeddings,
+                    batch["documents"],
+                    self.batch_size,
+                )
+                pending.append((future, batch))
+                # Embedding of later batches overlaps with this upsert
+                while len(pending) >= 2 * self.workers:
+                    self._commit(*pending.popleft(), progress)
+            while pending:
+                self._commit(*pending.popleft(), progress)
+
+        seconds = time.perf_counter() - started
+        report = dict(self.stats)
+        report["seconds"] = round(seconds, 3)
+        report["chunks_per_second"] = (
+            round(self.stats["chunks"] / seconds, 1) if seconds else None
+        )
+        if self.dedup is not None:
+            report["dedup"] = self._dedup_report()
+        logger.info(f"Ingestion finished: {report}")
+        return report
+
+    def _dedup_report(self) -> dict:
+        """Index size with and without the duplicates that were dropped."""
+        duplicates = (
+            self.stats["chunks_duplicate_exact"] + self.stats["chunks_duplicate_near"]
+        )
+        chunks = self.stats["chunks"] + self.stats["chunks_failed"] + duplicates
+        text_bytes = self._text_bytes["kept"] + self._text_bytes["duplicate"]
+        # float32 vectors only; the ANN graph and id columns shrink likewise
+        vector_bytes = 4 * (self.dimension or 0)
+        mb = 1024 * 1024
+        return {
+            "chunks_before": chunks,
+            "chunks_after": chunks - duplicates,
+            "text_mb_before": round(text_bytes / mb, 2),
+            "text_mb_after": round(self._text_bytes["kept"] / mb, 2),
+            "vector_mb_before": round(chunks * vector_bytes / mb, 2),
+            "vector_mb_after": round((chunks - duplicates) * vector_bytes / mb, 2),
+            "size_reduction": round(duplicates / chunks, 4) if chunks else 0.0,
+        }
+
+    def _batches(self, sources: list):
+        """
+        Yield batches of at most batch_size chunks, each carrying the
+        checkpoint positions that become durable once it is committed and
+        the chunk counts of the documents it completes.
+        """
+        batch = self._new_batch()
+        for path, source_id in sources:
+            fingerprint = IngestCheckpoint.fingerprint(path)
+            start = self.checkpoint.resume_at(source_id, fingerprint)
+            if start is None:
+                self.stats["sources_skipped"] += 1
+                continue
+            self.stats["sources"] += 1
+
+            next_record = start
+            records = iter_records(path, source_id, self.text_field, self.id_field)
+            for index, doc_id, text, metadata in records:
+                if index < start:
+                    continue
+                if self.dedup is not None:
+                    # Its earlier version's chunks are replaced, not duplicated
+                    self.dedup.forget(doc_id)
+                n = 0
+                for chunk in chunk_text(
+                    text, self.chunk_size, self.chunk_overlap, self.tokenizer
+                ):
+                    # Duplicates take no number, so ids stay dense per document
+                    if self._is_duplicate(f"{doc_id}:{n}", chunk):
+                        continue
+                    batch["ids"].append(f"{doc_id}:{n}")
+                    batch["documents"].append(chunk)
+                    batch["metadatas"].append(
+                        {**metadata, "source": source_id, "doc_id": doc_id, "chunk": n}
+                    )
+                    n += 1
+                    if len(batch["ids"]) >= self.batch_size:
+                        # The checkpoint still points at this document's
+                        # start, so a crash redoes it whole
+                        yield batch
+                        batch = self._new_batch()
+                batch["chunk_counts"][doc_id] = n
+                next_record = index + 1
+                batch["positions"][source_id] = (fingerprint, next_record, False)
+                self.stats["documents"] += 1
+
+            batch["positions"][source_id] = (fingerprint, next_record, True)
+        if batch["positions"]:
+            yield batch
+
+    def _is_duplicate(self, chunk_id: str, chunk: str) -> bool:
+        if self.dedup is None:
+            return False
+        size = len(chunk.encode("utf-8"))
+        verdict = self.dedup.check(chunk_id, chunk)
+        if verdict is None:
+            self._text_bytes["kept"] += size
+            return False
+        kind, _ = verdict
+        self.stats[f"chunks_duplicate_{kind}"] += 1
+        self._text_bytes["duplicate"] += size
+        return True
+
+    @staticmethod
+    def _new_batch() -> dict:
+        return {
+            "ids": [],
+            "documents": [],
+            "metadatas": [],
+            "positions": {},
+            "chunk_counts": {},
+        }
+
+    def _commit(self, future, batch: dict, progress):
+        """Upsert one embedded batch, then record its checkpoint positions."""
+        embeddings = future.result()
+        if embeddings.ndim == 2 and embeddings.shape[1]:
+            self.dimension = embeddings.shape[1]
+        if batch["ids"]:
+            # Chunks whose embedding failed (zero rows) are left out
+            valid = np.flatnonzero(embeddings.any(axis=1)) if embeddings.size else []
+            failed = len(batch["ids"]) - len(valid)
+            if failed:
+                logger.warning(f"{failed} chunks could not be embedded; skipped.")
+            if len(valid):
+                self.store.upsert(
+                    [batch["ids"][i] for i in valid],
+                    embeddings[valid],
+                    [batch["documents"][i] for i in valid],
+                    [batch["metadatas"][i] for i in valid],
+                )
+            self.stats["chunks"] += len(valid)
+            self.stats["chunks_failed"] += failed
+            progress.update(len(batch["ids"]))
+            progress.set_postfix(documents=self.stats["documents"])
+        if batch["chunk_counts"]:
+            self._delete_stale(batch["chunk_counts"])
+
+        for source_id, (fingerprint, next_record, done) in batch["positions"].items():
+            self.checkpoint.update(source_id, fingerprint, next_record, done)
+        if self.dedup is not None and self.checkpoint.path:
+            # Filter files first: entries beyond the saved state are dropped
+            self.checkpoint.dedup = self.dedup.save(self._dedup_path())
+        self.checkpoint.save()
+
+    def _dedup_path(self) -> str:
+        return f"{self.checkpoint.path}.dedup"
+
+    def _delete_stale(self, chunk_counts: dict):
+        """
+        Delete the chunks of an earlier, longer version of each document:
+        ids "<doc_id>:<n>" from its new chunk count on. Ids are dense, so
+        probing stops at the first window that is not fully stored.
+        """
+        stale = []
+        probe_from = dict(chunk_counts)  # doc_id -> first chunk number to probe
+        while probe_from:
+            found = {
+                item["id"]
+                for item in self.store.get(
+                    [
+                        f"{doc_id}:{n}"
+                        for doc_id, start in probe_from.items()
+                        for n in range(start, start + STALE_PROBE_WINDOW)
+                    ]
+                )
+            }
+            stale.extend(found)
+            probe_from = {
+                doc_id: start + STALE_PROBE_WINDOW
+                for doc_id, start in probe_from.items()
+                if f"{doc_id}:{start + STALE_PROBE_WINDOW - 1}" in found
+            }
+        if stale:
+            self.store.delete(stale)
+            self.stats["chunks_stale_deleted"] += len(stale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Bulk-ingest text, Markdown and JSONL files into the knowledge base."
+    )
+    parser.add_argument("paths", nargs="+", help="Files or directories to ingest")
+    parser.add_argument("--collection", default="my_knowledge_base")
+    parser.add_argument(
+        "--store",
+        default=VECTOR_STORE,
+        choices=("chroma", "hnsw", "quantized", "milvus"),
+    )
+    parser.add_argument(
+        "--retrieval-mode",
+        default=RETRIEVAL_MODE,
+        choices=("vector", "hybrid"),
+        help="hybrid also builds the BM25 index",
+    )
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=INGEST_CHUNK_OVERLAP)
+    parser.add_argument(
+        "--chunk-by-words",
+        action="store_true",
+        default=not INGEST_CHUNK_TOKENS,
+        help="Size chunks in words instead of embedding-model tokens",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        default=not INGEST_DEDUP,
+        help="Keep exact and near-duplicate chunks",
+    )
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--text-field", default="text", help="JSONL text field")
+    parser.add_argument("--id-field", default="id", help="JSONL document id field")
+    parser.add_argument(
+        "--checkpoint",
+        help="Progress file (default: INGEST_CHECKPOINT_DIR/<collection>.json)",
+    )
+    parser.add_argument("--restart", action="store_true", help="Ignore saved progress")
+    args = parser.parse_args(argv)
+
+    from backend.database.vector_store import create_vector_store
+    from backend.models.embeddings import create_embedding_model
+
+    checkpoint_path = args.checkpoint or os.path.join(
+        INGEST_CHECKPOINT_DIR, f"{args.collection}.json"
+    )
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    try:
+        store = create_vector_store(args.collection, args.store, args.retrieval_mode)
+        logger.info(
+            f"'{args.collection}' holds {store.count()} items before ingestion."
+        )
+    except Exception as e:
+        logger.error(f"Could not open the {args.store} vector store: {e}")
+        return 1
+    ingestor = BulkIngestor(
+        store,
+        create_embedding_model(),
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint=IngestCheckpoint(checkpoint_path),
+        text_field=args.text_field,
+        id_field=args.id_field,
+        tokenizer=None if args.chunk_by_words else load_chunk_tokenizer(),
+        dedup=None if args.no_dedup else NearDuplicateFilter(),
+    )
+    try:
+        print(json.dumps(ingestor.run(args.paths), indent=2))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,20 +10,49 @@ parent_dir_path = os.path.dirname(current_dir_path)
 # Add the parent directory path to the sys.path
 sys.path.insert(0, parent_dir_path)
 
+import httpx
 import requests
 from bs4 import BeautifulSoup
+from backend.utils.config import DUCKDUCKGO_URL, HTTP_TIMEOUT
 
 
 class DuckDuckGoSearchAPI:
+    def __init__(self, base_url: str = DUCKDUCKGO_URL):
+        self.base_url = base_url
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        """Lazily create the shared httpx client (must be inside a running loop)."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=HTTP_TIMEOUT, follow_redirects=True
+            )
+        return self._async_client
+
     def search(self, query: str):
         """Perform a web search using DuckDuckGo (no API key required)."""
-        url = f"https://duckduckgo.com/html/?q={query}"
-        response = requests.get(url)
+        response = requests.get(
+            self.base_url, params={"q": query}, timeout=HTTP_TIMEOUT
+        )
+
+        if response.status_code != 200:
+            return []
+
+        return self._parse_results(response.text)
+
+    async def search_async(self, query: str):
+        """Perform a DuckDuckGo web search without blocking the event loop."""
+        response = await self.async_client.get(self.base_url, params={"q": query})
 
         if response.status_code != 200:
             return []
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        return self._parse_results(response.text)
+
+    def _parse_results(self, html: str):
+        """Extract result titles and links from a DuckDuckGo HTML page."""
+        soup = BeautifulSoup(html, "html.parser")
         results = []
 
         for result in soup.select(".result__title"):
@@ -33,6 +62,12 @@ class DuckDuckGoSearchAPI:
 
         return results
 
+    async def close(self):
+        """Close the shared async HTTP client."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
 
 class GoogleSearchAPI:
     def __init__(self, api_key: str, cx: str):
@@ -43,7 +78,18 @@ class GoogleSearchAPI:
     def search(self, query: str):
         """Perform a web search using Google Custom Search JSON API."""
         url = f"https://www.googleapis.com/customsearch/v1?q={query}&key={self.api_key}&cx={self.cx}"
-        response = requests.get(url)
+        response = requests.get(url, timeout=HTTP_TIMEOUT)
+        if response.status_code == 200:
+            return response.json().get("items", [])
+        return []
+
+    async def search_async(self, query: str):
+        """Perform a Google Custom Search without blocking the event loop."""
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            response = await client.get(
+                "https://www.googleapis.com/customsearch/v1",
+                params={"q": query, "key": self.api_key, "cx": self.cx},
+            )
         if response.status_code == 200:
             return response.json().get("items", [])
         return []
@@ -0,0 +1,216 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from backend.utils.config import (
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_PER_USER,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_RETRY_AFTER,
+    CPU_CONCURRENCY,
+    LLM_CONCURRENCY,
+    SEARCH_CONCURRENCY,
+)
+from backend.utils.logger import logger
+from backend.utils.metrics import ADMISSION_REJECTED, QUEUE_WAIT
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        """Raised when a request is shed; mapped to a 429/503 response."""
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    def __init__(self, controller, user_id: str):
+        self._controller = controller
+        self._user_id = user_id
+        self._released = False
+
+    def release(self):
+        """Give the slot back; safe to call more than once."""
+        if not self._released:
+            self._released = True
+            self._controller._release(self._user_id)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrent: int = 64,
+        max_queue: int = 256,
+        max_per_user: int = 8,
+        queue_timeout: float = 2.0,
+        retry_after: int = 1,
+    ):
+        """
+        Bounded admission for chat requests.
+
+        At most max_concurrent requests run at once; up to max_queue more
+        wait for a slot (at most queue_timeout seconds). Free slots are
+        handed out round-robin across users, and a user may hold at most
+        max_per_user running + waiting requests, so one heavy client cannot
+        starve the others. Anything beyond that is rejected immediately.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._active = 0
+        self._queued = 0
+        self._per_user = {}  # user_id -> running + waiting requests
+        self._waiting = OrderedDict()  # user_id -> deque of futures, round-robin
+
+    @asynccontextmanager
+    async def admit(self, user_id: str):
+        """Hold an admission slot for the duration of the block."""
+        ticket = await self.acquire(user_id)
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    async def acquire(self, user_id: str) -> _Ticket:
+        """Wait for a slot and return a ticket, or raise AdmissionRejected."""
+        if self._per_user.get(user_id, 0) >= self.max_per_user:
+            self._reject(429, "user_limit", "Too many concurrent requests for user")
+
+        if self._active < self.max_concurrent and not self._waiting:
+            self._active += 1
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            QUEUE_WAIT.observe(0.0, queue="admission")
+            return _Ticket(self, user_id)
+
+        if self._queued >= self.max_queue:
+            self._reject(503, "queue_full", "Server is overloaded")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(future)
+        self._queued += 1
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(user_id, future)
+            self._reject(503, "queue_timeout", "Timed out waiting for capacity")
+        except asyncio.CancelledError:
+            # Client went away while waiting
+            self._abandon(user_id, future)
+            raise
+        finally:
+            QUEUE_WAIT.observe(time.perf_counter() - started, queue="admission")
+        return _Ticket(self, user_id)
+
+    def _reject(self, status_code: int, reason: str, detail: str):
+        ADMISSION_REJECTED.inc(reason=reason)
+        logger.warning(f"Admission rejected ({reason}): {detail}")
+        raise AdmissionRejected(status_code, detail, self.retry_after)
+
+    def _abandon(self, user_id: str, future):
+        """Undo a queued acquire that timed out or was cancelled."""
+        if future.done() and not future.cancelled():
+            # The slot was granted just before we gave up: pass it on
+            self._release(user_id)
+            return
+
+        queue = self._waiting.get(user_id)
+        if queue is not None:
+            try:
+                queue.remove(future)
+            except ValueError:
+                pass
+            if not queue:
+                del self._waiting[user_id]
+        self._queued -= 1
+        self._forget_user(user_id)
+
+    def _release(self, user_id: str):
+        self._active -= 1
+        self._forget_user(user_id)
+        self._dispatch()
+
+    def _forget_user(self, user_id: str):
+        remaining = self._per_user.get(user_id, 0) - 1
+        if remaining > 0:
+            self._per_user[user_id] = remaining
+        else:
+            self._per_user.pop(user_id, None)
+
+    def _dispatch(self):
+        """Hand free slots to waiting requests, one user at a time."""
+        while self._active < self.max_concurrent and self._waiting:
+            user_id, queue = next(iter(self._waiting.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            if future.done():
+                continue  # Abandoned; _abandon does the bookkeeping
+            future.set_result(True)
+            self._queued -= 1
+            self._active += 1
+
+    def status(self) -> dict:
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "users": len(self._per_user),
+        }
+
+
+class StageLimits:
+    def __init__(self, limits: dict):
+        """Per-stage concurrency caps (stage -> max concurrent, 0 = unlimited)."""
+        self._semaphores = {
+            stage: asyncio.Semaphore(limit) for stage, limit in limits.items() if limit
+        }
+
+    @asynccontextmanager
+    async def limit(self, stage: str):
+        """Hold one of the stage's slots for the duration of the block."""
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            yield
+            return
+
+        started = time.perf_counter()
+        async with semaphore:
+            QUEUE_WAIT.observe(time.perf_counter() - started, queue=stage)
+            yield
+
+
+def create_admission_controller() -> AdmissionController:
+    """Build the /chat/ admission controller from ADMISSION_* settings."""
+    return AdmissionController(
+        ADMISSION_MAX_CONCURRENT,
+        ADMISSION_MAX_QUEUE,
+        ADMISSION_MAX_PER_USER,
+        ADMISSION_QUEUE_TIMEOUT,
+        ADMISSION_RETRY_AFTER,
+    )
+
+
+# Shared caps for LLM calls, web searches and CPU-bound model work
+stage_limits = StageLimits(
+    {"llm": LLM_CONCURRENCY, "search": SEARCH_CONCURRENCY, "cpu": CPU_CONCURRENCY}
+)
@@ -0,0 +1,113 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import asyncio
+import time
+from backend.utils.admission import stage_limits
+from backend.utils.executor import run_blocking
+from backend.utils.metrics import BATCH_SIZE, QUEUE_WAIT
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        func,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        name: str = "embedding",
+    ):
+        """
+        Coalesce concurrent single-item calls into batched calls.
+
+        func(items) is a blocking function returning one result per item, in
+        order; it runs on the bounded executor under the "cpu" stage limit.
+        A batch is dispatched once it holds max_batch_size items or max_wait
+        seconds after its first item arrived, whichever comes first. When no
+        batch is running an item is dispatched right away, and items that
+        queued up behind a running batch go as soon as it finishes, so an
+        idle service adds no wait.
+        """
+        self.func = func
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self._pending = []  # (item, future, queued_at)
+        self._timer = None
+        self._running = 0
+
+    async def submit(self, item):
+        """Queue one item and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size or not self._running:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending[: self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size :]
+        if self._pending:
+            # Leftovers start their own wait window
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush
+            )
+        if batch:
+            self._running += 1
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        try:
+            await self._run_batch(batch)
+        finally:
+            self._running -= 1
+            if self._pending:
+                self._flush()
+
+    async def _run_batch(self, batch):
+        # Callers that went away (e.g. deadline) are dropped from the batch
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        for _, _, queued_at in batch:
+            QUEUE_WAIT.observe(started - queued_at, queue=f"{self.name}_batch")
+        BATCH_SIZE.observe(len(batch), batcher=self.name)
+
+        try:
+            async with stage_limits.limit("cpu"):
+                results = await run_blocking(self.func, [item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"{self.name} batch returned {len(results)} results "
+                    f"for {len(batch)} items"
+                )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def __len__(self):
+        return len(self._pending)
@@ -9,3 +9,277 @@ current_dir_path = os.path.dirname(current_file_path)
 parent_dir_path = os.path.dirname(current_dir_path)
 # Add the parent directory path to the sys.path
 sys.path.insert(0, parent_dir_path)
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Chat pipeline execution mode: "async" runs independent stages concurrently,
+# "sync" runs every stage inline on the event loop (legacy behaviour)
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "async").lower()
+
+# Worker threads for blocking / CPU-bound stages (spaCy, ChromaDB, rerankers)
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", str(os.cpu_count() or 4)))
+
+# Timeout (seconds) for outbound HTTP calls made by the async clients
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# Optional override of the Groq API endpoint (e.g. a local OpenAI-compatible server)
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+# Emit an OpenTelemetry span tree per request (exported over OTLP)
+OTEL_TRACING = os.getenv("OTEL_TRACING", "false").lower() in ("1", "true", "yes")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "chatbot-backend")
+
+# DuckDuckGo HTML search endpoint used for fact-checking
+DUCKDUCKGO_URL = os.getenv("DUCKDUCKGO_URL", "https://duckduckgo.com/html/")
+
+# Session store used for feedback lookups: "memory" (per process) or "redis" (shared)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "100000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+
+# "lazy": defer heavy imports/models and warm them up in parallel after startup,
+# "eager": build everything at import time before serving (legacy behaviour)
+STARTUP_MODE = os.getenv("STARTUP_MODE", "lazy").lower()
+
+# Single-flight coalescing of identical in-flight chat queries
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Seconds a finished result stays shareable (0 = only while in flight)
+COALESCE_WINDOW_SECONDS = float(os.getenv("COALESCE_WINDOW_SECONDS", "0"))
+COALESCE_MAX_WAITERS = int(os.getenv("COALESCE_MAX_WAITERS", "100"))
+
+# Semantic answer cache in front of generation + fact-checking
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+# Persist entries to Redis so they survive restarts and are shared by workers
+SEMANTIC_CACHE_REDIS = os.getenv("SEMANTIC_CACHE_REDIS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# End-to-end latency budget per chat request (seconds, 0 = unbounded)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "8"))
+# Largest share of the budget each stage may use, as "stage=fraction" pairs.
+# Stages that overlap may add up to more than 1; the remaining request budget
+# always caps a stage as well.
+STAGE_BUDGETS = {
+    stage.strip(): float(share)
+    for stage, share in (
+        pair.split("=")
+        for pair in os.getenv(
+            "STAGE_BUDGETS",
+            "history=0.1,preprocess=0.1,embedding=0.15,retrieval=0.25,"
+            "rerank=0.1,generation=0.6,fact_check=0.3",
+        ).split(",")
+        if pair.strip()
+    )
+}
+
+# Admission control for /chat/: requests admitted concurrently, requests allowed
+# to wait for a slot, and admitted + waiting requests allowed per user_id
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+ADMISSION_MAX_PER_USER = int(os.getenv("ADMISSION_MAX_PER_USER", "8"))
+# Seconds a request may wait in the queue before it is rejected with 503
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+# Retry-After (seconds) sent with 429/503 rejections
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# Concurrent upstream calls / CPU-bound jobs allowed per stage (0 = unlimited)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "16"))
+CPU_CONCURRENCY = int(os.getenv("CPU_CONCURRENCY", str(CPU_EXECUTOR_WORKERS)))
+
+# /chat/batch: most queries accepted per call, and texts embedded per model call
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "256"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+
+# spaCy model for query preprocessing and the pipeline components left out of
+# it (only tok2vec, tagger, attribute_ruler and lemmatizer are needed for lemmas)
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+SPACY_EXCLUDE = [
+    name.strip()
+    for name in os.getenv("SPACY_EXCLUDE", "parser,ner,senter").split(",")
+    if name.strip()
+]
+# Preprocessed queries kept in the LRU cache (0 disables it)
+PREPROCESS_CACHE_SIZE = int(os.getenv("PREPROCESS_CACHE_SIZE", "10000"))
+
+# Embedding backend: "sentence-transformers" (encoder model, default),
+# "onnx" (same encoder exported to ONNX and served by onnxruntime on CPU) or
+# "transformer" (legacy: mean of the causal LM's hidden states)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers").lower()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_MAX_SEQ_LENGTH = int(os.getenv("EMBEDDING_MAX_SEQ_LENGTH", "256"))
+EMBEDDING_NORMALIZE = os.getenv("EMBEDDING_NORMALIZE", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE") or None
+
+# ONNX Runtime backend: the model is exported (and int8-quantized) into
+# EMBEDDING_ONNX_DIR on first use; THREADS=0 lets onnxruntime pick
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "./onnx_models/embedding")
+EMBEDDING_ONNX_QUANTIZED = os.getenv("EMBEDDING_ONNX_QUANTIZED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+# Lowest cosine similarity to the PyTorch embeddings the parity check accepts
+EMBEDDING_ONNX_MIN_COSINE = float(os.getenv("EMBEDDING_ONNX_MIN_COSINE", "0.99"))
+
+# Micro-batching of concurrent single-query embeddings: a batch is run when it
+# reaches MAX_SIZE texts or MAX_WAIT_MS after its first text arrived
+EMBEDDING_MICROBATCH = os.getenv("EMBEDDING_MICROBATCH", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+EMBEDDING_MICROBATCH_MAX_SIZE = int(os.getenv("EMBEDDING_MICROBATCH_MAX_SIZE", "32"))
+EMBEDDING_MICROBATCH_MAX_WAIT_MS = float(
+    os.getenv("EMBEDDING_MICROBATCH_MAX_WAIT_MS", "5")
+)
+
+# Content-addressed embedding cache: in-memory LRU tier plus an on-disk tier
+# (memory-mapped float32 vectors + index) that survives restarts
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(
+    os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "50000")
+)
+EMBEDDING_CACHE_DISK = os.getenv("EMBEDDING_CACHE_DISK", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")
+
+# Answer generation: "groq" (hosted LLM API) or "local" (TransformerModel on
+# this node, e.g. a CPU-only fallback)
+GENERATION_BACKEND = os.getenv("GENERATION_BACKEND", "groq").lower()
+# Local generation limits: prompts are truncated to MAX_INPUT_TOKENS and
+# completions stop after MAX_NEW_TOKENS
+LOCAL_MAX_NEW_TOKENS = int(os.getenv("LOCAL_MAX_NEW_TOKENS", "256"))
+LOCAL_MAX_INPUT_TOKENS = int(os.getenv("LOCAL_MAX_INPUT_TOKENS", "2048"))
+# Concurrent local generations are batched (left-padded) up to this size
+LOCAL_GENERATION_BATCH_SIZE = int(os.getenv("LOCAL_GENERATION_BATCH_SIZE", "4"))
+LOCAL_GENERATION_MAX_WAIT_MS = float(os.getenv("LOCAL_GENERATION_MAX_WAIT_MS", "10"))
+# KV caches of recent prompts kept for reuse by prompts sharing a prefix of
+# at least MIN_TOKENS tokens (0 entries disables reuse)
+LOCAL_PREFIX_CACHE_SIZE = int(os.getenv("LOCAL_PREFIX_CACHE_SIZE", "8"))
+LOCAL_PREFIX_MIN_TOKENS = int(os.getenv("LOCAL_PREFIX_MIN_TOKENS", "8"))
+
+# Bulk ingestion (python -m backend.services.ingestion): documents are split
+# into windows of CHUNK_SIZE tokens overlapping by CHUNK_OVERLAP tokens, embedded
+# BATCH_SIZE chunks at a time by WORKERS threads and upserted in batches.
+# Tokens are the embedding model's when its tokenizer can be loaded (keep
+# CHUNK_SIZE below EMBEDDING_MAX_SEQ_LENGTH so chunks are never truncated),
+# else words
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "200"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "40"))
+INGEST_CHUNK_TOKENS = os.getenv("INGEST_CHUNK_TOKENS", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_CHECKPOINT_DIR = os.getenv("INGEST_CHECKPOINT_DIR", "./ingest_checkpoints")
+
+# Knowledge base backend behind the VectorStore interface: "chroma" (default),
+# "milvus", "hnsw" (in-process index persisted under VECTOR_STORE_DIR) or
+# "quantized" (like hnsw, with compressed vectors instead of the graph)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma").lower()
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "./vector_store")
+# HNSW graph parameters: space is "cosine", "ip" or "l2"; EF_SEARCH trades
+# recall for query latency
+HNSW_SPACE = os.getenv("HNSW_SPACE", "cosine").lower()
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+# Quantized store: "sq8" (1 byte per dimension) or "pq" (PQ_M bytes per vector)
+# codes in NLIST k-means lists, NPROBE of which are scanned per query; the
+# quantizer is trained once TRAIN_SIZE vectors are stored. With RESCORE, the
+# best RESCORE_CANDIDATES are re-ranked on their float32 vectors
+QUANT_METHOD = os.getenv("QUANT_METHOD", "sq8").lower()
+QUANT_PQ_M = int(os.getenv("QUANT_PQ_M", "48"))
+QUANT_NLIST = int(os.getenv("QUANT_NLIST", "1024"))
+QUANT_NPROBE = int(os.getenv("QUANT_NPROBE", "16"))
+QUANT_TRAIN_SIZE = int(os.getenv("QUANT_TRAIN_SIZE", "20000"))
+QUANT_RESCORE = os.getenv("QUANT_RESCORE", "true").lower() in ("1", "true", "yes")
+QUANT_RESCORE_CANDIDATES = int(os.getenv("QUANT_RESCORE_CANDIDATES", "64"))
+
+# Retrieval: "vector" (nearest neighbours only) or "hybrid" (BM25 and vector
+# candidates fused with reciprocal rank fusion). The BM25 index is kept next
+# to the vector store and updated by every upsert/delete, so ingestion builds it
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()
+HYBRID_VECTOR_CANDIDATES = int(os.getenv("HYBRID_VECTOR_CANDIDATES", "20"))
+HYBRID_LEXICAL_CANDIDATES = int(os.getenv("HYBRID_LEXICAL_CANDIDATES", "20"))
+# RRF score: sum of WEIGHT / (RRF_K + rank) over the two candidate lists
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", "./bm25_index")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Changed documents kept in the in-memory delta before postings are rebuilt
+BM25_COMPACT_EVERY = int(os.getenv("BM25_COMPACT_EVERY", "100000"))
+# Highest-impact documents of each frequent term scored first by a query; it
+# reads deeper only when needed for an exact top-k (0 scans every posting)
+BM25_TERM_CANDIDATES = int(os.getenv("BM25_TERM_CANDIDATES", "2000"))
+
+# Cross-encoder reranking after retrieval: RERANK_CANDIDATES chunks are
+# retrieved, scored in one batched pass and the best RERANK_TOP_K kept. Pairs
+# scored per call are sized to fit RERANK_BUDGET_MS (0 = no limit) and what is
+# left of the request's "rerank" stage budget
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "5"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "200"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+# Reranked orders cached per (query, candidate set)
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "1024"))
+
+# Retrieval results cached per (query embedding, k); every write to
+# the collection bumps its version, so cached results are never stale
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "4096"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "600"))
+# Also share entries between workers through Redis
+RETRIEVAL_CACHE_REDIS = os.getenv("RETRIEVAL_CACHE_REDIS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Near-duplicate elimination: chunks whose MinHash-estimated Jaccard
+# similarity (word shingles of SHINGLE_SIZE) to a kept chunk reaches THRESHOLD
+# are dropped at ingestion, as are exact duplicates; with COLLAPSE, near
+# duplicates are also removed from retrieved results
+INGEST_DEDUP = os.getenv("INGEST_DEDUP", "true").lower() in ("1", "true", "yes")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+RETRIEVAL_COLLAPSE_DUPLICATES = os.getenv(
+    "RETRIEVAL_COLLAPSE_DUPLICATES", "true"
+).lower() in ("1", "true", "yes")
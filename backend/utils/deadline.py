@@ -0,0 +1,109 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import asyncio
+import time
+from backend.utils.config import REQUEST_DEADLINE_SECONDS, STAGE_BUDGETS
+from backend.utils.logger import logger
+from backend.utils.metrics import DEGRADED
+
+
+class Deadline:
+    def __init__(
+        self, total_seconds: float = REQUEST_DEADLINE_SECONDS, shares: dict = None
+    ):
+        """
+        Per-request latency budget split across pipeline stages.
+
+        A stage may use at most its share of total_seconds and never more
+        than what is left of the request budget. total_seconds <= 0 disables
+        the deadline.
+        """
+        self.total_seconds = total_seconds
+        self.shares = STAGE_BUDGETS if shares is None else shares
+        self.started = time.monotonic()
+        self.skipped = []
+
+    def fork(self):
+        """Same budget and clock, but stages skipped are recorded separately."""
+        child = Deadline(self.total_seconds, self.shares)
+        child.started = self.started
+        return child
+
+    def remaining(self):
+        """Seconds left for the request, or None when unbounded."""
+        if self.total_seconds <= 0:
+            return None
+        return max(0.0, self.total_seconds - (time.monotonic() - self.started))
+
+    def budget(self, stage: str):
+        """Seconds the given stage may run, or None when unbounded."""
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        share = self.shares.get(stage)
+        if share is None:
+            return remaining
+        return min(remaining, self.total_seconds * share)
+
+    def skip(self, stage: str):
+        """Record a stage that was dropped to stay within the budget."""
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+        DEGRADED.inc(reason=f"{stage}_skipped")
+
+    async def run(self, stage: str, awaitable, fallback=None):
+        """
+        Await the stage within its budget; on timeout cancel it, record the
+        stage as skipped and return fallback instead.
+        """
+        timeout = self.budget(stage)
+        if timeout is not None and timeout <= 0:
+            # Nothing left: do not even start the stage
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            logger.warning(f"No latency budget left for stage '{stage}'; skipped.")
+            self.skip(stage)
+            return fallback
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stage '{stage}' exceeded its {timeout:.2f}s budget.")
+            self.skip(stage)
+            return fallback
+
+    async def iterate(self, stage: str, iterable):
+        """
+        Yield from an async iterable until the stage budget runs out; the
+        rest is dropped and the stage is recorded as skipped.
+        """
+        budget = self.budget(stage)
+        ends_at = None if budget is None else time.monotonic() + budget
+        iterator = iterable.__aiter__()
+        try:
+            while True:
+                timeout = None if ends_at is None else ends_at - time.monotonic()
+                try:
+                    item = await asyncio.wait_for(iterator.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"Stage '{stage}' cut short at its {budget:.2f}s budget."
+                    )
+                    self.skip(stage)
+                    return
+                yield item
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
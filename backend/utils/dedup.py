@@ -0,0 +1,306 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import functools
+import hashlib
+import json
+import re
+import mmh3
+import numpy as np
+from backend.utils.config import (
+    DEDUP_NUM_PERM,
+    DEDUP_SHINGLE_SIZE,
+    DEDUP_THRESHOLD,
+)
+from backend.utils.logger import logger
+
+_WORD = re.compile(r"\w+")
+# Prime just above 2**32: (a * x + b) % _PRIME stays below 2**64 for
+# 32-bit hashes x and a < 2**31
+_PRIME = np.uint64(4294967311)
+
+
+def normalize(text: str) -> list:
+    """Lowercased words of text; case, punctuation and spacing are ignored."""
+    return _WORD.findall(text.lower())
+
+
+class MinHasher:
+    def __init__(
+        self,
+        num_perm: int = DEDUP_NUM_PERM,
+        shingle_size: int = DEDUP_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        """
+        MinHash signatures over word shingles. The share of equal positions
+        in two signatures estimates the Jaccard similarity of the texts'
+        shingle sets. Shingles are hashed once with MurmurHash3; the
+        num_perm permutations are random linear maps of that hash.
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**31, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, 2**32, num_perm, dtype=np.uint64)[:, None]
+
+    def shingle_hashes(self, words: list) -> np.ndarray:
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {
+            " ".join(words[i : i + size]) for i in range(max(1, len(words) - size + 1))
+        }
+        return np.fromiter(
+            (mmh3.hash(shingle, signed=False) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+
+    def signature(self, words: list) -> np.ndarray:
+        hashes = self.shingle_hashes(words)
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+_HASHER = MinHasher()
+
+
+def lsh_bands(num_perm: int, threshold: float) -> tuple:
+    """
+    (bands, rows) splitting num_perm signature positions for LSH. Pairs
+    sharing a band become candidates; the most rows whose S-curve midpoint
+    (1/bands)**(1/rows) stays at or below threshold keeps false negatives
+    rare while bounding the candidates to verify.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows == 0 and (rows / num_perm) ** (1 / rows) <= threshold:
+            best = (num_perm // rows, rows)
+    return best
+
+
+class NearDuplicateFilter:
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = DEDUP_NUM_PERM,
+        shingle_size: int = DEDUP_SHINGLE_SIZE,
+    ):
+        """
+        Streaming exact and near-duplicate detection for chunks.
+
+        Exact duplicates are found by a hash of the normalized text. Near
+        duplicates are chunks whose estimated Jaccard similarity to a kept
+        chunk is at least threshold: LSH band buckets give the candidates,
+        which are verified against their stored signatures. Memory grows
+        with the kept chunks (num_perm * 4 bytes plus one bucket entry per
+        band each).
+
+        Chunk ids are "<document>:<n>". forget() drops the chunks kept for
+        a document, so a changed or resumed document is checked against the
+        other documents only. save() and load() carry the kept chunks (and
+        forgotten documents) over to a resumed run.
+        """
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self._exact = {}
+        self._buckets = [{} for _ in range(self.bands)]  # band key -> rows
+        self._ids = []
+        self._digests = []
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self._documents = {}  # document -> rows of its kept chunks
+        # Unsaved changes in order: kept rows and forgotten documents
+        self._journal = []
+        self._saved = {"chunks": 0, "lines": 0}  # written by save()
+        # One saved chunk: text digest and MinHash signature
+        self._record = np.dtype([("digest", "V20"), ("signature", "<u4", (num_perm,))])
+
+    def check(self, doc_id: str, text: str):
+        """
+        ("exact" | "near", id of the kept chunk) if text duplicates a chunk
+        kept earlier, else None; the chunk is then kept under doc_id.
+        """
+        words = normalize(text)
+        digest = hashlib.sha1(" ".join(words).encode("utf-8")).digest()
+        original = self._exact.get(digest)
+        if original is not None:
+            return "exact", original
+
+        signature = self.hasher.signature(words)
+        keys = self._band_keys(signature)
+        candidates = {
+            row
+            for bucket, key in zip(self._buckets, keys)
+            for row in bucket.get(key, ())
+        }
+        if candidates:
+            rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarity = (self._signatures[rows] == signature).mean(axis=1)
+            best = int(np.argmax(similarity))
+            if similarity[best] >= self.threshold:
+                return "near", self._ids[rows[best]]
+
+        self._keep(doc_id, digest, signature, keys)
+        return None
+
+    def _band_keys(self, signature: np.ndarray) -> list:
+        return [
+            signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def _keep(self, doc_id: str, digest: bytes, signature: np.ndarray, keys: list):
+        row = len(self._ids)
+        if row == len(self._signatures):
+            self._signatures = np.resize(
+                self._signatures, (2 * row, self.hasher.num_perm)
+            )
+        self._signatures[row] = signature
+        self._ids.append(doc_id)
+        self._digests.append(digest)
+        self._exact[digest] = doc_id
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(row)
+        document = doc_id.rpartition(":")[0] or doc_id
+        self._documents.setdefault(document, []).append(row)
+        self._journal.append(row)
+
+    def forget(self, document: str):
+        """
+        Stop matching against the chunks kept for document, e.g. before
+        re-reading it: an edited version's chunks may move to other ids.
+        """
+        rows = self._documents.pop(document, None)
+        if not rows:
+            return
+        for row in rows:
+            if self._exact.get(self._digests[row]) == self._ids[row]:
+                del self._exact[self._digests[row]]
+            for bucket, key in zip(
+                self._buckets, self._band_keys(self._signatures[row])
+            ):
+                bucket[key].remove(row)
+                if not bucket[key]:
+                    del bucket[key]
+        self._journal.append(document)
+
+    def save(self, path: str) -> dict:
+        """
+        Append the changes since the last save to path (one record per kept
+        chunk) and path + ".ids" (one JSON line per change: the kept chunk's
+        id, or {"forget": document}). Returns the state to hand to load();
+        entries written after the last returned state are ignored.
+        """
+        rows = [row for row in self._journal if isinstance(row, int)]
+        if self._journal:
+            records = np.empty(len(rows), dtype=self._record)
+            records["digest"] = [np.void(self._digests[row]) for row in rows]
+            records["signature"] = self._signatures[rows]
+            with open(path, "ab") as f:
+                f.write(records.tobytes())
+            with open(f"{path}.ids", "a", encoding="utf-8") as f:
+                f.writelines(
+                    f"{json.dumps(self._ids[change])}\n"
+                    if isinstance(change, int)
+                    else f"{json.dumps({'forget': change})}\n"
+                    for change in self._journal
+                )
+            self._saved = {
+                "chunks": self._saved["chunks"] + len(rows),
+                "lines": self._saved["lines"] + len(self._journal),
+            }
+            self._journal = []
+        return {
+            **self._saved,
+            "num_perm": self.hasher.num_perm,
+            "shingle_size": self.hasher.shingle_size,
+        }
+
+    def load(self, path: str, state: dict):
+        """
+        Replay the changes of a save() whose returned state is given.
+        Without a matching state the files are emptied, so save() starts
+        over.
+        """
+        count, lines = 0, 0
+        if (
+            state
+            and state.get("num_perm") == self.hasher.num_perm
+            and state.get("shingle_size") == self.hasher.shingle_size
+        ):
+            count, lines = state["chunks"], state.get("lines", state["chunks"])
+        try:
+            records = np.fromfile(path, dtype=self._record, count=count)
+            changes = []
+            with open(f"{path}.ids", "rb") as f:
+                while len(changes) < lines and (line := f.readline()):
+                    changes.append(json.loads(line))
+                ids_size = f.tell()
+        except FileNotFoundError:
+            records, changes, ids_size = [], [], 0
+        kept = sum(not isinstance(change, dict) for change in changes)
+        if len(records) != count or len(changes) != lines or kept != count:
+            logger.warning(
+                f"Deduplication state at {path} is incomplete; starting empty."
+            )
+            records, changes, ids_size, count = [], [], 0, 0
+
+        # Drop entries saved after the state (a crash before the checkpoint)
+        for name, size in (
+            (path, count * self._record.itemsize),
+            (f"{path}.ids", ids_size),
+        ):
+            with open(name, "ab") as f:
+                f.truncate(size)
+        records = iter(records)
+        for change in changes:
+            if isinstance(change, dict):
+                self.forget(change["forget"])
+                continue
+            record = next(records)
+            signature = record["signature"]
+            self._keep(
+                change,
+                record["digest"].tobytes(),
+                signature,
+                self._band_keys(signature),
+            )
+        self._journal = []
+        self._saved = {"chunks": count, "lines": len(changes)}
+
+    def __len__(self):
+        return len(self._ids)
+
+
+@functools.lru_cache(maxsize=8192)
+def _signature(document: str) -> np.ndarray:
+    # Popular chunks come back for many queries: hash each one once
+    return _HASHER.signature(normalize(document))
+
+
+def collapse_duplicates(documents: list, threshold: float = DEDUP_THRESHOLD) -> list:
+    """
+    documents with exact and near duplicates of an earlier entry removed,
+    in order. Meant for a handful of retrieved chunks: every pair is
+    compared, without LSH.
+    """
+    if len(documents) <= 1:
+        return list(documents)
+    kept, signatures = [], []
+    for document in documents:
+        signature = _signature(document)
+        if signatures and (
+            (np.asarray(signatures) == signature).mean(axis=1).max() >= threshold
+        ):
+            continue
+        kept.append(document)
+        signatures.append(signature)
+    return kept
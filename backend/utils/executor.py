@@ -0,0 +1,35 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from backend.utils.config import CPU_EXECUTOR_WORKERS
+
+# Bounded pool shared by every blocking stage so that CPU-bound work
+# (spaCy, ChromaDB, rerankers) never runs on the event loop thread.
+cpu_executor = ThreadPoolExecutor(
+    max_workers=CPU_EXECUTOR_WORKERS, thread_name_prefix="pipeline-cpu"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable on the bounded executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        cpu_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown_executor():
+    """Release executor threads (called on application shutdown)."""
+    cpu_executor.shutdown(wait=False, cancel_futures=True)
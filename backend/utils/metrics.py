@@ -0,0 +1,251 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from backend.utils.tracing import span
+
+# Latency buckets (seconds) covering in-process stages up to slow upstream calls
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{value}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        """Monotonic counter, optionally split by labels."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ):
+        """Fixed-bucket histogram; observe() is a bisect plus two additions."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Also pass every raw observation to callback(value, labels)."""
+        self._listeners.append(callback)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+        for listener in self._listeners:
+            listener(value, labels)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = [
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self._series.items()
+            ]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Collection of metrics rendered together on /metrics."""
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "chat_request_duration_seconds",
+    "End-to-end latency of chat requests.",
+    ("endpoint",),
+)
+STAGE_LATENCY = registry.histogram(
+    "chat_stage_duration_seconds",
+    "Latency of each chat pipeline stage.",
+    ("stage",),
+)
+TIME_TO_FIRST_TOKEN = registry.histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from request start to the first streamed LLM token.",
+)
+ERRORS = registry.counter(
+    "chat_errors_total",
+    "Exceptions raised per pipeline stage.",
+    ("stage",),
+)
+CACHE_HITS = registry.counter(
+    "chat_cache_hits_total",
+    "Cache hits per cache.",
+    ("cache",),
+)
+CACHE_MISSES = registry.counter(
+    "chat_cache_misses_total",
+    "Cache misses per cache.",
+    ("cache",),
+)
+COALESCED = registry.counter(
+    "chat_coalesced_requests_total",
+    "Single-flight outcomes: leader runs the pipeline, follower shares it, "
+    "overflow exceeded the per-key waiter limit.",
+    ("role",),
+)
+LATENCY_SAVED = registry.counter(
+    "chat_cache_latency_saved_seconds_total",
+    "Upstream latency avoided by cache hits (cost of the original computation).",
+    ("cache",),
+)
+DEGRADED = registry.counter(
+    "chat_degraded_responses_total",
+    "Responses served with a stage skipped or failed.",
+    ("reason",),
+)
+
+ADMISSION_REJECTED = registry.counter(
+    "chat_admission_rejected_total",
+    "Requests rejected by admission control: user_limit (429), queue_full and "
+    "queue_timeout (503).",
+    ("reason",),
+)
+QUEUE_WAIT = registry.histogram(
+    "chat_queue_wait_seconds",
+    "Time spent waiting for an admission slot or a per-stage concurrency slot.",
+    ("queue",),
+)
+
+BATCH_SIZE = registry.histogram(
+    "chat_batch_size",
+    "Items per batch run by a micro-batcher.",
+    ("batcher",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a pipeline stage, count its errors and open a span for it."""
+    start = time.perf_counter()
+    with span(f"chat.{stage}"):
+        try:
+            yield
+        except Exception:
+            ERRORS.inc(stage=stage)
+            raise
+        finally:
+            STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+
+
+@contextmanager
+def request_timer(endpoint: str):
+    """Time a whole request and make it the parent span of its stages."""
+    start = time.perf_counter()
+    with span(f"chat.request.{endpoint}"):
+        try:
+            yield
+        except Exception:
+            ERRORS.inc(stage="request")
+            raise
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
@@ -0,0 +1,66 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import asyncio
+from backend.utils.metrics import COALESCED
+
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, window: float = 0.0, max_waiters: int = 100):
+        """
+        Coalesce concurrent calls that share a key into one execution.
+
+        window: seconds a successful result stays joinable after it finished
+        (0 = only calls that arrive while the execution is in flight).
+        max_waiters: followers allowed per key; extra callers run on their own.
+        """
+        self.window = window
+        self.max_waiters = max_waiters
+        self._calls = {}
+
+    async def do(self, key, func):
+        """Return await func(), sharing one execution per in-flight key."""
+        call = self._calls.get(key)
+        if call is not None:
+            if call.waiters < self.max_waiters:
+                call.waiters += 1
+                COALESCED.inc(role="follower")
+                return await asyncio.shield(call.task)
+            COALESCED.inc(role="overflow")
+            return await func()
+
+        COALESCED.inc(role="leader")
+        # The shared work runs in its own task so a cancelled caller
+        # (e.g. a client disconnect) does not cancel it for the others
+        call = _Call(asyncio.ensure_future(func()))
+        self._calls[key] = call
+        call.task.add_done_callback(lambda task: self._expire(key, call, task))
+        return await asyncio.shield(call.task)
+
+    def _expire(self, key, call, task):
+        if task.cancelled() or task.exception() is not None or self.window <= 0:
+            self._forget(key, call)
+        else:
+            asyncio.get_running_loop().call_later(self.window, self._forget, key, call)
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def __len__(self):
+        return len(self._calls)
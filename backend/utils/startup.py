@@ -0,0 +1,151 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from backend.utils.logger import logger
+
+
+class _Component:
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self.instance = None
+        self.ready = False
+        self.seconds = None
+        self.error = None
+        self.lock = threading.Lock()
+
+
+class LazyComponent:
+    """Proxy that builds its component on first attribute access."""
+
+    def __init__(self, registry, name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr):
+        return getattr(self._registry.get(self._name), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._registry.get(self._name), attr, value)
+
+    def __repr__(self):
+        return f"<LazyComponent {self._name}>"
+
+
+class ComponentRegistry:
+    def __init__(self):
+        """Named, lazily built application components with build timings."""
+        self._components = {}
+        self._timings = {}
+        self._warmup_done = threading.Event()
+
+    def register(self, name: str, factory) -> LazyComponent:
+        """Register a factory and return a proxy that defers building it."""
+        self._components[name] = _Component(name, factory)
+        return LazyComponent(self, name)
+
+    def get(self, name: str):
+        """Build the component if needed (thread-safe) and return it."""
+        component = self._components[name]
+        if component.ready:
+            return component.instance
+
+        with component.lock:
+            if component.ready:
+                return component.instance
+
+            started = time.perf_counter()
+            try:
+                component.instance = component.factory()
+                component.ready = True
+                component.error = None
+            except Exception as e:
+                component.error = str(e)
+                logger.error(f"Error building component '{name}': {e}")
+                raise
+            finally:
+                component.seconds = time.perf_counter() - started
+            logger.info(f"Component '{name}' ready in {component.seconds:.2f}s")
+            return component.instance
+
+    def record(self, name: str, seconds: float):
+        """Record a startup step that is not a component (e.g. imports)."""
+        self._timings[name] = seconds
+
+    def warm_up(self, background: bool = True, max_workers: int = None):
+        """
+        Build every component. In the background mode all factories run in
+        parallel threads and this returns immediately; otherwise they are
+        built one after another before returning.
+        """
+        names = list(self._components)
+        if not background:
+            for name in names:
+                self._try_get(name)
+            self._finish_warm_up()
+            return
+
+        def run():
+            with ThreadPoolExecutor(
+                max_workers=max_workers or len(names) or 1,
+                thread_name_prefix="warmup",
+            ) as executor:
+                list(executor.map(self._try_get, names))
+            self._finish_warm_up()
+
+        threading.Thread(target=run, name="warmup", daemon=True).start()
+
+    def _try_get(self, name: str):
+        try:
+            self.get(name)
+        except Exception:
+            pass  # Already logged; retried on first use
+
+    def _finish_warm_up(self):
+        self._warmup_done.set()
+        breakdown = ", ".join(
+            f"{name}={seconds:.2f}s"
+            for name, seconds in sorted(
+                self.breakdown().items(), key=lambda item: item[1], reverse=True
+            )
+        )
+        logger.info(f"Startup breakdown: {breakdown}")
+
+    def breakdown(self) -> dict:
+        """Seconds spent per startup step and component."""
+        timings = dict(self._timings)
+        for name, component in self._components.items():
+            if component.seconds is not None:
+                timings[name] = component.seconds
+        return timings
+
+    def is_ready(self) -> bool:
+        return all(component.ready for component in self._components.values())
+
+    def status(self) -> dict:
+        """Readiness report for the /ready endpoint."""
+        return {
+            "ready": self.is_ready(),
+            "warm_up_finished": self._warmup_done.is_set(),
+            "components": {
+                name: {
+                    "ready": component.ready,
+                    "seconds": component.seconds,
+                    "error": component.error,
+                }
+                for name, component in self._components.items()
+            },
+            "startup": self._timings,
+        }
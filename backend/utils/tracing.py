@@ -0,0 +1,52 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+from contextlib import nullcontext
+from backend.utils.config import OTEL_TRACING, OTEL_SERVICE_NAME
+from backend.utils.logger import logger
+
+tracer = None
+
+
+def setup_tracing():
+    """Configure the OTLP span exporter when OTEL_TRACING is enabled."""
+    global tracer
+    if not OTEL_TRACING or tracer is not None:
+        return
+
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+            OTLPSpanExporter,
+        )
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": OTEL_SERVICE_NAME})
+        )
+        # Endpoint comes from the standard OTEL_EXPORTER_OTLP_ENDPOINT variable
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+        tracer = trace.get_tracer("chatbot.pipeline")
+        logger.info("OpenTelemetry tracing enabled.")
+    except Exception as e:
+        logger.error(f"Error setting up OpenTelemetry tracing: {e}")
+        tracer = None
+
+
+def span(name: str):
+    """Start a child span of the current one, or do nothing if tracing is off."""
+    if tracer is None:
+        return nullcontext()
+    return tracer.start_as_current_span(name)
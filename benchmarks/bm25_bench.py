@@ -0,0 +1,173 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import numpy as np
+
+from backend.utils.config import BM25_TERM_CANDIDATES
+from benchmarks.load_test import git_commit
+
+
+def synthetic_corpus(chunks: int, words: int, vocabulary: int, seed: int = 0):
+    """
+    Yield (id, text) chunks with Zipf-distributed words, like natural text,
+    and one rare product code ("sku<n>") per chunk.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"w{i}" for i in range(vocabulary)])
+    for start in range(0, chunks, 10000):
+        count = min(10000, chunks - start)
+        ranks = np.minimum(rng.zipf(1.2, (count, words)), vocabulary) - 1
+        codes = rng.integers(0, chunks, count)
+        for n in range(count):
+            text = " ".join(vocab[ranks[n]])
+            yield f"chunk-{start + n}", f"{text} sku{codes[n]}"
+
+
+def percentiles(samples: list) -> dict:
+    values = np.array(samples) * 1000
+    return {
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def directory_mb(path: str) -> float:
+    size = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+    return round(size / (1024 * 1024), 1)
+
+
+def run(args):
+    from backend.database.bm25_index import BM25Index
+
+    directory = tempfile.mkdtemp(prefix="bm25_bench_")
+    try:
+        index = BM25Index(
+            directory,
+            compact_every=args.compact_every,
+            term_candidates=args.term_candidates,
+        )
+        started = time.perf_counter()
+        batch_ids, batch_texts = [], []
+        for doc_id, text in synthetic_corpus(args.chunks, args.words, args.vocabulary):
+            batch_ids.append(doc_id)
+            batch_texts.append(text)
+            if len(batch_ids) == args.batch_size:
+                index.upsert(batch_ids, batch_texts)
+                batch_ids, batch_texts = [], []
+        if batch_ids:
+            index.upsert(batch_ids, batch_texts)
+        index.compact()
+        build_seconds = time.perf_counter() - started
+
+        rng = np.random.default_rng(1)
+        query_sets = {
+            # 2-4 words drawn like the corpus: frequent terms, long postings
+            "words": [
+                " ".join(
+                    f"w{min(r, args.vocabulary) - 1}"
+                    for r in rng.zipf(1.2, rng.integers(2, 5))
+                )
+                for _ in range(args.queries)
+            ],
+            # A rare code plus a couple of common words
+            "code": [
+                f"sku{rng.integers(0, args.chunks)} w{rng.integers(0, 50)} "
+                f"w{rng.integers(0, 500)}"
+                for _ in range(args.queries)
+            ],
+        }
+        latency = {}
+        for name, queries in query_sets.items():
+            for query in queries[:20]:
+                index.search(query, args.top_k)  # warm-up, pages in the postings
+            samples, results = [], []
+            for query in queries:
+                started = time.perf_counter()
+                results.append(index.search(query, args.top_k))
+                samples.append(time.perf_counter() - started)
+            latency[name] = percentiles(samples)
+
+            # Same queries scoring every posting: exact BM25 top-k
+            term_candidates, index.term_candidates = index.term_candidates, 0
+            samples, matches = [], []
+            for query, result in zip(queries, results):
+                started = time.perf_counter()
+                exact = index.search(query, args.top_k)
+                samples.append(time.perf_counter() - started)
+                # Compared by score: tied chunks may come back in either order
+                matches.append(
+                    len(exact) == len(result)
+                    and np.allclose(
+                        [score for _, score in exact], [score for _, score in result]
+                    )
+                )
+            index.term_candidates = term_candidates
+            latency[f"{name}_exhaustive"] = percentiles(samples)
+            latency[name]["same_top_k_as_exhaustive"] = round(
+                float(np.mean(matches)), 4
+            )
+
+        report = {
+            "chunks": len(index),
+            "postings": int(len(index._docs)),
+            "terms": len(index._terms),
+            "term_candidates": args.term_candidates,
+            "build_seconds": round(build_seconds, 1),
+            "chunks_per_second": round(args.chunks / build_seconds),
+            "index_mb": directory_mb(directory),
+            "latency": latency,
+        }
+        index.close()
+        return report
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build a BM25 index over a synthetic corpus and time queries."
+    )
+    parser.add_argument("--chunks", type=int, default=1000000)
+    parser.add_argument("--words", type=int, default=40, help="Words per chunk")
+    parser.add_argument("--vocabulary", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--compact-every", type=int, default=100000)
+    parser.add_argument("--term-candidates", type=int, default=BM25_TERM_CANDIDATES)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {"commit": git_commit(), "bm25": run(args)}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
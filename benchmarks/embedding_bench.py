@@ -0,0 +1,232 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import argparse
+import asyncio
+import json
+import subprocess
+import time
+
+from benchmarks.load_test import (
+    DEFAULT_CORPUS,
+    git_commit,
+    load_corpus,
+    peak_rss_mb,
+    summarize,
+)
+
+# Every backend runs in a fresh interpreter so model memory is measured in isolation
+BACKENDS = ("transformer", "sentence-transformers", "onnx-fp32", "onnx")
+# Throughput speedups are reported relative to this backend
+BASELINE = "sentence-transformers"
+
+
+def create_backend(name: str):
+    """Build an embedding backend the way main.py does."""
+    from backend.utils.config import (
+        EMBEDDING_DEVICE,
+        EMBEDDING_MAX_SEQ_LENGTH,
+        EMBEDDING_MODEL,
+        EMBEDDING_NORMALIZE,
+        EMBEDDING_ONNX_DIR,
+        EMBEDDING_ONNX_THREADS,
+    )
+
+    if name == "fake":
+        # Hash-based stand-in, for checking the harness without model downloads
+        from benchmarks.fake_services import FakeTransformerModel
+
+        return FakeTransformerModel()
+
+    if name == "transformer":
+        from backend.models.transformers import TransformerModel
+
+        return TransformerModel(os.getenv("transformer_model_name"))
+
+    if name in ("onnx", "onnx-fp32"):
+        from backend.models.onnx_encoder import OnnxEncoder, export_onnx
+
+        quantized = name == "onnx"
+        model_dir = os.path.join(EMBEDDING_ONNX_DIR, "bench")
+        if not os.path.exists(os.path.join(model_dir, "meta.json")):
+            export_onnx(EMBEDDING_MODEL, model_dir, quantize=True)
+        return OnnxEncoder(
+            model_dir,
+            max_seq_length=EMBEDDING_MAX_SEQ_LENGTH,
+            normalize=EMBEDDING_NORMALIZE,
+            quantized=quantized,
+            intra_op_threads=EMBEDDING_ONNX_THREADS,
+        )
+
+    from backend.models.encoder import SentenceEncoder
+
+    return SentenceEncoder(
+        EMBEDDING_MODEL,
+        max_seq_length=EMBEDDING_MAX_SEQ_LENGTH,
+        normalize=EMBEDDING_NORMALIZE,
+        device=EMBEDDING_DEVICE,
+    )
+
+
+def run_backend(args, texts):
+    """Measure one backend in this process (called in the child)."""
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    backend = create_backend(args.backend)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = peak_rss_mb()
+
+    # Warm-up so one-off allocations do not count as embedding time
+    backend.get_embeddings(texts[: args.batch_size])
+
+    throughput = {}
+    for batch_size in (1, args.batch_size):
+        started = time.perf_counter()
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start : start + batch_size]
+            if batch_size == 1:
+                backend.get_embedding(batch[0])
+            else:
+                backend.get_embeddings(batch)
+        elapsed = time.perf_counter() - started
+        throughput[f"batch_{batch_size}"] = round(len(texts) / elapsed, 1)
+
+    concurrency = {}
+    for level in args.concurrency:
+        concurrency[level] = {
+            mode: asyncio.run(run_concurrent(args, backend, texts, level, mode))
+            for mode in ("direct", "microbatch")
+        }
+
+    return {
+        "load_seconds": round(load_seconds, 3),
+        "load_rss_mb": round(rss_loaded - rss_before, 1),
+        "peak_rss_mb": peak_rss_mb(),
+        "texts": len(texts),
+        "texts_per_second": throughput,
+        "concurrency": concurrency,
+    }
+
+
+async def run_concurrent(args, backend, texts, level: int, mode: str):
+    """
+    level callers embed one text at a time, either each with its own model
+    call ("direct") or through the MicroBatcher the chat pipeline uses.
+    """
+    from backend.utils.batching import MicroBatcher
+    from backend.utils.executor import run_blocking
+
+    batcher = MicroBatcher(
+        backend.get_embeddings, args.max_batch_size, args.max_wait_ms / 1000
+    )
+    latencies = []
+    next_index = 0
+
+    async def caller():
+        nonlocal next_index
+        while next_index < len(texts):
+            text = texts[next_index]
+            next_index += 1
+            started = time.perf_counter()
+            if mode == "direct":
+                await run_blocking(backend.get_embedding, text)
+            else:
+                await batcher.submit(text)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(level)))
+    elapsed = time.perf_counter() - started
+    return {
+        "texts_per_second": round(len(texts) / elapsed, 1),
+        "latency": summarize(latencies),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare embedding backends (throughput and memory)."
+    )
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument(
+        "--texts",
+        type=int,
+        default=2000,
+        help="Texts per backend (the corpus is repeated to reach this count)",
+    )
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 4, 16, 64],
+        help="Comma-separated numbers of concurrent callers",
+    )
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument(
+        "--backends", default=",".join(BACKENDS), help="Comma-separated backends"
+    )
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    corpus = load_corpus(args.corpus)
+    texts = (corpus * (args.texts // len(corpus) + 1))[: args.texts]
+
+    if args.backend:
+        print(json.dumps(run_backend(args, texts)))
+        return 0
+
+    results = {}
+    for name in args.backends.split(","):
+        command = [
+            sys.executable,
+            current_file_path,
+            "--backend",
+            name,
+            "--corpus",
+            os.path.abspath(args.corpus),
+            "--texts",
+            str(args.texts),
+            "--batch-size",
+            str(args.batch_size),
+            "--concurrency",
+            ",".join(str(level) for level in args.concurrency),
+            "--max-batch-size",
+            str(args.max_batch_size),
+            "--max-wait-ms",
+            str(args.max_wait_ms),
+        ]
+        output = subprocess.check_output(command)
+        results[name] = json.loads(output.decode().strip().splitlines()[-1])
+
+    baseline = results.get(BASELINE, {}).get("texts_per_second", {})
+    for result in results.values():
+        result["speedup"] = {
+            key: round(value / baseline[key], 2)
+            for key, value in result["texts_per_second"].items()
+            if baseline.get(key)
+        }
+
+    report = {"commit": git_commit(), "backends": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+
+
+class _FakeServer:
+    """Run a ThreadingHTTPServer on a free local port in a daemon thread."""
+
+    handler_class = None
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        handler = type("Handler", (self.handler_class,), {"server_config": self})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _LLMHandler(_QuietHandler):
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, b"{}", "application/json")
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        config = self.server_config
+        prompt = payload["messages"][-1]["content"]
+        tokens = config.answer_for(prompt).split(" ")
+
+        time.sleep(config.latency)
+        if payload.get("stream"):
+            self._stream(payload, tokens)
+        else:
+            self._complete(payload, tokens)
+
+    def _complete(self, payload, tokens):
+        time.sleep(self.server_config.token_latency * len(tokens))
+        body = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(tokens)},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": len(tokens),
+                "total_tokens": len(tokens),
+            },
+        }
+        self._send(200, json.dumps(body).encode(), "application/json")
+
+    def _stream(self, payload, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for index, token in enumerate(tokens):
+            time.sleep(self.server_config.token_latency)
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"content": token if index == 0 else f" {token}"},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeLLMServer(_FakeServer):
+    """OpenAI-compatible chat completions server (plain and streaming)."""
+
+    handler_class = _LLMHandler
+
+    def __init__(self, latency: float = 0.2, token_latency: float = 0.005):
+        self.token_latency = token_latency
+        super().__init__(latency)
+
+    def answer_for(self, prompt: str) -> str:
+        return f"This is a deterministic answer about {prompt} for benchmarking."
+
+
+class _SearchHandler(_QuietHandler):
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        time.sleep(self.server_config.latency)
+        results = "".join(
+            f'<h2 class="result__title"><a href="https://example.com/{i}">'
+            f"Result {i} for {query}</a></h2>"
+            for i in range(self.server_config.results)
+        )
+        self._send(200, f"<html><body>{results}</body></html>".encode(), "text/html")
+
+
+class FakeSearchServer(_FakeServer):
+    """DuckDuckGo HTML stand-in returning a fixed number of results."""
+
+    handler_class = _SearchHandler
+
+    def __init__(self, latency: float = 0.1, results: int = 10):
+        self.results = results
+        super().__init__(latency)
+
+
+class FakeRedisClient:
+    """In-process replacement for RedisClient with the same interface."""
+
+    def __init__(self, *args, **kwargs):
+        self.lists = {}
+        self.lock = threading.Lock()
+
+    def store_chat_history(self, user_id, message, response):
+        with self.lock:
+            history = self.lists.setdefault(f"chat:{user_id}", [])
+            history.append(json.dumps({"message": message, "response": response}))
+            del history[:-20]
+
+    def get_chat_history(self, user_id, limit=5):
+        with self.lock:
+            history = list(self.lists.get(f"chat:{user_id}", [])[-limit:])
+        return [json.loads(chat) for chat in history]
+
+    def clear_chat_history(self, user_id):
+        with self.lock:
+            self.lists.pop(f"chat:{user_id}", None)
+
+    async def store_chat_history_async(self, user_id, message, response):
+        self.store_chat_history(user_id, message, response)
+
+    async def get_chat_history_async(self, user_id, limit=5):
+        return self.get_chat_history(user_id, limit)
+
+    async def clear_chat_history_async(self, user_id):
+        self.clear_chat_history(user_id)
+
+    async def close(self):
+        pass
+
+
+class FakeDatabaseClient:
+    """Records feedback rows in memory instead of MySQL."""
+
+    def __init__(self, *args, **kwargs):
+        self.rows = []
+        self.lock = threading.Lock()
+
+    def execute_query(self, query, values=None):
+        with self.lock:
+            self.rows.append(values)
+
+    def insert_feedback(self, feedback_data: dict):
+        with self.lock:
+            self.rows.append(feedback_data)
+        return feedback_data
+
+    def fetch_all(self, query):
+        with self.lock:
+            return list(self.rows)
+
+
+class FakeTransformerModel:
+    """Deterministic hash-based stand-in for the Hugging Face model."""
+
+    def __init__(
+        self, model_name: str = None, device: str = None, dim: int = 384, **kwargs
+    ):
+        self.dim = dim
+        self.model_id = f"fake:{dim}"
+        self.token_latency = kwargs.get("token_latency", 0.0)
+
+    def get_embedding(self, text):
+        seed = int.from_bytes(hashlib.sha1(text.encode()).digest()[:4], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def get_embeddings(self, texts):
+        return np.stack([self.get_embedding(text) for text in texts])
+
+    def get_response(self, prompt: str, max_new_tokens: int = 256, **kwargs) -> str:
+        return "".join(self.stream_response(prompt, max_new_tokens))
+
+    def stream_response(self, prompt: str, max_new_tokens: int = 256, **kwargs):
+        question = prompt.rsplit("Question:", 1)[-1].split("\n", 1)[0].strip()
+        for word in f"Local answer for {question}".split()[:max_new_tokens]:
+            time.sleep(self.token_latency)
+            yield word + " "
+
+    def get_responses(self, prompts, max_new_tokens: int = 256, **kwargs):
+        return [self.get_response(prompt, max_new_tokens).strip() for prompt in prompts]
+
+
+class FakeEmbeddingModel:
+    """EmbeddingModel stand-in wrapping FakeTransformerModel."""
+
+    def __init__(self, transformer_model=None, cache=None):
+        self.model = transformer_model or FakeTransformerModel()
+        self.cache = cache
+
+    def get_embedding(self, text: str):
+        return self.model.get_embedding(text)
+
+    def get_embeddings(self, texts):
+        return self.model.get_embeddings(texts)
+
+
+class FakeRLAgent:
+    def __init__(self, database_client=None):
+        self.database_client = database_client
+
+    def get_best_action(self, observation):
+        return "positive"
@@ -0,0 +1,410 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from benchmarks.fake_services import (
+    FakeDatabaseClient,
+    FakeEmbeddingModel,
+    FakeLLMServer,
+    FakeRedisClient,
+    FakeRLAgent,
+    FakeSearchServer,
+    FakeTransformerModel,
+)
+
+DEFAULT_CORPUS = os.path.join(current_dir_path, "queries.txt")
+
+
+def load_corpus(path: str):
+    """Read queries from a text file (one per line) or JSONL."""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                line = record.get("user_input") or record.get("query") or ""
+            queries.append(line)
+    return queries
+
+
+def install_fakes(args, llm_server, search_server):
+    """
+    Point the app at local stand-ins and import main.
+
+    Groq and DuckDuckGo are replaced by local HTTP servers so the real async
+    clients are exercised; Redis, MySQL, the HF model and the RL agent are
+    replaced in-process before main.py wires them up. spaCy and the vector
+    store run for real.
+    """
+    os.environ["GROQ_API_KEY"] = "benchmark"
+    os.environ["GROQ_MODEL"] = "fake-model"
+    os.environ["GROQ_BASE_URL"] = llm_server.url
+    os.environ["DUCKDUCKGO_URL"] = f"{search_server.url}/html/"
+    os.environ["PIPELINE_MODE"] = args.mode
+
+    import backend.agents.reinforcement_learning as reinforcement_learning
+    import backend.database.db as db
+    import backend.database.db_client as db_client
+    import backend.database.redis_client as redis_client
+    import backend.models.embeddings as embeddings
+    import backend.models.encoder as encoder
+    import backend.models.transformers as transformers
+
+    db.init_db = lambda: None
+    db_client.DatabaseClient = FakeDatabaseClient
+    redis_client.RedisClient = FakeRedisClient
+    transformers.TransformerModel = FakeTransformerModel
+    embeddings.EmbeddingModel = FakeEmbeddingModel
+    encoder.SentenceEncoder = FakeTransformerModel
+    reinforcement_learning.ChatbotRLAgent = FakeRLAgent
+
+    import main
+
+    return main
+
+
+def seed_knowledge_base(main, count: int):
+    """Insert synthetic documents so retrieval returns real results."""
+    if not count:
+        return
+    for start in range(0, count, 1000):
+        numbers = range(start, min(start + 1000, count))
+        ids = [f"bench-{i}" for i in numbers]
+        documents = [f"Benchmark document {i} about topic {i % 97}." for i in numbers]
+        main.vector_store.upsert(
+            ids, main.embedding_model.get_embeddings(documents), documents
+        )
+
+
+class StageRecorder:
+    """Collect raw per-stage observations from the pipeline histograms."""
+
+    def __init__(self):
+        self.enabled = False
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def stage_listener(self, value, labels):
+        self._add(labels.get("stage"), value)
+
+    def request_listener(self, value, labels):
+        self._add(f"server_{labels.get('endpoint')}", value)
+
+    def _add(self, key, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.samples.setdefault(key, []).append(value)
+
+
+def start_server(app):
+    """Run uvicorn in a background thread on a free port."""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def wait_until_ready(base_url, timeout: float):
+    """Poll /ready until the background warm-up has built every component."""
+    import httpx
+
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        response = httpx.get(f"{base_url}/ready")
+        if response.status_code == 200:
+            return response.json()
+        time.sleep(0.1)
+    raise TimeoutError(f"App not ready after {timeout}s: {response.json()}")
+
+
+async def run_load(base_url, queries, args, measured=True):
+    """Replay the corpus at the configured concurrency and arrival rate."""
+    import httpx
+
+    rng = random.Random(args.seed)
+    order = list(range(len(queries)))
+    rng.shuffle(order)
+
+    total = args.requests if measured else args.warmup
+    send_feedback = [rng.random() < args.feedback_ratio for _ in range(total)]
+    arrivals = [
+        rng.expovariate(args.rate) if args.rate > 0 else 0 for _ in range(total)
+    ]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = {"chat": [], "feedback": []}
+    errors = {"chat": 0, "feedback": 0, "rejected": 0}
+    completed = 0
+
+    async def one(client, index):
+        nonlocal completed
+        try:
+            query = queries[order[index % len(order)]]
+            started = time.perf_counter()
+            response = await client.post(
+                "/chat/",
+                json={"user_id": f"user-{index % args.users}", "user_input": query},
+            )
+            latencies["chat"].append(time.perf_counter() - started)
+            if response.status_code in (429, 503):
+                # Shed by admission control, not a failure
+                errors["rejected"] += 1
+                return
+            if response.status_code != 200:
+                errors["chat"] += 1
+                return
+            completed += 1
+
+            if send_feedback[index]:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/feedback/",
+                    json={
+                        "session_id": response.json()["session_id"],
+                        "user_feedback": "good",
+                    },
+                )
+                latencies["feedback"].append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors["feedback"] += 1
+        except Exception:
+            errors["chat"] += 1
+        finally:
+            semaphore.release()
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        tasks = []
+        started = time.perf_counter()
+        for index in range(total):
+            if arrivals[index]:
+                # Open-loop Poisson arrivals, capped by the concurrency limit
+                await asyncio.sleep(arrivals[index])
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(one(client, index)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, completed, elapsed
+
+
+def summarize(samples):
+    """Nearest-rank percentiles (milliseconds) for a list of seconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p):
+        rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+        return round(ordered[rank] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=parent_dir_path,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except Exception:
+        return None
+
+
+def compare(report, baseline, tolerance):
+    """Print p95 ratios against a baseline report; return regressed keys."""
+    regressions = []
+    sections = [("endpoints", report["endpoints"], baseline.get("endpoints", {}))]
+    sections.append(("stages", report["stages"], baseline.get("stages", {})))
+    for section, current, previous in sections:
+        for name, stats in sorted(current.items()):
+            before = previous.get(name, {}).get("p95_ms")
+            after = stats.get("p95_ms")
+            if not before or after is None:
+                continue
+            ratio = after / before
+            flag = "REGRESSION" if ratio > 1 + tolerance else ""
+            print(
+                f"{section}.{name:<24} p95 {before:>10.3f} -> {after:>10.3f} ms "
+                f"({ratio:5.2f}x) {flag}"
+            )
+            if flag:
+                regressions.append(f"{section}.{name}")
+    before = baseline.get("throughput_rps")
+    if before:
+        ratio = report["throughput_rps"] / before
+        flag = "REGRESSION" if ratio < 1 - tolerance else ""
+        print(
+            f"throughput {before:.2f} -> {report['throughput_rps']:.2f} rps "
+            f"({ratio:5.2f}x) {flag}"
+        )
+        if flag:
+            regressions.append("throughput_rps")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load-test /chat/ and /feedback/ against local stand-ins."
+    )
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Arrival rate in requests/s (0 = closed loop at full concurrency)",
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--feedback-ratio", type=float, default=0.2)
+    parser.add_argument("--mode", choices=["async", "sync"], default="async")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed-docs", type=int, default=1000)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    for name in ("corpus", "output", "baseline"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    queries = load_corpus(args.corpus)
+
+    llm_server = FakeLLMServer(args.llm_latency, args.token_latency).start()
+    search_server = FakeSearchServer(args.search_latency).start()
+
+    # Keep Chroma files and app.log out of the working tree
+    workdir = tempfile.mkdtemp(prefix="chat-bench-")
+    os.chdir(workdir)
+
+    boot_started = time.perf_counter()
+    app_module = install_fakes(args, llm_server, search_server)
+    app_module.logger.setLevel(args.log_level.upper())
+    seed_knowledge_base(app_module, args.seed_docs)
+    server, thread, base_url = start_server(app_module.app)
+    boot_seconds = time.perf_counter() - boot_started
+    wait_until_ready(base_url, args.timeout)
+    ready_seconds = time.perf_counter() - boot_started
+    rss_after_boot = peak_rss_mb()
+
+    from backend.utils.metrics import REQUEST_LATENCY, STAGE_LATENCY
+
+    recorder = StageRecorder()
+    STAGE_LATENCY.subscribe(recorder.stage_listener)
+    REQUEST_LATENCY.subscribe(recorder.request_listener)
+
+    try:
+        if args.warmup:
+            asyncio.run(run_load(base_url, queries, args, measured=False))
+        recorder.enabled = True
+        latencies, errors, completed, elapsed = asyncio.run(
+            run_load(base_url, queries, args)
+        )
+        recorder.enabled = False
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        llm_server.stop()
+        search_server.stop()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k != "baseline"},
+        },
+        "boot_seconds": round(boot_seconds, 3),
+        "ready_seconds": round(ready_seconds, 3),
+        "startup_breakdown": app_module.components.breakdown(),
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 3) if elapsed else 0.0,
+        "errors": errors,
+        "endpoints": {name: summarize(values) for name, values in latencies.items()},
+        "stages": {
+            name: summarize(values) for name, values in sorted(recorder.samples.items())
+        },
+        "rss_after_boot_mb": rss_after_boot,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import argparse
+import json
+import subprocess
+import time
+
+from benchmarks.load_test import DEFAULT_CORPUS, git_commit, load_corpus, peak_rss_mb
+
+# name -> (environment, batched); every variant runs in a fresh interpreter so
+# model memory is measured in isolation
+VARIANTS = {
+    # Previous behaviour: full en_core_web_sm pipeline, one query at a time
+    "full_pipeline": ({"SPACY_EXCLUDE": " ", "PREPROCESS_CACHE_SIZE": "0"}, False),
+    "trimmed": ({"PREPROCESS_CACHE_SIZE": "0"}, False),
+    "trimmed_batched": ({"PREPROCESS_CACHE_SIZE": "0"}, True),
+    "trimmed_cached": ({}, False),
+}
+
+
+def run_variant(args, queries):
+    """Measure one variant in this process (called in the child)."""
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    from backend.agents.query_preprocessing import (
+        get_nlp,
+        preprocess_queries,
+        preprocess_query,
+    )
+
+    nlp = get_nlp()
+    load_seconds = time.perf_counter() - started
+    rss_loaded = peak_rss_mb()
+
+    # Warm-up pass so lazily initialised tables do not count as query time
+    preprocess_queries(queries[: args.batch_size])
+
+    started = time.perf_counter()
+    if args.batched:
+        for start in range(0, len(queries), args.batch_size):
+            preprocess_queries(queries[start : start + args.batch_size])
+    else:
+        for query in queries:
+            preprocess_query(query)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "pipeline": nlp.pipe_names,
+        "load_seconds": round(load_seconds, 3),
+        "load_rss_mb": round(rss_loaded - rss_before, 1),
+        "peak_rss_mb": peak_rss_mb(),
+        "queries": len(queries),
+        "seconds": round(elapsed, 3),
+        "queries_per_second": round(len(queries) / elapsed, 1) if elapsed else None,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare spaCy query preprocessing variants (qps and memory)."
+    )
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=5000,
+        help="Queries per variant (the corpus is repeated to reach this count)",
+    )
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument(
+        "--variants", default=",".join(VARIANTS), help="Comma-separated variants"
+    )
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    parser.add_argument("--batched", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    corpus = load_corpus(args.corpus)
+    queries = (corpus * (args.queries // len(corpus) + 1))[: args.queries]
+
+    if args.variant:
+        print(json.dumps(run_variant(args, queries)))
+        return 0
+
+    results = {}
+    for name in args.variants.split(","):
+        env, batched = VARIANTS[name]
+        command = [
+            sys.executable,
+            current_file_path,
+            "--variant",
+            name,
+            "--corpus",
+            os.path.abspath(args.corpus),
+            "--queries",
+            str(args.queries),
+            "--batch-size",
+            str(args.batch_size),
+        ]
+        if batched:
+            command.append("--batched")
+        output = subprocess.check_output(command, env={**os.environ, **env})
+        results[name] = json.loads(output.decode().strip().splitlines()[-1])
+
+    baseline = results.get("full_pipeline", {}).get("queries_per_second")
+    for result in results.values():
+        if baseline and result["queries_per_second"]:
+            result["speedup"] = round(result["queries_per_second"] / baseline, 2)
+
+    report = {"commit": git_commit(), "variants": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import numpy as np
+
+from benchmarks.bm25_bench import directory_mb, percentiles
+from benchmarks.load_test import git_commit
+
+MB = 1024 * 1024
+
+
+def synthetic_embeddings(count: int, dim: int, topics: int, seed: int):
+    """
+    Unit vectors around `topics` random directions, in blocks, like sentence
+    embeddings of a corpus: chunks on one topic are close but not equal.
+    """
+    rng = np.random.default_rng(seed)
+    centers = np.random.default_rng(0).standard_normal((topics, dim))
+    for start in range(0, count, 10000):
+        size = min(10000, count - start)
+        x = centers[rng.integers(0, topics, size)] + 0.6 * rng.standard_normal(
+            (size, dim)
+        )
+        yield (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int):
+    """Row ids of the k most similar vectors per query, by brute force."""
+    best_ids, best_scores = [], []
+    for start in range(0, len(vectors), 50000):
+        scores = queries @ vectors[start : start + 50000].T
+        top = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+        best_ids.append(top + start)
+        best_scores.append(np.take_along_axis(scores, top, axis=1))
+    best_ids, best_scores = np.hstack(best_ids), np.hstack(best_scores)
+    order = np.argsort(-best_scores, axis=1)[:, :k]
+    return np.take_along_axis(best_ids, order, axis=1)
+
+
+def measure(search, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    """Latency, QPS and recall@k of search(query) -> row ids, one query at a time."""
+    for query in queries[:20]:
+        search(query)  # warm-up, pages in what a query touches
+    samples, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = search(query)
+        samples.append(time.perf_counter() - started)
+        recalls.append(len(set(found[:k]) & set(expected[:k])) / k)
+    report = percentiles(samples)
+    report["qps"] = round(len(samples) / sum(samples), 1)
+    report[f"recall@{k}"] = round(float(np.mean(recalls)), 4)
+    return report
+
+
+def build(store, args) -> float:
+    started = time.perf_counter()
+    row = 0
+    for block in synthetic_embeddings(args.vectors, args.dim, args.topics, seed=1):
+        store.upsert([str(row + i) for i in range(len(block))], block)
+        row += len(block)
+    return time.perf_counter() - started
+
+
+def run(args):
+    from backend.database.vector_store import HnswVectorStore, QuantizedVectorStore
+
+    queries = next(synthetic_embeddings(args.queries, args.dim, args.topics, seed=2))
+    directory = tempfile.mkdtemp(prefix="quantization_bench_")
+    try:
+        results = {}
+
+        def ids(hits):
+            return [int(hit["id"]) for hit in hits]
+
+        # Uncompressed baseline: exact scan of the float32 vectors in RAM
+        flat = QuantizedVectorStore(
+            os.path.join(directory, "flat"), train_size=args.vectors + 1
+        )
+        build_seconds = build(flat, args)
+        vectors = np.array(flat.vectors())
+        truth = exact_neighbours(vectors, queries, args.top_k)
+        results["float32_exact"] = {
+            "build_seconds": round(build_seconds, 1),
+            "ram_mb": round(vectors.nbytes / MB, 1),
+            **measure(
+                lambda q, vectors=vectors: exact_neighbours(
+                    vectors, q[None], args.top_k
+                )[0],
+                queries,
+                truth,
+                args.top_k,
+            ),
+        }
+        flat.close()
+        del vectors
+
+        if args.hnsw:
+            store = HnswVectorStore(os.path.join(directory, "hnsw"))
+            build_seconds = build(store, args)
+            results["float32_hnsw"] = {
+                "build_seconds": round(build_seconds, 1),
+                # hnswlib keeps the float32 vectors and the graph in RAM
+                "ram_mb": directory_mb(os.path.join(directory, "hnsw", "hnsw")),
+                **measure(
+                    lambda q: ids(store.search(q, args.top_k)),
+                    queries,
+                    truth,
+                    args.top_k,
+                ),
+            }
+            store.close()
+
+        for method in args.methods:
+            store = QuantizedVectorStore(
+                os.path.join(directory, method),
+                method=method,
+                pq_m=args.pq_m,
+                nlist=args.nlist,
+                nprobe=args.nprobe,
+                train_size=args.train_size,
+                rescore_candidates=args.rescore_candidates,
+            )
+            build_seconds = build(store, args)
+            memory = store.memory_usage()
+            for rescore in (False, True):
+                store.set_rescore(rescore)
+                name = f"{method}{'_rescore' if rescore else ''}"
+                results[name] = {
+                    "build_seconds": round(build_seconds, 1),
+                    # Codes are memory-mapped but scanned by every query:
+                    # count them as resident, like the lists and centroids
+                    "ram_mb": round(
+                        (memory["in_memory_bytes"] + memory["codes_bytes"]) / MB, 1
+                    ),
+                    "codes_mb": round(memory["codes_bytes"] / MB, 1),
+                    "compression": round(
+                        memory["float32_bytes"] / memory["codes_bytes"], 1
+                    ),
+                    **measure(
+                        lambda q: ids(store.search(q, args.top_k)),
+                        queries,
+                        truth,
+                        args.top_k,
+                    ),
+                }
+            store.close()
+
+        return {
+            "vectors": args.vectors,
+            "dim": args.dim,
+            "nlist": args.nlist,
+            "nprobe": args.nprobe,
+            "pq_m": args.pq_m,
+            "rescore_candidates": args.rescore_candidates,
+            "results": results,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare quantized vector stores with float32 search: memory, "
+        "QPS and recall@k."
+    )
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--methods", nargs="+", default=["sq8", "pq"])
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--train-size", type=int, default=50000)
+    parser.add_argument("--rescore-candidates", type=int, default=64)
+    parser.add_argument(
+        "--hnsw", action="store_true", help="Also build the float32 HNSW store"
+    )
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {"commit": git_commit(), "quantization": run(args)}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
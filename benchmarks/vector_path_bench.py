@@ -0,0 +1,153 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import argparse
+import json
+import time
+import tracemalloc
+import numpy as np
+
+from benchmarks.load_test import git_commit
+
+
+class ArrayBackend:
+    """Embedding backend returning precomputed float32 rows, so only the
+    conversion work between the model and the vector store is measured."""
+
+    def __init__(self, dim: int, rows: int = 4096):
+        vectors = np.random.default_rng(0).standard_normal((rows, dim))
+        self.vectors = vectors.astype(np.float32)
+
+    def _rows(self, texts):
+        return self.vectors[[hash(text) % len(self.vectors) for text in texts]]
+
+    def get_embedding(self, text):
+        return self._rows([text])[0]
+
+    def get_embeddings(self, texts):
+        return self._rows(texts)
+
+
+def legacy_get_embeddings(backend, texts, batch_size):
+    """The list-based path: backends returned .tolist(), every row was
+    validated as a Python list and the store converted each back."""
+    embeddings = []
+    for start in range(0, len(texts), batch_size):
+        batch = backend.get_embeddings(texts[start : start + batch_size]).tolist()
+        for embedding in batch:
+            embeddings.append(
+                embedding if isinstance(embedding, list) and embedding else []
+            )
+    return embeddings
+
+
+def legacy_get_embedding(backend, text):
+    embedding = backend.get_embedding(text).tolist()
+    return embedding if isinstance(embedding, list) and embedding else []
+
+
+def to_store(embeddings):
+    """What the vector store client does with its input (Chroma 0.5+)."""
+    if isinstance(embeddings, np.ndarray):
+        return list(embeddings)
+    return [np.array(embedding, dtype=np.float32) for embedding in embeddings]
+
+
+def measure(func):
+    """(seconds, peak traced MB) of func; timed without tracemalloc overhead."""
+    func()  # warm-up
+    started = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(seconds, 4), round(peak / (1024 * 1024), 2)
+
+
+def run(args):
+    from backend.models.embeddings import EmbeddingModel
+
+    backend = ArrayBackend(args.dim)
+    model = EmbeddingModel(backend)
+    texts = [f"document {i}" for i in range(args.embeddings)]
+    queries = texts[: args.queries]
+
+    paths = {
+        "batch": {
+            "lists": lambda: to_store(
+                legacy_get_embeddings(backend, texts, args.batch_size)
+            ),
+            "numpy": lambda: to_store(model.get_embeddings(texts, args.batch_size)),
+        },
+        "single": {
+            "lists": lambda: [
+                to_store([legacy_get_embedding(backend, q)]) for q in queries
+            ],
+            "numpy": lambda: [
+                to_store(model.get_embedding(q)[None, :]) for q in queries
+            ],
+        },
+    }
+
+    results = {}
+    for name, variants in paths.items():
+        count = args.embeddings if name == "batch" else args.queries
+        scale = 10000 / count
+        result = {}
+        for variant, func in variants.items():
+            seconds, peak_mb = measure(func)
+            result[variant] = {
+                "seconds_per_10k": round(seconds * scale, 4),
+                "peak_mb_per_10k": round(peak_mb * scale, 2),
+            }
+        result["seconds_saved_per_10k"] = round(
+            result["lists"]["seconds_per_10k"] - result["numpy"]["seconds_per_10k"], 4
+        )
+        result["mb_saved_per_10k"] = round(
+            result["lists"]["peak_mb_per_10k"] - result["numpy"]["peak_mb_per_10k"], 2
+        )
+        results[name] = result
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the list-based and NumPy embedding paths "
+        "(model output to vector store input)."
+    )
+    parser.add_argument("--embeddings", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {
+        "commit": git_commit(),
+        "dim": args.dim,
+        "paths": run(args),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
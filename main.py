@@ -10,28 +10,47 @@ parent_dir_path = os.path.dirname(current_dir_path)
 # Add the parent directory path to the sys.path
 sys.path.insert(0, parent_dir_path)
 
+import time
 
+# Start of the startup-time breakdown (module imports)
+startup_started = time.perf_counter()
+
+import json
 import uvicorn
-import threading
-import uuid
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException
-from backend.agents.query_preprocessing import preprocess_query
-from backend.agents.retrieval import retrieve_knowledge
-from backend.agents.generation import generate_response, generate_response_llm
-from backend.agents.fact_checking import fact_check
-from backend.agents.explainability import explain_response
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from backend.agents.query_preprocessing import get_nlp
 from backend.database.milvus_client import MilvusClient
-from backend.database.chromadb_client import ChromaDBClient
+from backend.database.vector_store import create_vector_store
 from backend.database.db import init_db
 from backend.database.db_client import DatabaseClient
-from backend.models.embeddings import EmbeddingModel
+from backend.models.embeddings import create_embedding_model
+from backend.models.reranker import CrossEncoderReranker
 from backend.models.transformers import TransformerModel
 from backend.services.search_api import GoogleSearchAPI, DuckDuckGoSearchAPI
 from backend.utils.logger import logger
 from backend.agents.feedback import store_feedback
 from backend.agents.reinforcement_learning import ChatbotRLAgent
 from backend.database.redis_client import RedisClient
+from backend.database.semantic_cache import create_semantic_cache
+from backend.database.session_store import create_session_store
+from backend.services.chat_pipeline import ChatPipeline
+from backend.utils.admission import AdmissionRejected, create_admission_controller
+from backend.utils.config import (
+    BATCH_MAX_QUERIES,
+    EMBEDDING_BACKEND,
+    GENERATION_BACKEND,
+    RERANK_ENABLED,
+    SEMANTIC_CACHE_ENABLED,
+    STARTUP_MODE,
+)
+from backend.utils.executor import run_blocking, shutdown_executor
+from backend.utils.metrics import registry
+from backend.utils.startup import ComponentRegistry
+from backend.utils.tracing import setup_tracing
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -53,19 +72,57 @@ transformer_model_name = os.getenv("transformer_model_name")
 search_api_key = os.getenv("search_api_key")
 cx = os.getenv("cx")
 
-app = FastAPI(title="Scalable Multi-Agent Chatbot")
 
-# Initialize
-init_db()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_tracing()
+    if STARTUP_MODE == "lazy":
+        # Build models in parallel while the server already accepts requests
+        components.warm_up(background=True)
+    yield
+    # Release pooled async connections and executor threads
+    await redis_client.close()
+    await session_store.close()
+    await search_api.close()
+    shutdown_executor()
+
+
+app = FastAPI(title="Scalable Multi-Agent Chatbot", lifespan=lifespan)
+
+
+def create_database_client():
+    init_db()
+    return DatabaseClient()
+
+
+# Initialize (heavy components are built on first use or by the warm-up)
+components = ComponentRegistry()
 # milvus_client = MilvusClient(milv_host, milv_port, milv_collection_name)
-chromadb_client = ChromaDBClient("my_knowledge_base")
-database_client = DatabaseClient()
-transformer_model = TransformerModel(transformer_model_name)
-embedding_model = EmbeddingModel(transformer_model)
+# Knowledge base backend is chosen by VECTOR_STORE (chroma, hnsw or milvus)
+vector_store = components.register(
+    "vector_store", lambda: create_vector_store("my_knowledge_base")
+)
+database_client = components.register("database", create_database_client)
+# The causal LM is only built (and warmed up) when something uses it: local
+# generation or the legacy "transformer" embedding backend
+transformer_model = (
+    components.register(
+        "transformer_model", lambda: TransformerModel(transformer_model_name)
+    )
+    if GENERATION_BACKEND == "local" or EMBEDDING_BACKEND == "transformer"
+    else None
+)
+embedding_model = components.register(
+    "embedding_model",
+    lambda: create_embedding_model(lambda: components.get("transformer_model")),
+)
 # search_api = GoogleSearchAPI(search_api_key, cx)
 search_api = DuckDuckGoSearchAPI()
 redis_client = RedisClient(REDIS_HOST, REDIS_PORT, 0)
-rl_agent = ChatbotRLAgent(database_client)
+rl_agent = components.register(
+    "rl_agent", lambda: ChatbotRLAgent(components.get("database"))
+)
+components.register("spacy", get_nlp)
 
 
 class ChatRequest(BaseModel):
@@ -73,91 +130,147 @@ class ChatRequest(BaseModel):
     user_input: str
 
 
+class BatchChatRequest(BaseModel):
+    user_id: str
+    queries: list[str]
+
+
 class FeedbackRequest(BaseModel):
     session_id: str
     user_feedback: str
 
 
-chat_sessions = {}  # Tracks session IDs
+# Tracks session IDs (bounded, TTL-evicting; shared across workers with Redis)
+session_store = create_session_store(REDIS_HOST, REDIS_PORT, 0)
+
+# Validated answers reused for near-duplicate questions
+semantic_cache = (
+    components.register(
+        "semantic_cache", lambda: create_semantic_cache(REDIS_HOST, REDIS_PORT, 0)
+    )
+    if SEMANTIC_CACHE_ENABLED
+    else None
+)
+
+# Cross-encoder reranking of a wider retrieved candidate set
+reranker = (
+    components.register("reranker", lambda: CrossEncoderReranker())
+    if RERANK_ENABLED
+    else None
+)
+
+chat_pipeline = ChatPipeline(
+    redis_client,
+    vector_store,
+    embedding_model,
+    transformer_model,
+    search_api,
+    GROQ_MODEL,
+    GROQ_API_KEY,
+    session_store,
+    semantic_cache,
+    reranker=reranker,
+)
+
+# Bounded concurrency + wait queue in front of the chat endpoints
+admission = create_admission_controller()
+
+components.record("imports", time.perf_counter() - startup_started)
+if STARTUP_MODE == "eager":
+    # Legacy behaviour: everything is loaded before the app is served
+    components.warm_up(background=False)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed load with a fast 429/503 that tells the client when to retry."""
+    return JSONResponse(
+        {"detail": exc.detail},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.post("/chat/")
 async def chat_endpoint(chat_request: ChatRequest):
-    try:
-        logger.info(f"Received input from user {chat_request.user_id}")
-
-        # Step 1: Retrieve past chat history
-        chat_history = redis_client.get_chat_history(chat_request.user_id)
-
-        logger.debug(f"chat_history: {chat_history}")
+    async with admission.admit(chat_request.user_id):
+        try:
+            logger.info(f"Received input from user {chat_request.user_id}")
 
-        # Step 2: Preprocess the query
-        processed_query = preprocess_query(chat_request.user_input)
+            # Steps 1-9 run in the chat pipeline (async mode by default)
+            return await chat_pipeline.run(
+                chat_request.user_id, chat_request.user_input
+            )
+        except Exception as e:
+            logger.error(f"Error in chat endpoint: {e}")
+            raise HTTPException(status_code=500, detail="Failed to process request")
 
-        logger.debug(f"processed_query: {processed_query}")
 
-        # Step 3: Retrieve relevant knowledge
-        retrieved_knowledge = chromadb_client.retrieve_knowledge(
-            processed_query, embedding_model
+@app.post("/chat/batch")
+async def chat_batch_endpoint(batch_request: BatchChatRequest):
+    if len(batch_request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BATCH_MAX_QUERIES} queries per batch",
         )
 
-        logger.debug(f"retrieved_knowledge: {retrieved_knowledge}")
-
-        # # Step 4: Generate response (pass chat history for continuity)
-        # raw_response = generate_response(processed_query, retrieved_knowledge, transformer_model)
-        raw_response = generate_response_llm(processed_query, GROQ_MODEL, GROQ_API_KEY)
+    async with admission.admit(batch_request.user_id):
+        try:
+            logger.info(
+                f"Received batch of {len(batch_request.queries)} queries "
+                f"from user {batch_request.user_id}"
+            )
+            results = await chat_pipeline.run_batch(
+                batch_request.user_id, batch_request.queries
+            )
+            return {"results": results}
+        except Exception as e:
+            logger.error(f"Error in chat batch endpoint: {e}")
+            raise HTTPException(status_code=500, detail="Failed to process request")
 
-        logger.debug(f"raw_response: {raw_response}")
 
-        # Step 5: Fact-check the response
-        validated_response = fact_check(raw_response, search_api)
+def format_sse(event: str, data: dict) -> str:
+    """Serialize one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        logger.debug(f"validated_response: {validated_response}")
 
-        # # Step 6: RL-based response strategy
-        # action = rl_agent.get_best_action(processed_query)
-        # if action == "negative":
-        #     validated_response += " (Note: This response may need improvement.)"
+@app.post("/chat/stream")
+async def chat_stream_endpoint(chat_request: ChatRequest):
+    # Admit before the response starts so rejections are still plain 429/503
+    ticket = await admission.acquire(chat_request.user_id)
+    logger.info(f"Received streaming input from user {chat_request.user_id}")
 
-        # Step 7: Explainability (SHAP Analysis)
-        explanation = explain_response(
-            processed_query, retrieved_knowledge, validated_response
-        )
-        logger.debug(f"explanation: {explanation}")
+    async def event_stream():
+        try:
+            async for event, data in chat_pipeline.stream(
+                chat_request.user_id, chat_request.user_input
+            ):
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {e}")
+            yield format_sse("error", {"detail": "Failed to process request"})
+        finally:
+            ticket.release()
 
-        # Step 8: Store conversation in Redis (chat memory)
-        redis_client.store_chat_history(
-            chat_request.user_id, chat_request.user_input, validated_response
-        )
-
-        # Step 9: Generate session ID for feedback tracking
-        session_id = str(uuid.uuid4())
-        chat_sessions[session_id] = {
-            "user_id": chat_request.user_id,
-            "user_input": chat_request.user_input,
-            "response": validated_response,
-        }
-
-        return {
-            "session_id": session_id,
-            "response": validated_response,
-            "explanation": explanation,
-            "chat_history": chat_history,
-        }
-    except Exception as e:
-        logger.error(f"Error in chat endpoint: {e}")
-        raise HTTPException(status_code=500, detail="Failed to process request")
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also releases the slot if the client left before streaming began
+        background=BackgroundTask(ticket.release),
+    )
 
 
 @app.post("/feedback/")
 async def feedback_endpoint(feedback: FeedbackRequest):
     try:
-        session_data = chat_sessions.get(feedback.session_id)
+        session_data = await session_store.get_async(feedback.session_id)
         if not session_data:
             raise HTTPException(status_code=404, detail="Session not found")
 
         try:
-            store_feedback(
+            await run_blocking(
+                store_feedback,
                 session_data["user_id"],
                 session_data["user_input"],
                 session_data["response"],
@@ -169,6 +282,8 @@ async def feedback_endpoint(feedback: FeedbackRequest):
         except Exception as e:
             logger.error(f"Error storing feedback: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to store feedback")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in feedback endpoint: {e}")
         raise HTTPException(status_code=500, detail="Failed to process request")
@@ -177,17 +292,36 @@ async def feedback_endpoint(feedback: FeedbackRequest):
 @app.delete("/clear_chat/{user_id}")
 async def clear_chat_memory(user_id: str):
     try:
-        redis_client.clear_chat_history(user_id)
+        await redis_client.clear_chat_history_async(user_id)
         return {"message": "Chat history cleared successfully."}
     except Exception as e:
         logger.error(f"Error clearing chat history: {e}")
         raise HTTPException(status_code=500, detail="Failed to clear chat history")
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint for pipeline latency and error metrics."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def read_root():
     return {"message": "Backend server is running"}
 
 
+@app.get("/live")
+def liveness():
+    """Liveness: the process is up and serving HTTP."""
+    return {"status": "alive"}
+
+
+@app.get("/ready")
+def readiness():
+    """Readiness: every component has been built; includes startup timings."""
+    status = components.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8005)
@@ -0,0 +1,57 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+from types import SimpleNamespace
+import pytest
+
+from benchmarks.fake_services import FakeLLMServer, FakeSearchServer
+
+
+@pytest.fixture(scope="session")
+def llm_server():
+    """Local OpenAI-compatible server streaming one token every 20 ms."""
+    server = FakeLLMServer(latency=0.05, token_latency=0.02).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def search_server():
+    server = FakeSearchServer(latency=0.0).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def app_module(llm_server, search_server, tmp_path_factory):
+    """main.py wired to the fake services, as in the load test."""
+    from benchmarks.load_test import install_fakes
+
+    # Keep Chroma files and app.log out of the working tree
+    previous_dir = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        yield install_fakes(SimpleNamespace(mode="async"), llm_server, search_server)
+    finally:
+        os.chdir(previous_dir)
+
+
+@pytest.fixture(scope="session")
+def base_url(app_module):
+    """The app served by uvicorn on a free local port, warmed up."""
+    from benchmarks.load_test import start_server, wait_until_ready
+
+    server, thread, url = start_server(app_module.app)
+    wait_until_ready(url, timeout=120)
+    yield url
+    server.should_exit = True
+    thread.join(timeout=10)
@@ -0,0 +1,101 @@
+import os
+import sys
+
+# Get the absolute path of the current file
+current_file_path = os.path.abspath(__file__)
+# Get the directory path of the current file
+current_dir_path = os.path.dirname(current_file_path)
+# Get the parent directory path
+parent_dir_path = os.path.dirname(current_dir_path)
+# Add the parent directory path to the sys.path
+sys.path.insert(0, parent_dir_path)
+
+import json
+import time
+import httpx
+
+
+def iter_events(response):
+    """(event, data) pairs of a server-sent event stream."""
+    event = None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: ") :]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: ") :])
+
+
+def stream_chat(base_url, user_input, user_id="stream-test"):
+    with httpx.stream(
+        "POST",
+        f"{base_url}/chat/stream",
+        json={"user_id": user_id, "user_input": user_input},
+        timeout=30,
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        return list(iter_events(response))
+
+
+def test_stream_sends_tokens_then_done(base_url):
+    events = stream_chat(base_url, "How do solar panels work?")
+
+    names = [event for event, _ in events]
+    assert names[-1] == "done"
+    assert "error" not in names
+    # The fake LLM streams its answer word by word
+    tokens = [data["token"] for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert "deterministic answer" in "".join(tokens)
+    assert names.index("done") == len(tokens)
+
+
+def test_done_event_carries_verdict_and_session(base_url, app_module):
+    events = stream_chat(base_url, "What causes ocean tides?")
+    event, done = events[-1]
+
+    assert event == "done"
+    assert isinstance(done["verified"], bool)
+    assert done["response"]
+    assert done["session_id"]
+    # The session is recorded so feedback can refer to it
+    response = httpx.post(
+        f"{base_url}/feedback/",
+        json={"session_id": done["session_id"], "user_feedback": "positive"},
+        timeout=30,
+    )
+    assert response.status_code == 200
+
+
+def test_time_to_first_token_is_recorded(base_url):
+    from backend.utils.metrics import TIME_TO_FIRST_TOKEN
+
+    observed = []
+    TIME_TO_FIRST_TOKEN.subscribe(lambda value, labels: observed.append(value))
+
+    _, done = stream_chat(base_url, "Why is the sky blue?")[-1]
+
+    assert 0 < done["time_to_first_token"] <= done["total_latency"]
+    assert done["time_to_first_token"] in observed
+    metrics = httpx.get(f"{base_url}/metrics", timeout=30).text
+    assert "chat_time_to_first_token_seconds_count" in metrics
+
+
+def test_client_disconnect_releases_admission_slot(base_url, app_module):
+    admission = app_module.admission
+    with httpx.stream(
+        "POST",
+        f"{base_url}/chat/stream",
+        json={"user_id": "disconnect-test", "user_input": "Explain photosynthesis"},
+        timeout=30,
+    ) as response:
+        for event, _ in iter_events(response):
+            if event == "token":
+                assert admission.status()["active"] == 1
+                break
+    # Leaving the block closes the connection in the middle of the stream
+
+    deadline = time.perf_counter() + 5
+    while admission.status()["active"] and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    assert admission.status() == {"active": 0, "queued": 0, "users": 0}